@@ -0,0 +1,44 @@
+"""
+Fails when a read query's plan scans a large label or a relationship type in full or builds a Cartesian product,
+unless app.db.graph.plan_check.ALLOWED_FINDINGS allows it for every entry of READ_QUERIES that runs the statement.
+Run it against a local Neo4j, not production: every read query is executed once.
+
+    python -m app.check_query_plans --init-schema
+"""
+import argparse
+import json
+import logging
+import sys
+
+from app.db.connections import connect_neo4j
+from app.db.graph.plan_check import check_plans, init_schema
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--init-schema", action="store_true",
+                        help="Create the constraints and indexes of the ingestion and analytics jobs first")
+    parser.add_argument("--list", action="store_true", help="Print every statement with its plan operators")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] - %(asctime)s - %(message)s")
+
+    driver = connect_neo4j()
+    if args.init_schema:
+        init_schema(driver)
+    plans, errors = check_plans(driver)
+    driver.close()
+
+    failed = [plan for plan in plans if plan.violations]
+    for plan in plans:
+        if args.list:
+            print(json.dumps({"name": plan.name, "entries": plan.entries, "operators": plan.operators,
+                              "findings": plan.findings, "text": " ".join(plan.text.split())}))
+        if plan.violations:
+            logging.error(f"{plan.name} ({', '.join(plan.entries)}): {', '.join(plan.violations)}\n{plan.text}")
+    logging.info(f"Checked {len(plans)} statements: {len(failed)} with disallowed plans, "
+                 f"{len(errors)} read queries failed to run")
+    sys.exit(1 if failed or errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import argparse
+import datetime
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Set, Tuple
+
+from neo4j import Driver
+from sqlalchemy.orm import sessionmaker
+
+from app.db.connections import connect_postgres, connect_neo4j
+from app.db.db_postgres import iter_co_spends
+from app.db.graph.entity import iter_graph_co_spends, get_entity_ids, write_entities, update_entity_aggregates, \
+    clear_entities, get_clustering_checkpoint, set_clustering_checkpoint
+from app.models.transactions import CoSpend
+from app.utils.union_find import UnionFind
+
+EPOCH_START = datetime.datetime(2017, 9, 23)
+
+
+def new_entity_id(addresses: List[str]) -> str:
+    """Deterministic id for a cluster seen for the first time, derived from its smallest address."""
+    return "entity_" + hashlib.blake2b(min(addresses).encode(), digest_size=10).hexdigest()
+
+
+def cluster(co_spends: Iterable[CoSpend]) -> UnionFind:
+    """Common-input heuristic: all addresses spent from by the same transaction belong to the same entity."""
+    clusters = UnionFind()
+    count = 0
+    for co_spend in co_spends:
+        clusters.union_all(co_spend.addresses)
+        count += 1
+        if count % 100000 == 0:
+            logging.info(f"Clustered {count} transactions, {len(clusters)} addresses")
+    logging.info(f"Clustered {count} transactions, {len(clusters)} addresses")
+    return clusters
+
+
+def reconcile(clusters: UnionFind, existing: Dict[str, str]) -> Tuple[Dict[str, str], Dict[str, str], Set[str]]:
+    """
+    Fold freshly computed clusters into the entities already stored in the graph.
+    A cluster touching no existing entity gets a new id. A cluster touching one keeps that entity's id, and a
+    cluster touching several merges them into the smallest id.
+    :param clusters: Clusters of the newly processed range.
+    :param existing: Current entity id of the clustered addresses that already have one.
+    :return: (new entity id per address that changes, old -> surviving id of merged entities, entities whose
+             aggregates must be recomputed)
+    """
+    for address, entity_id in existing.items():
+        # Entities stand in for their members that are not part of this range
+        clusters.union(address, ("entity", entity_id))
+
+    assignments: Dict[str, str] = {}
+    merged: Dict[str, str] = {}
+    touched: Set[str] = set()
+    for members in clusters.groups().values():
+        addresses = [member for member in members if isinstance(member, str)]
+        entity_ids = sorted(member[1] for member in members if isinstance(member, tuple))
+        if not entity_ids and len(addresses) < 2:
+            continue
+        entity_id = entity_ids[0] if entity_ids else new_entity_id(addresses)
+        for old_id in entity_ids[1:]:
+            merged[old_id] = entity_id
+        for address in addresses:
+            if existing.get(address) != entity_id:
+                assignments[address] = entity_id
+        touched.add(entity_id)
+    return assignments, merged, touched
+
+
+def run(driver: Driver, co_spends: Iterable[CoSpend], end: datetime.datetime):
+    clusters = cluster(co_spends)
+    existing = get_entity_ids(driver, [key for key in clusters.keys() if isinstance(key, str)])
+    assignments, merged, touched = reconcile(clusters, existing)
+    logging.info(f"{len(assignments)} addresses changed entity, {len(merged)} entities merged, "
+                 f"{len(touched)} entities to update")
+
+    write_entities(driver, assignments, merged)
+    update_entity_aggregates(driver, sorted(touched))
+    set_clustering_checkpoint(driver, end.isoformat())
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] - %(asctime)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Group addresses into entities with the common-input heuristic")
+    parser.add_argument("--source", choices=["postgres", "graph"], default="postgres",
+                        help="Read co-spends from db-sync tx_in/tx_out or from the graph")
+    parser.add_argument("--full", action="store_true",
+                        help="Drop all entities and recluster from --start instead of continuing from the last run")
+    parser.add_argument("--start", type=datetime.datetime.fromisoformat,
+                        help="Defaults to the end of the last run, or the start of the chain")
+    parser.add_argument("--end", type=datetime.datetime.fromisoformat, default=datetime.datetime.utcnow())
+    args = parser.parse_args()
+
+    driver = connect_neo4j()
+    start = args.start
+    if args.full:
+        clear_entities(driver)
+    elif start is None:
+        checkpoint = get_clustering_checkpoint(driver)
+        start = datetime.datetime.fromisoformat(checkpoint).replace(tzinfo=None) if checkpoint else None
+    start = start or EPOCH_START
+    logging.info(f"Clustering addresses from {start} to {args.end} ({args.source})")
+
+    if args.source == "graph":
+        run(driver, iter_graph_co_spends(driver, start.isoformat(), args.end.isoformat()), args.end)
+    else:
+        Session = sessionmaker(bind=connect_postgres())
+        with Session() as session:
+            run(driver, iter_co_spends(session, start.isoformat(), args.end.isoformat()), args.end)
+
+    driver.close()
+    logging.info("Finished clustering addresses")
+
+
+if __name__ == "__main__":
+    main()
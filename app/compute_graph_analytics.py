@@ -0,0 +1,37 @@
+import argparse
+import datetime
+import logging
+
+from app.db.connections import connect_neo4j
+from app.db.graph.analytics import export_transfer_graph, write_address_scores
+from app.utils.graph_analytics import compute_address_scores
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] - %(asctime)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Compute PageRank, components and degrees of the address "
+                                                 "transfer graph and store them on Address nodes")
+    parser.add_argument("--end", type=datetime.datetime.fromisoformat, default=datetime.datetime.utcnow())
+    parser.add_argument("--days", type=int, default=30, help="Length of the time window ending at --end")
+    parser.add_argument("--damping", type=float, default=0.85)
+    args = parser.parse_args()
+
+    start = args.end - datetime.timedelta(days=args.days)
+    driver = connect_neo4j()
+
+    logging.info(f"Exporting transfer graph from {start} to {args.end}")
+    graph = export_transfer_graph(driver, start.isoformat(), args.end.isoformat())
+
+    logging.info("Computing address scores")
+    scores = compute_address_scores(graph, args.damping)
+
+    logging.info(f"Writing scores of {len(scores)} addresses")
+    write_address_scores(driver, scores, start.isoformat(), args.end.isoformat(), graph.num_edges)
+
+    driver.close()
+    logging.info("Finished computing graph analytics")
+
+
+if __name__ == "__main__":
+    main()
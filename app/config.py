@@ -1,24 +1,68 @@
 # File: app/config.py
+from functools import lru_cache
+from typing import Dict, Optional
 
-from pydantic import Field
+from pydantic import Field, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
-    cmc_api_key: str = Field(..., env="CMC_API_KEY")
-    neo4j_uri: str = Field(..., env="NEO4J_URI")
-    neo4j_user: str = Field(..., env="NEO4J_USER")
-    neo4j_password: str = Field(..., env="NEO4J_PASSWORD")
-    postgres_db: str = Field(..., env="POSTGRES_DB")
-    postgres_user: str = Field(..., env="POSTGRES_USER")
-    postgres_password: str = Field(..., env="POSTGRES_PASSWORD")
-    postgres_host: str = Field(..., env="POSTGRES_HOST")
+    # Only needed by the provider or backend that uses them; see validate_selected_backends
+    cmc_api_key: Optional[str] = Field(None, env="CMC_API_KEY")
+    neo4j_uri: str = Field("bolt://localhost:7687", env="NEO4J_URI")
+    neo4j_user: str = Field("neo4j", env="NEO4J_USER")
+    neo4j_password: Optional[str] = Field(None, env="NEO4J_PASSWORD")
+    postgres_db: str = Field("cexplorer", env="POSTGRES_DB")
+    postgres_user: str = Field("postgres", env="POSTGRES_USER")
+    postgres_password: Optional[str] = Field(None, env="POSTGRES_PASSWORD")
+    postgres_host: str = Field("localhost", env="POSTGRES_HOST")
+    market_data_provider: str = Field("coinmarketcap", env="MARKET_DATA_PROVIDER")
+    market_data_refresh_seconds: float = Field(60.0, env="MARKET_DATA_REFRESH_SECONDS")
+    market_data_refresh_jitter: float = Field(0.1, env="MARKET_DATA_REFRESH_JITTER")
+    market_data_max_backoff_seconds: float = Field(600.0, env="MARKET_DATA_MAX_BACKOFF_SECONDS")
+    # Backend per routable endpoint (see app.db.repository), e.g. "blocks=postgres,epochs=postgres"
+    read_backends: str = Field("", env="READ_BACKENDS")
+    # Preload the hot reads once Neo4j is reachable, before reporting ready
+    startup_warm_up: bool = Field(False, env="STARTUP_WARM_UP")
+    # Readiness checks re-verify the connections of a ready app at most this often
+    readiness_recheck_seconds: float = Field(5.0, env="READINESS_RECHECK_SECONDS")
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", frozen=True)
 
     def __hash__(self):
         return hash((type(self),) + tuple(self.__dict__.values()))
 
+    @field_validator("read_backends")
+    @classmethod
+    def validate_read_backends(cls, value: str) -> str:
+        for backend in _parse_routes(value).values():
+            if backend not in ("graph", "postgres"):
+                raise ValueError(f"Unknown read backend {backend!r}")
+        return value
 
+    @model_validator(mode="after")
+    def validate_selected_backends(self) -> "Settings":
+        if self.market_data_provider not in ("coinmarketcap", "static"):
+            raise ValueError(f"Unknown market data provider {self.market_data_provider!r}")
+        if self.market_data_provider == "coinmarketcap" and not self.cmc_api_key:
+            raise ValueError("CMC_API_KEY is required with MARKET_DATA_PROVIDER=coinmarketcap")
+        if "postgres" in _parse_routes(self.read_backends).values() and self.postgres_password is None:
+            raise ValueError("POSTGRES_PASSWORD is required when READ_BACKENDS routes endpoints to postgres")
+        return self
+
+    def read_backend(self, endpoint: str) -> str:
+        """Backend serving `endpoint`; endpoints that are not listed in read_backends stay on the graph."""
+        return _parse_routes(self.read_backends).get(endpoint, "graph")
+
+
+def _parse_routes(value: str) -> Dict[str, str]:
+    routes = {}
+    for route in filter(None, (part.strip() for part in value.split(","))):
+        endpoint, _, backend = route.partition("=")
+        routes[endpoint.strip()] = backend.strip()
+    return routes
+
+
+@lru_cache()
 def get_settings() -> Settings:
     return Settings()
@@ -1,63 +1,154 @@
 import logging
 import os
+import time
+from functools import lru_cache
+from typing import Any, Dict, List
 
 from dotenv import load_dotenv
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, Driver
 from neo4j.exceptions import ServiceUnavailable, AuthError
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 
+from app.db.graph.instrumentation import InstrumentedDriver
 from app.db.models.base import Base
+from app.db.pool import TimedQueuePool, TimedAsyncQueuePool, instrument_engine
 
 # Load environment variables from .env file
 load_dotenv()
 
 
-def connect_neo4j():
+def neo4j_retry_delays() -> List[float]:
+    """
+    Seconds to wait between connection attempts: NEO4J_CONNECT_RETRIES retries after the first attempt (default
+    5), starting at NEO4J_CONNECT_BACKOFF_SECONDS (default 1) and doubling up to NEO4J_CONNECT_MAX_BACKOFF_SECONDS
+    (default 30).
+    """
+    retries = int(os.getenv("NEO4J_CONNECT_RETRIES", "5"))
+    backoff = float(os.getenv("NEO4J_CONNECT_BACKOFF_SECONDS", "1"))
+    max_backoff = float(os.getenv("NEO4J_CONNECT_MAX_BACKOFF_SECONDS", "30"))
+    return [min(max_backoff, backoff * 2 ** attempt) for attempt in range(retries)]
+
+
+def create_neo4j_driver() -> Driver:
+    """Neo4j driver for the configured database. No connection is opened until the first session needs one."""
     uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
     user = os.getenv("NEO4J_USER", "neo4j")
     password = os.getenv("NEO4J_PASSWORD", "<your_password>")
 
     driver = GraphDatabase.driver(uri, auth=(user, password))
+    if os.getenv("NEO4J_QUERY_STATS", "true").lower() == "true":
+        return InstrumentedDriver(driver)
+    return driver
 
-    try:
-        driver.verify_connectivity()
-        logging.info(f"Connected to Neo4j at {uri}")
-    except ServiceUnavailable as e:
-        logging.error(f"Failed to connect to Neo4j: {e}")
-        raise
-    except AuthError as e:
-        logging.error(f"Authentication error: {e}")
-        raise
 
-    return driver
+def connect_neo4j():
+    """
+    Neo4j driver whose connectivity has been verified, retrying unavailable databases with the delays of
+    neo4j_retry_delays. Authentication errors are not retried.
+    """
+    driver = create_neo4j_driver()
+    delays = neo4j_retry_delays()
+    for attempt in range(len(delays) + 1):
+        try:
+            driver.verify_connectivity()
+            logging.info(f"Connected to Neo4j at {os.getenv('NEO4J_URI', 'bolt://localhost:7687')}")
+            return driver
+        except ServiceUnavailable as e:
+            if attempt == len(delays):
+                logging.error(f"Failed to connect to Neo4j: {e}")
+                driver.close()
+                raise
+            logging.warning(f"Neo4j unavailable (attempt {attempt + 1}/{len(delays) + 1}), retrying in "
+                            f"{delays[attempt]}s: {e}")
+            time.sleep(delays[attempt])
+        except AuthError as e:
+            logging.error(f"Authentication error: {e}")
+            driver.close()
+            raise
+
 
+@lru_cache()
+def get_shared_neo4j_driver() -> Driver:
+    """
+    Process-wide Neo4j driver. The driver is thread-safe and pools its own connections, so it is shared by all
+    requests instead of being opened and closed per call; streamed responses also need it to outlive the handler.
+    Creating it does not connect, so neither importing nor starting the app waits on Neo4j.
+    """
+    return create_neo4j_driver()
 
-def connect_postgres():
+
+def _postgres_url(dialect: str) -> str:
     dbname = os.getenv("POSTGRES_DB", "cexplorer")
     user = os.getenv("POSTGRES_USER", "postgres")
     password = os.getenv("POSTGRES_PASSWORD")
     host = os.getenv("POSTGRES_HOST", "localhost")
+    return f"postgresql+{dialect}://{user}:{password}@{host}/{dbname}"
+
+
+def _pool_options() -> Dict[str, Any]:
+    return {
+        "pool_size": int(os.getenv("POSTGRES_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("POSTGRES_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("POSTGRES_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("POSTGRES_POOL_RECYCLE", "1800")),
+        # Checks connections on checkout, so that a db-sync restart does not fail requests
+        "pool_pre_ping": os.getenv("POSTGRES_POOL_PRE_PING", "true").lower() == "true"
+    }
+
+
+def _statement_timeout_ms() -> int:
+    # 0 disables the timeout, which the long extraction queries need
+    return int(os.getenv("POSTGRES_STATEMENT_TIMEOUT_MS", "0"))
 
+
+@lru_cache()
+def get_shared_postgres_engine() -> Engine:
+    """
+    Process-wide pooled psycopg2 engine. It does not touch the schema, which belongs to db-sync; see init_db.
+    """
+    engine = create_engine(
+        _postgres_url("psycopg2"),
+        poolclass=TimedQueuePool.named("postgres"),
+        connect_args={"options": f"-c statement_timeout={_statement_timeout_ms()}"},
+        **_pool_options()
+    )
+    logging.info(f"Created Postgres engine for db {engine.url.database} on host {engine.url.host}")
+    return instrument_engine(engine, "postgres")
+
+
+@lru_cache()
+def get_shared_async_postgres_engine() -> AsyncEngine:
+    """
+    Process-wide asyncpg engine for queries issued from async routes, so that they wait on the event loop instead
+    of holding a worker thread. asyncpg prepares every statement, and the prepared statements are cached per
+    connection, so repeated lookups skip planning.
+    """
+    engine = create_async_engine(
+        _postgres_url("asyncpg") + f"?prepared_statement_cache_size="
+                                   f"{int(os.getenv('POSTGRES_STATEMENT_CACHE_SIZE', '500'))}",
+        poolclass=TimedAsyncQueuePool.named("postgres_async"),
+        connect_args={"server_settings": {"statement_timeout": str(_statement_timeout_ms())}},
+        **_pool_options()
+    )
+    logging.info(f"Created async Postgres engine for db {engine.url.database} on host {engine.url.host}")
+    instrument_engine(engine.sync_engine, "postgres_async")
+    return engine
+
+
+def connect_postgres() -> Engine:
     try:
-        engine = create_engine(
-            f'postgresql+psycopg2://{user}:{password}@{host}/{dbname}'
-        )
-        Base.metadata.create_all(engine)
-        logging.info(f"Connected to db {dbname} on host {host}")
+        engine = get_shared_postgres_engine()
+        with engine.connect():
+            pass
+        logging.info(f"Connected to db {engine.url.database} on host {engine.url.host}")
         return engine
     except Exception as e:
-        logging.error(f"Failed to connect to db {dbname} on host {host}: {e}")
+        logging.error(f"Failed to connect to Postgres: {e}")
         raise
 
 
 def init_db():
-    dbname = os.getenv("POSTGRES_DB", "cexplorer")
-    user = os.getenv("POSTGRES_USER", "postgres")
-    password = os.getenv("POSTGRES_PASSWORD")
-    host = os.getenv("POSTGRES_HOST", "localhost")
-
-    engine = create_engine(
-        f'postgresql+psycopg2://{user}:{password}@{host}/{dbname}'
-    )
-    Base.metadata.create_all(engine)
+    """Create the tables of app.db.models that do not exist yet. Run once, explicitly; connecting never does DDL."""
+    Base.metadata.create_all(get_shared_postgres_engine())
     print("Database schema created successfully.")
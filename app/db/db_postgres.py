@@ -1,12 +1,16 @@
 import logging
-from typing import List
+from itertools import groupby
+from typing import Any, Dict, Iterator, List, Optional
 
 from sqlalchemy import select, func
 from sqlalchemy.orm import Session, aliased
 from sqlalchemy.sql.operators import and_
 
-from app.db.models.base import Block, Epoch, TransactionIn, Transaction, TransactionOut, StakeAddress
-from app.models.transactions import InputUTXO, OutputUTXO
+from app.db.models.base import Block, Epoch, TransactionIn, Transaction, TransactionOut, StakeAddress, MultiAsset, \
+    MultiAssetTransactionOut
+from app.models.graph import BlockDetails, Blocks, EpochDetails, Epochs, TransactionUTXOs
+from app.models.transactions import InputUTXO, OutputUTXO, UTXOAsset, CoSpend
+from app.utils.currency_converter import CurrencyConverter
 
 
 def fetch_blocks(session: Session, start_time: str, end_time: str) -> List[Block]:
@@ -165,6 +169,256 @@ def fetch_output_utxos(session: Session, start: str, end: str) -> List[OutputUTX
 
     return [OutputUTXO(**row._asdict()) for row in rows]
 
+
+def fetch_output_assets(session: Session, start: str, end: str) -> List[UTXOAsset]:
+    """
+    Fetch the native assets carried by the outputs created in a time range.
+    :param session: SQLAlchemy session object.
+    :param start: Start time of the range in ISO format.
+    :param end: End time of the range in ISO format.
+    :return: One entry per (output, asset) pair.
+    """
+    logging.info(f"Fetching output assets between: {start} - {end}")
+
+    stmt = (
+        select(
+            func.encode(Transaction.hash, 'hex').label('creating_tx_hash'),
+            TransactionOut.index.label('tx_out_index'),
+            func.encode(MultiAsset.policy, 'hex').label('policy'),
+            func.encode(MultiAsset.name, 'hex').label('name'),
+            MultiAsset.fingerprint,
+            MultiAssetTransactionOut.quantity,
+            Block.time.label('creating_timestamp')
+        )
+        .select_from(MultiAssetTransactionOut)
+        .join(MultiAsset, MultiAsset.id == MultiAssetTransactionOut.ident)
+        .join(TransactionOut, TransactionOut.id == MultiAssetTransactionOut.tx_out_id)
+        .join(Transaction, Transaction.id == TransactionOut.tx_id)
+        .join(Block, Block.id == Transaction.block_id)
+        .where(Block.time >= start, Block.time <= end)
+    )
+
+    result = session.execute(stmt)
+    rows = result.fetchall()
+    logging.info('Number of rows fetched: %s', len(rows))
+
+    return [UTXOAsset(**row._asdict()) for row in rows]
+
+
+def iter_co_spends(session: Session, start: str, end: str, yield_per: int = 50000) -> Iterator[CoSpend]:
+    """
+    Stream the input addresses of every transaction in [start, end) that spends from more than one address. The end
+    is excluded like in app.db.graph.entity.iter_graph_co_spends, since the next incremental run starts from it.
+    Rows are read through a server-side cursor and grouped per transaction, so memory stays bounded by
+    `yield_per` rows. Script addresses are left out: a script spent alongside user inputs says nothing about
+    who controls it.
+    :param session: SQLAlchemy session object.
+    :param start: Start time of the range in ISO format.
+    :param end: End time of the range in ISO format.
+    """
+    logging.info(f"Streaming co-spent addresses between: {start} - {end}")
+
+    stmt = (
+        select(
+            TransactionIn.tx_in_id,
+            func.encode(Transaction.hash, 'hex').label('tx_hash'),
+            TransactionOut.address
+        )
+        .select_from(TransactionIn)
+        .join(Transaction, Transaction.id == TransactionIn.tx_in_id)
+        .join(Block, Block.id == Transaction.block_id)
+        .join(TransactionOut,
+              (TransactionIn.tx_out_id == TransactionOut.tx_id) & (TransactionIn.tx_out_index == TransactionOut.index))
+        .where(Block.time >= start, Block.time < end, TransactionOut.address_has_script.is_(False))
+        .order_by(TransactionIn.tx_in_id)
+        .execution_options(yield_per=yield_per)
+    )
+
+    for (_, tx_hash), rows in groupby(session.execute(stmt), key=lambda row: (row.tx_in_id, row.tx_hash)):
+        addresses = list(dict.fromkeys(row.address for row in rows))
+        if len(addresses) > 1:
+            yield CoSpend(tx_hash=tx_hash, addresses=addresses)
+
+
+# Read path: tabular lookups served straight from db-sync, answering with the same models as their graph counterparts
+
+def _hex(value: Optional[bytes]) -> Optional[str]:
+    return value.hex() if value is not None else None
+
+
+def _block_row(block: Block) -> Dict[str, Any]:
+    return {
+        "hash": block.hash.hex(),
+        "block_id": block.id,
+        "epoch_no": block.epoch_no,
+        "slot_no": block.slot_no,
+        "epoch_slot_no": block.epoch_slot_no,
+        "block_no": block.block_no,
+        "previous_id": block.previous_id,
+        "slot_leader_id": block.slot_leader_id,
+        "size": block.size,
+        "time": block.time,
+        "tx_count": block.tx_count,
+        "proto_major": block.proto_major,
+        "proto_minor": block.proto_minor,
+        "vrf_key": block.vrf_key,
+        "op_cert": _hex(block.op_cert),
+        "op_cert_counter": block.op_cert_counter
+    }
+
+
+def _epoch_row(epoch: Epoch) -> Dict[str, Any]:
+    return {
+        "no": epoch.no,
+        "out_sum": CurrencyConverter.lovelace_to_ada(epoch.out_sum),
+        "fees": CurrencyConverter.lovelace_to_ada(epoch.fees),
+        "start_time": epoch.start_time,
+        "end_time": epoch.end_time
+    }
+
+
+def _parse_hashes(hashes: List[str]) -> Dict[bytes, str]:
+    parsed = {}
+    for value in hashes:
+        try:
+            parsed[bytes.fromhex(value)] = value
+        except ValueError:
+            continue
+    return parsed
+
+
+def get_blocks_details(session: Session, block_hashes: List[str]) -> Dict[str, BlockDetails]:
+    """
+    Postgres counterpart of app.db.graph.block.get_blocks_details: three primary-key/unique-index lookups
+    instead of a traversal.
+    :return: Details keyed by block hash; hashes that were not found are absent.
+    """
+    requested = _parse_hashes(block_hashes)
+    if not requested:
+        return {}
+    blocks = session.scalars(select(Block).where(Block.hash.in_(list(requested)))).all()
+    if not blocks:
+        return {}
+
+    transactions: Dict[int, List[Dict[str, Any]]] = {block.id: [] for block in blocks}
+    times = {block.id: block.time for block in blocks}
+    rows = session.execute(
+        select(Transaction.block_id, Transaction.hash, Transaction.fee)
+        .where(Transaction.block_id.in_(list(transactions)))
+        .order_by(Transaction.block_id, Transaction.block_index)
+    )
+    for row in rows:
+        transactions[row.block_id].append({
+            "tx_hash": row.hash.hex(),
+            "timestamp": times[row.block_id],
+            "fee": CurrencyConverter.lovelace_to_ada(row.fee)
+        })
+
+    epoch_nos = {block.epoch_no for block in blocks if block.epoch_no is not None}
+    epochs = {epoch.no: _epoch_row(epoch) for epoch in
+              session.scalars(select(Epoch).where(Epoch.no.in_(epoch_nos))).all()} if epoch_nos else {}
+
+    return {
+        requested[block.hash]: BlockDetails(
+            block=_block_row(block),
+            transactions=transactions[block.id],
+            epoch=epochs.get(block.epoch_no, {})
+        )
+        for block in blocks
+    }
+
+
+def get_blocks(session: Session, skip: int, limit: int) -> Blocks:
+    """
+    Latest blocks, newest first, read backwards along idx_block_block_no.
+    Epoch boundary blocks have no block number and are not listed; like the graph's count of Block nodes, the total
+    includes them. Block numbers are dense from 0, so the total is the highest one + 1 plus the blocks without one,
+    both read from idx_block_block_no instead of counting the table.
+    """
+    blocks = session.scalars(
+        select(Block).where(Block.block_no.is_not(None)).order_by(Block.block_no.desc()).offset(skip).limit(limit)
+    ).all()
+    highest, unnumbered = session.execute(select(
+        select(func.max(Block.block_no)).scalar_subquery(),
+        select(func.count()).select_from(Block).where(Block.block_no.is_(None)).scalar_subquery()
+    )).one()
+    total_count = (highest + 1 if highest is not None else 0) + unnumbered
+    return Blocks(blocks=[_block_row(block) for block in blocks], total_count=total_count)
+
+
+def get_epoch_details(session: Session, epoch_no: int) -> EpochDetails:
+    epoch = session.scalar(select(Epoch).where(Epoch.no == epoch_no))
+    if epoch is None:
+        return EpochDetails(epoch={}, block_count=0, tx_count=0, total_size=0)
+    totals = session.execute(
+        select(func.count(Block.id).label("block_count"),
+               func.coalesce(func.sum(Block.tx_count), 0).label("tx_count"),
+               func.coalesce(func.sum(Block.size), 0).label("total_size"))
+        .where(Block.epoch_no == epoch_no)
+    ).one()
+    return EpochDetails(
+        epoch=_epoch_row(epoch),
+        block_count=totals.block_count,
+        tx_count=int(totals.tx_count),
+        total_size=int(totals.total_size)
+    )
+
+
+def get_epochs(session: Session, skip: int, limit: int) -> Epochs:
+    epochs = session.scalars(select(Epoch).order_by(Epoch.no.desc()).offset(skip).limit(limit)).all()
+    total_count = session.scalar(select(func.count(Epoch.id)))
+    return Epochs(epochs=[{**_epoch_row(epoch), "block_count": epoch.blk_count} for epoch in epochs],
+                  total_count=total_count)
+
+
+def get_transaction_utxos(session: Session, transaction_hash: str) -> TransactionUTXOs:
+    """
+    Inputs and outputs of a transaction, with the fields of the graph's UTXO nodes. Like those, they leave
+    asset_policy, asset_name and asset_quantity empty: the native assets of an output are listed per asset,
+    see fetch_output_assets.
+    """
+    requested = _parse_hashes([transaction_hash])
+    tx_id = session.scalar(select(Transaction.id).where(Transaction.hash.in_(list(requested)))) if requested else None
+    if tx_id is None:
+        return TransactionUTXOs(inputs=[], outputs=[])
+
+    CreatingTransaction = aliased(Transaction)
+    utxo_columns = (
+        func.encode(CreatingTransaction.hash, 'hex').label('utxo_hash'),
+        TransactionOut.index,
+        TransactionOut.value,
+        Block.time
+    )
+    inputs = session.execute(
+        select(*utxo_columns)
+        .select_from(TransactionIn)
+        .join(TransactionOut,
+              (TransactionIn.tx_out_id == TransactionOut.tx_id) & (TransactionIn.tx_out_index == TransactionOut.index))
+        .join(CreatingTransaction, CreatingTransaction.id == TransactionOut.tx_id)
+        .join(Block, Block.id == CreatingTransaction.block_id)
+        .where(TransactionIn.tx_in_id == tx_id)
+        .order_by(TransactionIn.id)
+    ).all()
+    outputs = session.execute(
+        select(*utxo_columns)
+        .select_from(TransactionOut)
+        .join(CreatingTransaction, CreatingTransaction.id == TransactionOut.tx_id)
+        .join(Block, Block.id == CreatingTransaction.block_id)
+        .where(TransactionOut.tx_id == tx_id)
+        .order_by(TransactionOut.index)
+    ).all()
+
+    def utxo(row) -> Dict[str, Any]:
+        return {
+            "utxo_hash": row.utxo_hash,
+            "index": row.index,
+            "value": CurrencyConverter.lovelace_to_ada(row.value),
+            "timestamp": row.time
+        }
+
+    return TransactionUTXOs(inputs=[utxo(row) for row in inputs], outputs=[utxo(row) for row in outputs])
+
+
 # def fetch_output_utxos(start, end) -> List[Dict[str, Any]]:
 #     query = f"""
 #     SELECT creating_tx.id                     AS tx_id,
@@ -0,0 +1,43 @@
+import os
+from typing import Any, Dict, List, Optional
+
+from neo4j import Driver, GraphDatabase, ManagedTransaction, Record, ResultSummary, Session, READ_ACCESS, \
+    WRITE_ACCESS
+
+# Bookmarks of every write committed by this process. Sessions that use it start after those writes, on whichever
+# cluster member has applied them, so a job reads what it wrote earlier.
+bookmark_manager = GraphDatabase.bookmark_manager()
+
+
+def _database() -> Optional[str]:
+    # Naming the database spares the driver a home database lookup before routing
+    return os.getenv("NEO4J_DATABASE") or None
+
+
+def read_session(driver: Driver, causal: bool = False) -> Session:
+    """
+    Session for reads. On a neo4j:// URI its transactions are routed to followers and read replicas instead of the
+    leader. `causal` reads wait for this process's own writes; the API's reads do not, as they never write.
+    """
+    return driver.session(default_access_mode=READ_ACCESS, database=_database(),
+                          bookmark_manager=bookmark_manager if causal else None)
+
+
+def write_session(driver: Driver) -> Session:
+    """Session for writes, routed to the leader. Its commits are recorded for causal read sessions."""
+    return driver.session(default_access_mode=WRITE_ACCESS, database=_database(), bookmark_manager=bookmark_manager)
+
+
+# Units of work for Session.execute_read and Session.execute_write. Managed transactions are retried on another
+# member when the one serving them fails or stops being the leader, so results are read in full inside them.
+
+def fetch_all(tx: ManagedTransaction, query: str, parameters: Optional[Dict[str, Any]] = None) -> List[Record]:
+    return list(tx.run(query, parameters))
+
+
+def fetch_single(tx: ManagedTransaction, query: str, parameters: Optional[Dict[str, Any]] = None) -> Optional[Record]:
+    return tx.run(query, parameters).single()
+
+
+def consume(tx: ManagedTransaction, query: str, parameters: Optional[Dict[str, Any]] = None) -> ResultSummary:
+    return tx.run(query, parameters).consume()
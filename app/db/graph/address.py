@@ -1,181 +1,670 @@
-from typing import Optional, List
+import logging
+from datetime import datetime, timezone
+from typing import Optional, List, Iterator, Set, Union, Dict
 
 from neo4j import Driver
-from pydantic import ValidationError
 
+from app.db.graph.access import fetch_all, fetch_single, read_session, write_session
 from app.db.graph.db_neo4j import serialize_node, serialize_value
-from app.models.details import AddressDetails
+from app.models.details import AddressDetails, AddressSummary, AddressUTXOs, AddressTransactions
 from app.models.graph import BaseEdge, AddressNode, TransactionNode, BaseNode, UTXONode, \
-    StakeAddressNode, GraphData
+    StakeAddressNode, GraphData, Direction
+from app.models.transactions import Transaction
+from app.utils.cursor import encode_cursor, decode_cursor, iso_datetime, string
+from app.utils.known_set import KnownSet
+from app.utils.single_flight import single_flight
+
+# Per-direction hop from a frontier address `a` to its counterparties `b` through a transaction `t`.
+# `value` is what moved between the two sides of the hop, in ADA.
+_EXPANSION_HOPS = {
+    Direction.OUT: """
+    MATCH (a)-[:OWNS]->(:UTXO)-[:INPUT]->(t:Transaction)
+    WHERE ($start_time IS NULL OR t.timestamp >= datetime($start_time))
+      AND ($end_time IS NULL OR t.timestamp <= datetime($end_time))
+    WITH DISTINCT a, t
+    MATCH (t)-[:OUTPUT]->(u:UTXO)<-[:OWNS]-(b:Address)
+    WHERE b <> a
+    WITH a, t, b, sum(u.value) AS value
+    """,
+    Direction.IN: """
+    MATCH (a)-[:OWNS]->(u:UTXO)<-[:OUTPUT]-(t:Transaction)
+    WHERE ($start_time IS NULL OR t.timestamp >= datetime($start_time))
+      AND ($end_time IS NULL OR t.timestamp <= datetime($end_time))
+    WITH a, t, sum(u.value) AS value
+    MATCH (b:Address)-[:OWNS]->(:UTXO)-[:INPUT]->(t)
+    WHERE b <> a
+    WITH DISTINCT a, t, b, value
+    """,
+}
 
 
+@single_flight
 def get_graph_by_address(driver: Driver, address: str, start_time: Optional[str] = None,
-                         end_time: Optional[str] = None) -> GraphData:
+                         end_time: Optional[str] = None, known: Optional[KnownSet] = None) -> GraphData:
     nodes: List[BaseNode] = []
     edges: List[BaseEdge] = []
 
+    for item in iter_graph_by_address(driver, address, start_time, end_time, known):
+        if isinstance(item, BaseEdge):
+            edges.append(item)
+        else:
+            nodes.append(item)
+
+    return GraphData(nodes=nodes, edges=edges)
+
+
+def iter_graph_by_address(driver: Driver, address: str, start_time: Optional[str] = None,
+                          end_time: Optional[str] = None,
+                          known: Optional[KnownSet] = None) -> Iterator[Union[BaseNode, BaseEdge]]:
+    """
+    Yield the nodes and edges of an address graph as records arrive from the Neo4j cursor.
+    Each node is yielded once, before any edge that references it.
+    :param driver: Neo4j driver.
+    :param address: Address at the centre of the graph.
+    :param start_time: Optional lower bound on transaction timestamps in ISO format.
+    :param end_time: Optional upper bound on transaction timestamps in ISO format.
+    :param known: Nodes the client already has. They are not yielded, their properties are not fetched when
+                  listed by id, and only edges touching at least one new node are yielded. The value of a new
+                  transaction is projected with it, so it does not depend on whether its UTXO is known.
+    """
+    known = known or KnownSet()
+    seen: Set[str] = set()
+    seen_edges: Set[tuple] = set()
+
+    def new_node(node_id: Optional[str]) -> bool:
+        if not node_id or node_id in seen:
+            return False
+        seen.add(node_id)
+        return node_id not in known
+
+    def new_edge(from_id: str, to_id: str, edge_type: str) -> bool:
+        if (from_id, to_id, edge_type) in seen_edges:
+            return False
+        seen_edges.add((from_id, to_id, edge_type))
+        return from_id not in known or to_id not in known
+
     query = """
     MATCH (a:Address {address: $address})
     OPTIONAL MATCH (a)-[:OWNS]->(u:UTXO)-[:INPUT]->(t:Transaction)
     OPTIONAL MATCH (t)-[:OUTPUT]->(u2:UTXO)<-[:OWNS]-(b:Address)
     WHERE ($start_time IS NULL OR t.timestamp >= datetime($start_time))
       AND ($end_time IS NULL OR t.timestamp <= datetime($end_time))
-    RETURN a.address AS address, u.utxo_hash AS input_utxo_hash, u.index AS input_utxo_index, u.value AS input_value,
-           u.asset_policy AS input_asset_policy, u.asset_name AS input_asset_name, u.asset_quantity AS input_asset_quantity,
-           t.tx_hash AS tx_hash, t.timestamp AS timestamp, t.fee AS fee,
-           b.address AS other_address, u2.utxo_hash AS output_utxo_hash, u2.index AS output_utxo_index, u2.value AS output_value,
-           u2.asset_policy AS output_asset_policy, u2.asset_name AS output_asset_name, u2.asset_quantity AS output_asset_quantity
+    WITH a, u AS input, t, b, u2 AS output
+    RETURN a.address AS address, t.tx_hash AS tx_hash, b.address AS other_address,
+           input.utxo_hash AS input_utxo_hash, input.index AS input_utxo_index,
+           CASE WHEN input.utxo_hash + '_' + toString(input.index) IN $known_ids THEN null
+                ELSE input {.value, .asset_policy, .asset_name, .asset_quantity} END AS input_utxo,
+           output.utxo_hash AS output_utxo_hash, output.index AS output_utxo_index,
+           CASE WHEN output.utxo_hash + '_' + toString(output.index) IN $known_ids THEN null
+                ELSE output {.value, .asset_policy, .asset_name, .asset_quantity} END AS output_utxo,
+           CASE WHEN t.tx_hash IN $known_ids THEN null ELSE t {.timestamp, .fee, value: output.value} END AS tx
     UNION
     MATCH (b:Address)-[:OWNS]->(u:UTXO)<-[:OUTPUT]-(t:Transaction)<-[:INPUT]-(u2:UTXO)<-[:OWNS]-(a:Address {address: $address})
     WHERE ($start_time IS NULL OR t.timestamp >= datetime($start_time))
       AND ($end_time IS NULL OR t.timestamp <= datetime($end_time))
-    RETURN a.address AS address, u2.utxo_hash AS input_utxo_hash, u2.index AS input_utxo_index, u2.value AS input_value,
-           u2.asset_policy AS input_asset_policy, u2.asset_name AS input_asset_name, u2.asset_quantity AS input_asset_quantity,
-           t.tx_hash AS tx_hash, t.timestamp AS timestamp, t.fee AS fee,
-           b.address AS other_address, u.utxo_hash AS output_utxo_hash, u.index AS output_utxo_index, u.value AS output_value,
-           u.asset_policy AS output_asset_policy, u.asset_name AS output_asset_name, u.asset_quantity AS output_asset_quantity
+    WITH a, u2 AS input, t, b, u AS output
+    RETURN a.address AS address, t.tx_hash AS tx_hash, b.address AS other_address,
+           input.utxo_hash AS input_utxo_hash, input.index AS input_utxo_index,
+           CASE WHEN input.utxo_hash + '_' + toString(input.index) IN $known_ids THEN null
+                ELSE input {.value, .asset_policy, .asset_name, .asset_quantity} END AS input_utxo,
+           output.utxo_hash AS output_utxo_hash, output.index AS output_utxo_index,
+           CASE WHEN output.utxo_hash + '_' + toString(output.index) IN $known_ids THEN null
+                ELSE output {.value, .asset_policy, .asset_name, .asset_quantity} END AS output_utxo,
+           CASE WHEN t.tx_hash IN $known_ids THEN null ELSE t {.timestamp, .fee, value: output.value} END AS tx
     """
 
-    params = {'address': address, 'start_time': start_time, 'end_time': end_time}
+    params = {'address': address, 'start_time': start_time, 'end_time': end_time, 'known_ids': known.exact_ids}
 
-    with driver.session() as session:
+    # Auto-commit, so that records are yielded as they arrive; the read session still routes it to a reader
+    with read_session(driver) as session:
         result = session.run(query, params)
         for record in result:
             address = serialize_value(record["address"])
-            input_utxo_hash = f"{serialize_value(record["input_utxo_hash"])}_{record["input_utxo_index"]}"
             tx_hash = serialize_value(record["tx_hash"])
             other_address = serialize_value(record["other_address"])
-            output_utxo_hash = f"{serialize_value(record["output_utxo_hash"])}_{record["output_utxo_index"]}"
+            input_utxo_hash = None
+            if record["input_utxo_hash"] is not None:
+                input_utxo_hash = f"{serialize_value(record["input_utxo_hash"])}_{record["input_utxo_index"]}"
+            output_utxo_hash = None
+            if record["output_utxo_hash"] is not None:
+                output_utxo_hash = f"{serialize_value(record["output_utxo_hash"])}_{record["output_utxo_index"]}"
+            input_utxo = record["input_utxo"] or {}
+            output_utxo = record["output_utxo"] or {}
+
+            if new_node(address):
+                yield AddressNode(id=address, type="Address", label=address)
+            if new_node(other_address):
+                yield AddressNode(id=other_address, type="Address", label=other_address)
 
-            if not any(node.id == address for node in nodes):
-                nodes.append(AddressNode(id=address, type="Address", label=address))
-            if other_address and not any(node.id == other_address for node in nodes):
-                nodes.append(AddressNode(id=other_address, type="Address", label=other_address))
+            if not tx_hash:
+                continue
 
-            if input_utxo_hash and not any(node.id == input_utxo_hash for node in nodes):
-                nodes.append(UTXONode(
+            if new_node(tx_hash):
+                tx = record["tx"] or {}
+                yield TransactionNode(
+                    id=tx_hash,
+                    type="Transaction",
+                    tx_hash=tx_hash,
+                    timestamp=tx["timestamp"].isoformat() if tx.get("timestamp") else None,
+                    fee=float(tx.get("fee") or 0),
+                    value=int(tx.get("value") or 0)
+                )
+
+            if new_node(input_utxo_hash):
+                yield UTXONode(
                     id=input_utxo_hash,
                     type="UTXO",
-                    value=int(record["input_value"] or 0),
-                    asset_policy=serialize_value(record["input_asset_policy"]),
-                    asset_name=serialize_value(record["input_asset_name"]),
-                    asset_quantity=int(record["input_asset_quantity"] or 0)
-                ))
-                edges.append(BaseEdge(from_address=address, to_address=input_utxo_hash, type="OWNS"))
-
-            if output_utxo_hash and not any(node.id == output_utxo_hash for node in nodes):
-                nodes.append(UTXONode(
+                    value=int(input_utxo.get("value") or 0),
+                    asset_policy=serialize_value(input_utxo.get("asset_policy")),
+                    asset_name=serialize_value(input_utxo.get("asset_name")),
+                    asset_quantity=int(input_utxo.get("asset_quantity") or 0)
+                )
+            if input_utxo_hash and new_edge(address, input_utxo_hash, "OWNS"):
+                yield BaseEdge(from_address=address, to_address=input_utxo_hash, type="OWNS")
+
+            if new_node(output_utxo_hash):
+                yield UTXONode(
                     id=output_utxo_hash,
                     type="UTXO",
-                    value=int(record["output_value"] or 0),
-                    asset_policy=serialize_value(record["output_asset_policy"]),
-                    asset_name=serialize_value(record["output_asset_name"]),
-                    asset_quantity=int(record["output_asset_quantity"] or 0)
-                ))
-                if other_address:
-                    edges.append(BaseEdge(from_address=other_address, to_address=output_utxo_hash, type="OWNS"))
-
-            if not any(node.id == tx_hash for node in nodes):
-                nodes.append(TransactionNode(
-                    id=tx_hash,
-                    type="Transaction",
-                    tx_hash=tx_hash,
-                    timestamp=record["timestamp"].isoformat() if record["timestamp"] else None,
-                    fee=float(record["fee"] or 0),
-                    value=int(record["output_value"] or 0)
-                ))
+                    value=int(output_utxo.get("value") or 0),
+                    asset_policy=serialize_value(output_utxo.get("asset_policy")),
+                    asset_name=serialize_value(output_utxo.get("asset_name")),
+                    asset_quantity=int(output_utxo.get("asset_quantity") or 0)
+                )
+            if output_utxo_hash and other_address and new_edge(other_address, output_utxo_hash, "OWNS"):
+                yield BaseEdge(from_address=other_address, to_address=output_utxo_hash, type="OWNS")
 
             # Add edges
-            if input_utxo_hash:
-                edges.append(BaseEdge(from_address=input_utxo_hash, to_address=tx_hash, type="INPUT"))
-            if output_utxo_hash:
-                edges.append(BaseEdge(from_address=tx_hash, to_address=output_utxo_hash, type="OUTPUT"))
+            if input_utxo_hash and new_edge(input_utxo_hash, tx_hash, "INPUT"):
+                yield BaseEdge(from_address=input_utxo_hash, to_address=tx_hash, type="INPUT")
+            if output_utxo_hash and new_edge(tx_hash, output_utxo_hash, "OUTPUT"):
+                yield BaseEdge(from_address=tx_hash, to_address=output_utxo_hash, type="OUTPUT")
 
     stake_query = """
     MATCH (a:Address {address: $address})-[:STAKE]->(s:StakeAddress)
     RETURN s.address AS stake_address
     """
 
-    with driver.session() as session:
+    with read_session(driver) as session:
         result = session.run(stake_query, params)
         for record in result:
             stake_address = serialize_value(record["stake_address"])
-            if stake_address and not any(node.id == stake_address for node in nodes):
-                nodes.append(StakeAddressNode(id=stake_address, type="StakeAddress", label=stake_address))
-                edges.append(BaseEdge(from_address=address, to_address=stake_address, type="STAKE"))
+            if new_node(stake_address):
+                yield StakeAddressNode(id=stake_address, type="StakeAddress", label=stake_address)
+            if stake_address and new_edge(params["address"], stake_address, "STAKE"):
+                yield BaseEdge(from_address=params["address"], to_address=stake_address, type="STAKE")
 
-    return GraphData(nodes=nodes, edges=edges)
 
+@single_flight
+def expand_address_graph(driver: Driver, address: str, depth: int = 2, max_nodes: int = 500,
+                         max_fanout_per_node: int = 25, direction: Direction = Direction.BOTH,
+                         min_value: float = 0, start_time: Optional[str] = None,
+                         end_time: Optional[str] = None, known: Optional[KnownSet] = None) -> GraphData:
+    """
+    Bounded breadth-first expansion of the address-to-address transfer graph around `address`.
+    Each hop is one UNWIND query over the whole frontier, so a k-hop graph costs k round trips per direction.
+    Transfers below `min_value` or outside the time window are pruned. Every node keeps at most
+    `max_fanout_per_node` counterparties (largest transfers first), and expansion stops once `max_nodes` are
+    collected. Addresses whose neighbourhood was cut short by either cap, or left unexpanded at the last hop,
+    are returned with `truncated=True`.
+    Nodes in `known` are still traversed but neither returned nor counted against `max_nodes`, and only edges
+    touching at least one new node are returned.
+    :return: Address and Transaction nodes with INPUT_TRANSACTION/OUTPUT_TRANSACTION edges.
+    """
+    known = known or KnownSet()
+    directions = [Direction.OUT, Direction.IN] if direction == Direction.BOTH else [direction]
+    nodes: Dict[str, BaseNode] = {address: AddressNode(id=address, type="Address", label=address, depth=0)}
+    edges: List[BaseEdge] = []
+    edge_keys: Set[tuple] = set()
+    frontier = [address]
+    new_nodes = 0 if address in known else 1
+
+    def add_edge(from_id: str, to_id: str, edge_type: str):
+        if (from_id, to_id, edge_type) not in edge_keys:
+            edge_keys.add((from_id, to_id, edge_type))
+            edges.append(BaseEdge(from_address=from_id, to_address=to_id, type=edge_type))
+
+    with read_session(driver) as session:
+        for hop in range(1, depth + 1):
+            next_frontier: List[str] = []
+            budget_exhausted = False
+
+            for hop_direction in directions:
+                query = f"""
+                UNWIND $frontier AS source
+                MATCH (a:Address {{address: source}})
+                {_EXPANSION_HOPS[hop_direction]}
+                WHERE value >= $min_value
+                WITH a, t, b, value
+                ORDER BY value DESC
+                WITH a, collect({{tx_hash: t.tx_hash, counterparty: b.address, value: value,
+                                  tx: CASE WHEN t.tx_hash IN $known_ids THEN null ELSE t {{.timestamp, .fee}} END
+                                }}) AS transfers
+                RETURN a.address AS address, transfers[0..$max_fanout] AS transfers,
+                       size(transfers) > $max_fanout AS truncated
+                """
+                params = {
+                    "frontier": frontier,
+                    "min_value": min_value,
+                    "max_fanout": max_fanout_per_node,
+                    "start_time": start_time,
+                    "end_time": end_time,
+                    "known_ids": known.exact_ids
+                }
+
+                for record in session.execute_read(fetch_all, query, params):
+                    source = record["address"]
+                    if record["truncated"]:
+                        nodes[source].truncated = True
 
-def get_address_details(driver: Driver, address_hash: str) -> AddressDetails:
+                    for transfer in record["transfers"]:
+                        counterparty = transfer["counterparty"]
+                        tx_hash = serialize_value(transfer["tx_hash"])
+                        new_ids = [node_id for node_id in (tx_hash, counterparty)
+                                   if node_id not in nodes and node_id not in known]
+                        if new_nodes + len(new_ids) > max_nodes:
+                            nodes[source].truncated = True
+                            budget_exhausted = True
+                            break
+
+                        new_nodes += len(new_ids)
+
+                        if tx_hash not in nodes and tx_hash not in known:
+                            tx = transfer["tx"] or {}
+                            nodes[tx_hash] = TransactionNode(
+                                id=tx_hash,
+                                type="Transaction",
+                                tx_hash=tx_hash,
+                                timestamp=tx["timestamp"].isoformat() if tx.get("timestamp") else None,
+                                fee=float(tx.get("fee") or 0),
+                                value=int(transfer["value"] or 0)
+                            )
+                        if counterparty not in nodes:
+                            nodes[counterparty] = AddressNode(id=counterparty, type="Address", label=counterparty,
+                                                              depth=hop)
+                            next_frontier.append(counterparty)
+
+                        sender, receiver = (source, counterparty) if hop_direction == Direction.OUT \
+                            else (counterparty, source)
+                        add_edge(sender, tx_hash, "INPUT_TRANSACTION")
+                        add_edge(tx_hash, receiver, "OUTPUT_TRANSACTION")
+
+                    if budget_exhausted:
+                        break
+                if budget_exhausted:
+                    break
+
+            if budget_exhausted:
+                # The rest of this hop was never looked at, so none of its sources can be trusted as complete
+                next_frontier.extend(frontier)
+            frontier = next_frontier
+            if budget_exhausted or not frontier:
+                break
+
+    # Whatever is left on the frontier was discovered but never (fully) expanded
+    for node_id in frontier:
+        nodes[node_id].truncated = True
+
+    return GraphData(nodes=[node for node_id, node in nodes.items() if node_id not in known],
+                     edges=[edge for edge in edges if edge.from_address not in known or edge.to_address not in known])
+
+
+@single_flight
+def get_address_details(driver: Driver, address_hash: str, recent_limit: int = 10) -> AddressDetails:
+    """
+    Address details from the counters maintained at ingestion plus the `recent_limit` most recent transactions,
+    read from the (address, timestamp) index on PARTICIPATED. UTXOs are served separately by get_address_utxos.
+    """
     query = """
     MATCH (a:Address {address: $address_hash})
-    OPTIONAL MATCH (a)-[:OWNS]->(u:UTXO)
     OPTIONAL MATCH (a)-[:STAKE]->(s:StakeAddress)
+    CALL {
+        OPTIONAL MATCH (:Address)-[p:PARTICIPATED]->(t:Transaction)
+        WHERE p.address = $address_hash
+        WITH p, t
+        ORDER BY p.timestamp DESC
+        LIMIT $recent_limit
+        RETURN collect(CASE WHEN t IS NOT NULL
+                            THEN {tx_hash: t.tx_hash, timestamp: t.timestamp, fee: t.fee, net_value: p.net_value}
+                       END) AS recent_transactions
+    }
+    RETURN a, s.address AS stake_address, s.balance AS stake_balance, recent_transactions
+    """
+
+    with read_session(driver) as session:
+        record = session.execute_read(fetch_single, query, {"address_hash": address_hash,
+                                                            "recent_limit": recent_limit})
+        if not record:
+            return AddressDetails(id=address_hash, transactions=0, balance="0", value="0", stake_address=None,
+                                  total_stake="0", pool_name=None, reward_balance="0", highest_balance="0",
+                                  lowest_balance="0", balance_history=[], recent_transactions=[])
+
+        address = record["a"]
+        balance = address.get("balance") or 0
+        recent_transactions = [serialize_value(tx) for tx in record["recent_transactions"]]
+
+        # Walk back from the current balance through the recent transactions
+        balance_history = []
+        running_balance = balance
+        for tx in recent_transactions:
+            balance_history.append({"time": tx["timestamp"], "balance": str(running_balance)})
+            running_balance -= tx["net_value"] or 0
+        balance_history.reverse()
+
+        return AddressDetails(
+            id=address["address"],
+            transactions=address.get("transaction_count") or 0,
+            balance=str(balance),
+            value=str(balance),  # You might want to fetch ADA price and calculate USD value
+            stake_address=serialize_value(record["stake_address"]),
+            total_stake=str(record["stake_balance"] or 0) if record["stake_address"] else "0",
+            # Delegations and rewards are not ingested yet
+            pool_name=None,
+            reward_balance="0",
+            highest_balance=str(address.get("highest_balance") or balance),
+            lowest_balance=str(address.get("lowest_balance") or 0),
+            utxo_count=address.get("utxo_count") or 0,
+            first_activity=serialize_value(address.get("first_activity")),
+            last_activity=serialize_value(address.get("last_activity")),
+            balance_history=balance_history,
+            recent_transactions=recent_transactions
+        )
+
+
+@single_flight
+def get_address_transactions(driver: Driver, address_hash: str, cursor: Optional[str] = None, size: int = 50,
+                             ascending: bool = False) -> AddressTransactions:
+    """
+    One page of an address's transaction history, as a keyset read of the (address, timestamp) index on
+    PARTICIPATED that starts right after `cursor`, so the cost depends on the page size only.
+    :raise ValueError: if `cursor` is malformed.
+    """
+    params = {
+        "address_hash": address_hash,
+        # One extra row tells whether there is a next page
+        "limit": size + 1
+    }
+    # Operators and sort order cannot be parameters; both come from the boolean `ascending`
+    comparison, order = (">", "ASC") if ascending else ("<", "DESC")
+    keyset = ""
+    if cursor:
+        after = decode_cursor(cursor, {"timestamp": iso_datetime, "tx_hash": string})
+        params.update(after_timestamp=after["timestamp"], after_tx_hash=after["tx_hash"])
+        # The range on p.timestamp alone is what the index seeks to; the tx_hash tie-break is a filter on top
+        keyset = f"""
+      AND p.timestamp {comparison}= datetime($after_timestamp)
+      AND (p.timestamp {comparison} datetime($after_timestamp) OR p.tx_hash {comparison} $after_tx_hash)"""
+    query = f"""
+    MATCH (:Address)-[p:PARTICIPATED]->(t:Transaction)
+    WHERE p.address = $address_hash{keyset}
+    WITH p, t
+    ORDER BY p.timestamp {order}, p.tx_hash {order}
+    LIMIT $limit
+    RETURN t.tx_hash AS tx_hash, t.timestamp AS timestamp, t.fee AS fee, p.net_value AS net_value,
+           [(a:Address)-[:OWNS]->(u:UTXO)-[:INPUT]->(t) | {{address: a.address, value: u.value}}] AS inputs,
+           [(t)-[:OUTPUT]->(u:UTXO)<-[:OWNS]-(a:Address) | {{address: a.address, value: u.value}}] AS outputs
+    """
+    with read_session(driver) as session:
+        result = session.execute_read(fetch_all, query, params)
+        transactions = [serialize_value(record.data()) for record in result]
+
+    next_cursor = None
+    if len(transactions) > size:
+        transactions = transactions[:size]
+        last = transactions[-1]
+        next_cursor = encode_cursor({"timestamp": last["timestamp"], "tx_hash": last["tx_hash"]})
+    return AddressTransactions(address=address_hash, transactions=transactions, next_cursor=next_cursor)
+
+
+@single_flight
+def get_address_utxos(driver: Driver, address_hash: str, unspent_only: bool = True, page: int = 0,
+                      size: int = 50) -> AddressUTXOs:
+    """
+    One page of an address's UTXOs, newest first.
+    """
+    query = """
+    MATCH (a:Address {address: $address_hash})-[:OWNS]->(u:UTXO)
+    WHERE NOT $unspent_only OR NOT (u)-[:INPUT]->(:Transaction)
+    WITH u
+    ORDER BY u.timestamp DESC, u.utxo_hash, u.index
+    SKIP $skip
+    LIMIT $limit
     OPTIONAL MATCH (u)-[:INPUT]->(t:Transaction)
-    WITH a, s, collect(distinct u) AS utxos, collect(distinct t) AS transactions
-    OPTIONAL MATCH (a)-[:OWNS]->(currentUTXO:UTXO)
-    WHERE NOT (currentUTXO)-[:INPUT]->(:Transaction)
-    WITH a, s, utxos, transactions, sum(currentUTXO.value) AS current_balance
-    OPTIONAL MATCH (a)-[:OWNS]->(histUTXO:UTXO)
-    WHERE histUTXO.timestamp >= datetime() - duration('P30D')
-    WITH a, s, utxos, transactions, current_balance, histUTXO
-    ORDER BY histUTXO.timestamp
-    WITH a, s, utxos, transactions, current_balance, 
-         collect(histUTXO.value) AS historical_balances,
-         collect(histUTXO.timestamp) AS balance_timestamps
-    RETURN 
-        a.address AS address,
-        s.address AS stake_address,
-        current_balance AS balance,
-        size(transactions) AS transaction_count,
-        utxos,
-        transactions,
-        historical_balances,
-        balance_timestamps,
-        CASE WHEN s IS NOT NULL THEN true ELSE false END AS is_staked,
-        s.pool_id AS pool_id,
-        s.rewards AS stake_rewards
-    """
-
-    with driver.session() as session:
-        result = session.run(query, {"address_hash": address_hash})
-        record = result.single()
-        if record:
-            try:
-                # Calculate highest and lowest balance
-                historical_balances = record["historical_balances"]
-                highest_balance = max(historical_balances) if historical_balances else record["balance"]
-                lowest_balance = min(historical_balances) if historical_balances else record["balance"]
-
-                # Create balance history for chart
-                balance_history = [
-                    {"time": timestamp.strftime("%Y-%m-%d %H:%M:%S"), "balance": balance}
-                    for timestamp, balance in zip(record["balance_timestamps"], historical_balances)
-                ]
-
-                return AddressDetails(
-                    id=serialize_value(record["address"]),
-                    transactions=record["transaction_count"],
-                    balance=str(record["balance"]),
-                    value=str(record["balance"]),  # You might want to fetch ADA price and calculate USD value
-                    stake_address=serialize_value(record["stake_address"]),
-                    total_stake=str(record["balance"]) if record["is_staked"] else "0",
-                    pool_name=record["pool_id"],  # You might want to fetch pool name from pool_id
-                    reward_balance=str(record["stake_rewards"]),
-                    highest_balance=str(highest_balance),
-                    lowest_balance=str(lowest_balance),
-                    balance_history=balance_history,
-                    utxos=[serialize_node(utxo) for utxo in record["utxos"]],
-                    recent_transactions=[serialize_node(tx) for tx in record["transactions"][:10]]
-                    # Last 10 transactions
+    RETURN u, t.tx_hash AS spent_by
+    """
+    params = {"address_hash": address_hash, "unspent_only": unspent_only, "skip": page * size, "limit": size}
+    with read_session(driver) as session:
+        result = session.execute_read(fetch_all, query, params)
+        utxos = [{**serialize_node(record["u"]), "spent_by": record["spent_by"]} for record in result]
+    return AddressUTXOs(address=address_hash, utxos=utxos, page=page, page_size=size)
+
+
+def _naive_utc(value) -> Optional[datetime]:
+    # Neo4j hands back zoned DateTimes while db-sync timestamps are naive UTC
+    if value is None:
+        return None
+    if hasattr(value, "to_native"):
+        value = value.to_native()
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _transaction_timestamp(tx: Transaction) -> Optional[datetime]:
+    if tx.outputs:
+        return _naive_utc(tx.outputs[0].creating_timestamp)
+    if tx.inputs:
+        return _naive_utc(tx.inputs[0].consuming_timestamp)
+    return None
+
+
+def update_address_aggregates(driver: Driver, transactions: Dict[str, Transaction]):
+    """
+    Apply `transactions` to the counters kept on their Address nodes: balance, unspent UTXO count, transaction
+    count, first/last activity and the highest/lowest balance reached after any transaction.
+    Also links every address to the transactions it took part in with a PARTICIPATED relationship carrying the
+    address, timestamp and net value, indexed on (address, timestamp) to serve history pages.
+    Transactions are applied in chronological order and each one only once, so re-ingesting a range is a no-op.
+    The marker recording it on the Transaction nodes is listed in db_neo4j.BOOKKEEPING_PROPERTIES, which keeps it
+    out of responses.
+    Must run after the transactions have been inserted with insert_utxos.
+    """
+    with write_session(driver) as session:
+        session.run("CREATE INDEX IF NOT EXISTS FOR ()-[p:PARTICIPATED]-() ON (p.address, p.timestamp)")
+        with session.begin_transaction() as tx:
+            pending = {
+                record["tx_hash"] for record in tx.run(
+                    """
+                    UNWIND $tx_hashes AS tx_hash
+                    MATCH (t:Transaction {tx_hash: tx_hash})
+                    WHERE t.address_counters_applied IS NULL
+                    RETURN t.tx_hash AS tx_hash
+                    """,
+                    {"tx_hashes": list(transactions)}
+                )
+            }
+
+            # Net effect of every pending transaction on each address it touches
+            changes = []
+            for tx_hash in pending:
+                transaction = transactions[tx_hash]
+                timestamp = _transaction_timestamp(transaction)
+                if timestamp is None:
+                    continue
+                deltas: Dict[str, List[float]] = {}
+                for output_utxo in transaction.outputs:
+                    delta = deltas.setdefault(output_utxo.output_address, [0.0, 0])
+                    delta[0] += int(output_utxo.output_value) / 1000000
+                    delta[1] += 1
+                for input_utxo in transaction.inputs:
+                    delta = deltas.setdefault(input_utxo.input_address, [0.0, 0])
+                    delta[0] -= int(input_utxo.input_value) / 1000000
+                    delta[1] -= 1
+                changes.append((timestamp, transaction.block_index, tx_hash, deltas))
+            changes.sort(key=lambda change: (change[0], change[1]))
+
+            addresses = list({address for _, _, _, deltas in changes for address in deltas})
+            current = {
+                record["address"]: record["counters"] for record in tx.run(
+                    """
+                    UNWIND $addresses AS address
+                    MATCH (a:Address {address: address})
+                    RETURN address, a {.balance, .utxo_count, .transaction_count, .highest_balance,
+                                       .lowest_balance, .first_activity, .last_activity} AS counters
+                    """,
+                    {"addresses": addresses}
+                )
+            }
+
+            counters: Dict[str, dict] = {}
+            participations = []
+            for timestamp, _, tx_hash, deltas in changes:
+                for address, (value, utxos) in deltas.items():
+                    participations.append({"address": address, "tx_hash": tx_hash, "timestamp": timestamp,
+                                           "net_value": value})
+                    if address not in counters:
+                        stored = current.get(address) or {}
+                        counters[address] = {
+                            "address": address,
+                            "balance": stored.get("balance") or 0.0,
+                            "utxo_count": stored.get("utxo_count") or 0,
+                            "transaction_count": stored.get("transaction_count") or 0,
+                            "highest_balance": stored.get("highest_balance"),
+                            "lowest_balance": stored.get("lowest_balance"),
+                            "first_activity": _naive_utc(stored.get("first_activity")),
+                            "last_activity": _naive_utc(stored.get("last_activity"))
+                        }
+                    counter = counters[address]
+                    counter["balance"] += value
+                    counter["utxo_count"] += utxos
+                    counter["transaction_count"] += 1
+                    balance = counter["balance"]
+                    if counter["highest_balance"] is None or balance > counter["highest_balance"]:
+                        counter["highest_balance"] = balance
+                    if counter["lowest_balance"] is None or balance < counter["lowest_balance"]:
+                        counter["lowest_balance"] = balance
+                    if counter["first_activity"] is None or timestamp < counter["first_activity"]:
+                        counter["first_activity"] = timestamp
+                    if counter["last_activity"] is None or timestamp > counter["last_activity"]:
+                        counter["last_activity"] = timestamp
+
+            tx.run(
+                """
+                UNWIND $counters AS counter
+                MATCH (a:Address {address: counter.address})
+                SET a.balance = counter.balance,
+                    a.utxo_count = counter.utxo_count,
+                    a.transaction_count = counter.transaction_count,
+                    a.highest_balance = counter.highest_balance,
+                    a.lowest_balance = counter.lowest_balance,
+                    a.first_activity = datetime(counter.first_activity),
+                    a.last_activity = datetime(counter.last_activity)
+                """,
+                {"counters": list(counters.values())}
+            )
+            tx.run(
+                """
+                UNWIND $participations AS participation
+                MATCH (a:Address {address: participation.address})
+                MATCH (t:Transaction {tx_hash: participation.tx_hash})
+                MERGE (a)-[p:PARTICIPATED]->(t)
+                SET p.address = participation.address,
+                    p.tx_hash = participation.tx_hash,
+                    p.timestamp = datetime(participation.timestamp),
+                    p.net_value = participation.net_value
+                """,
+                {"participations": participations}
+            )
+            tx.run(
+                """
+                UNWIND $tx_hashes AS tx_hash
+                MATCH (t:Transaction {tx_hash: tx_hash})
+                SET t.address_counters_applied = true
+                """,
+                {"tx_hashes": list(pending)}
+            )
+
+    logging.info(f"Updated counters of {len(counters)} addresses from {len(changes)} transactions")
+
+
+def rebuild_address_aggregates(driver: Driver):
+    """
+    Recompute the counters and PARTICIPATED relationships of every address from its full history, for graphs
+    ingested before they were maintained.
+    """
+    with write_session(driver) as session:
+        session.run("CREATE INDEX IF NOT EXISTS FOR ()-[p:PARTICIPATED]-() ON (p.address, p.timestamp)")
+        session.run(
+            """
+            MATCH (a:Address)
+            CALL {
+                WITH a
+                OPTIONAL MATCH (a)-[:OWNS]->(u:UTXO)-[r:INPUT|OUTPUT]-(t:Transaction)
+                WITH a, t, sum(CASE type(r) WHEN 'OUTPUT' THEN u.value ELSE -u.value END) AS net_value,
+                     sum(CASE type(r) WHEN 'OUTPUT' THEN 1 ELSE -1 END) AS net_utxos
+                FOREACH (_ IN CASE WHEN t IS NULL THEN [] ELSE [1] END |
+                    MERGE (a)-[p:PARTICIPATED]->(t)
+                    SET p.address = a.address, p.tx_hash = t.tx_hash, p.timestamp = t.timestamp,
+                        p.net_value = net_value
                 )
-            except ValidationError as e:
-                print(f"Validation error: {e}")
-                # You might want to log this error or handle it in some way
-                return AddressDetails(id=address_hash, transactions=0, balance="0", value="0", stake_address=None,
-                                      total_stake="0", pool_name=None, reward_balance="0", highest_balance="0",
-                                      lowest_balance="0", balance_history=[], utxos=[], recent_transactions=[])
-        return AddressDetails(id=address_hash, transactions=0, balance="0", value="0", stake_address=None,
-                              total_stake="0", pool_name=None, reward_balance="0", highest_balance="0",
-                              lowest_balance="0", balance_history=[], utxos=[], recent_transactions=[])
+                WITH a, t, net_value, net_utxos
+                ORDER BY t.timestamp
+                WITH a, collect(CASE WHEN t IS NOT NULL THEN {timestamp: t.timestamp, net_value: net_value} END)
+                        AS history, sum(net_utxos) AS utxo_count
+                WITH a, history, utxo_count,
+                     reduce(state = {balance: 0.0, highest: null, lowest: null}, change IN history |
+                         {balance: state.balance + change.net_value,
+                          highest: CASE WHEN state.highest IS NULL OR state.balance + change.net_value > state.highest
+                                        THEN state.balance + change.net_value ELSE state.highest END,
+                          lowest: CASE WHEN state.lowest IS NULL OR state.balance + change.net_value < state.lowest
+                                       THEN state.balance + change.net_value ELSE state.lowest END}) AS totals
+                SET a.balance = totals.balance,
+                    a.utxo_count = utxo_count,
+                    a.transaction_count = size(history),
+                    a.highest_balance = totals.highest,
+                    a.lowest_balance = totals.lowest,
+                    a.first_activity = history[0].timestamp,
+                    a.last_activity = history[-1].timestamp
+            } IN TRANSACTIONS OF 1000 ROWS
+            """
+        )
+        session.run(
+            """
+            MATCH (t:Transaction) WHERE t.address_counters_applied IS NULL
+            CALL { WITH t SET t.address_counters_applied = true } IN TRANSACTIONS OF 10000 ROWS
+            """
+        )
+    logging.info("Rebuilt address counters")
+
+
+@single_flight
+def get_address_summaries(driver: Driver, addresses: List[str]) -> Dict[str, AddressSummary]:
+    """
+    Resolve balance, transaction count and stake address of many addresses with a single UNWIND query.
+    :return: Summaries keyed by address; addresses that were not found are absent.
+    """
+    query = """
+    UNWIND $addresses AS address
+    MATCH (a:Address {address: address})
+    OPTIONAL MATCH (a)-[:STAKE]->(s:StakeAddress)
+    CALL {
+        WITH a
+        OPTIONAL MATCH (a)-[:OWNS]->(u:UTXO)
+        OPTIONAL MATCH (u)-[:INPUT]->(t:Transaction)
+        RETURN sum(CASE WHEN t IS NULL THEN u.value ELSE 0 END) AS balance,
+               count(DISTINCT t) AS transaction_count
+    }
+    RETURN address, s.address AS stake_address, a.entity_id AS entity_id, balance, transaction_count
+    """
+    summaries = {}
+    with read_session(driver) as session:
+        result = session.execute_read(fetch_all, query, {"addresses": addresses})
+        for record in result:
+            summaries[record["address"]] = AddressSummary(
+                id=record["address"],
+                stake_address=serialize_value(record["stake_address"]),
+                entity_id=record["entity_id"],
+                balance=str(record["balance"]),
+                transactions=record["transaction_count"]
+            )
+    return summaries
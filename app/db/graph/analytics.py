@@ -0,0 +1,149 @@
+import logging
+from typing import List, Optional
+
+from neo4j import Driver
+
+from app.db.graph.access import consume, fetch_all, fetch_single, read_session, write_session
+from app.db.graph.db_neo4j import serialize_value
+from app.models.analytics import RankingMetric, AddressScore, AnalyticsRun, TopAddresses
+from app.utils.graph_analytics import TransferGraph, TransferGraphBuilder
+from app.utils.single_flight import single_flight
+
+ANALYTICS_RUN = "address_analytics"
+
+
+def create_analytics_indexes(driver: Driver):
+    """
+    Indexes used by the analytics jobs and endpoints. The jobs create them as well; this is for setting up a schema
+    without running them.
+    """
+    with write_session(driver) as session:
+        session.run("CREATE INDEX IF NOT EXISTS FOR (t:Transaction) ON (t.timestamp)")
+        for metric in RankingMetric:
+            session.run(f"CREATE INDEX IF NOT EXISTS FOR (a:Address) ON (a.{metric.value})")
+
+
+def export_transfer_graph(driver: Driver, start_time: str, end_time: str) -> TransferGraph:
+    """
+    Address-to-address transfers of every transaction in [start_time, end_time), summed per address pair and
+    streamed straight into array form.
+    """
+    query = """
+    MATCH (t:Transaction)
+    WHERE t.timestamp >= datetime($start_time) AND t.timestamp < datetime($end_time)
+    MATCH (a:Address)-[:OWNS]->(:UTXO)-[:INPUT]->(t)-[:OUTPUT]->(u:UTXO)<-[:OWNS]-(b:Address)
+    WHERE a <> b
+    RETURN a.address AS from, b.address AS to, sum(u.value) AS value
+    """
+    builder = TransferGraphBuilder()
+    with write_session(driver) as session:
+        session.run("CREATE INDEX IF NOT EXISTS FOR (t:Transaction) ON (t.timestamp)")
+    # Auto-commit, so that the transfers are streamed instead of held in memory twice
+    with read_session(driver) as session:
+        result = session.run(query, {"start_time": start_time, "end_time": end_time})
+        for record in result:
+            builder.add(record["from"], record["to"], record["value"])
+    graph = builder.build()
+    logging.info(f"Exported transfer graph with {graph.num_nodes} addresses and {graph.num_edges} transfers")
+    return graph
+
+
+def write_address_scores(driver: Driver, scores: List[dict], start_time: str, end_time: str, transfer_count: int,
+                         batch_size: int = 10000):
+    """
+    Store the analytics of every address in `scores` as indexed Address properties, drop the scores of addresses
+    left over from a previous run, and record the run.
+    """
+    with write_session(driver) as session:
+        for metric in RankingMetric:
+            session.run(f"CREATE INDEX IF NOT EXISTS FOR (a:Address) ON (a.{metric.value})")
+
+        run_id = session.execute_write(
+            fetch_single,
+            """
+            MERGE (r:AnalyticsRun {name: $name})
+            SET r.run_id = coalesce(r.run_id, 0) + 1
+            RETURN r.run_id AS run_id
+            """,
+            {"name": ANALYTICS_RUN}
+        )["run_id"]
+
+        for i in range(0, len(scores), batch_size):
+            session.execute_write(
+                consume,
+                """
+                UNWIND $scores AS score
+                MATCH (a:Address {address: score.address})
+                SET a.pagerank = score.pagerank,
+                    a.component_id = score.component_id,
+                    a.component_size = score.component_size,
+                    a.in_degree = score.in_degree,
+                    a.out_degree = score.out_degree,
+                    a.analytics_run = $run_id
+                """,
+                {"scores": scores[i:i + batch_size], "run_id": run_id}
+            )
+            logging.info(f"Wrote scores of {min(i + batch_size, len(scores))}/{len(scores)} addresses")
+
+        session.run(
+            """
+            MATCH (a:Address) WHERE a.pagerank IS NOT NULL AND a.analytics_run <> $run_id
+            CALL {
+                WITH a
+                REMOVE a.pagerank, a.component_id, a.component_size, a.in_degree, a.out_degree, a.analytics_run
+            } IN TRANSACTIONS OF 10000 ROWS
+            """,
+            {"run_id": run_id}
+        )
+
+        session.execute_write(
+            consume,
+            """
+            MATCH (r:AnalyticsRun {name: $name})
+            SET r.start_time = datetime($start_time),
+                r.end_time = datetime($end_time),
+                r.computed_at = datetime(),
+                r.address_count = $address_count,
+                r.transfer_count = $transfer_count
+            """,
+            {"name": ANALYTICS_RUN, "start_time": start_time, "end_time": end_time,
+             "address_count": len(scores), "transfer_count": transfer_count}
+        )
+
+
+def get_analytics_run(driver: Driver) -> Optional[AnalyticsRun]:
+    with read_session(driver) as session:
+        record = session.execute_read(fetch_single, "MATCH (r:AnalyticsRun {name: $name}) "
+                                                    "WHERE r.computed_at IS NOT NULL RETURN r",
+                                      {"name": ANALYTICS_RUN})
+        if not record:
+            return None
+        run = record["r"]
+        return AnalyticsRun(
+            start_time=serialize_value(run["start_time"]),
+            end_time=serialize_value(run["end_time"]),
+            computed_at=serialize_value(run["computed_at"]),
+            address_count=run["address_count"],
+            transfer_count=run["transfer_count"]
+        )
+
+
+@single_flight
+def get_top_addresses(driver: Driver, metric: RankingMetric, limit: int = 100) -> TopAddresses:
+    """
+    Highest-scoring addresses of the last analytics run. The ORDER BY ... LIMIT is answered from the range index
+    on the metric property, so no traversal happens at request time.
+    """
+    # Property names cannot be parameters; `metric` is restricted to the RankingMetric values
+    query = f"""
+    MATCH (a:Address)
+    WHERE a.{metric.value} IS NOT NULL
+    RETURN a.address AS address, a.pagerank AS pagerank, a.component_id AS component_id,
+           a.component_size AS component_size, a.in_degree AS in_degree, a.out_degree AS out_degree
+    ORDER BY a.{metric.value} DESC
+    LIMIT $limit
+    """
+    with read_session(driver) as session:
+        result = session.execute_read(fetch_all, query, {"limit": limit})
+        addresses = [AddressScore(**record.data()) for record in result]
+    return TopAddresses(metric=metric, run=get_analytics_run(driver), addresses=addresses)
@@ -1,86 +1,316 @@
-from typing import List, Optional
+import logging
+from typing import List, Optional, Dict
 
 from neo4j import Driver
 
-from app.db.graph.db_neo4j import parse_timestamp
+from app.db.graph.access import consume, fetch_all, fetch_single, read_session, write_session
+from app.db.graph.db_neo4j import parse_timestamp, serialize_node, serialize_value
+from app.models.details import AddressTokens, TokenHolding
 from app.models.graph import BaseNode, BaseEdge, GraphData, AddressNode, TransactionNode, StakeAddressNode, AssetDetails
+from app.models.transactions import UTXOAsset, Transaction
+from app.utils.cursor import decode_cursor, encode_cursor, integer, string
+from app.utils.single_flight import single_flight
 
+# Fulltext index over asset names, used by search
+ASSET_NAME_INDEX = "asset_names"
+# Serves the holdings of an address in (quantity, fingerprint) order, see get_address_holdings
+HOLDS_INDEX = "CREATE INDEX IF NOT EXISTS FOR ()-[h:HOLDS]-() ON (h.address, h.quantity, h.fingerprint)"
 
+
+def _display_name(hex_name: Optional[str]) -> Optional[str]:
+    """Asset names are arbitrary bytes; show them as text when they are printable UTF-8, as hex otherwise."""
+    if not hex_name:
+        return None
+    try:
+        name = bytes.fromhex(hex_name).decode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        return hex_name
+    return name if name.isprintable() else hex_name
+
+
+def insert_assets(driver: Driver, assets: List[UTXOAsset], batch_size: int = 1000):
+    """
+    Insert native assets into graph and link them to the UTXOs carrying them and the transactions creating those UTXOs.
+    Also adds what the UTXOs carry to the HOLDS index of their owners, see release_spent_holdings.
+    Must run after the UTXOs and transactions of the same range have been inserted.
+    :param driver:
+    :param assets: One entry per (output, asset) pair.
+    :param batch_size:
+    """
+    with write_session(driver) as session:
+        session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (a:Asset) REQUIRE a.fingerprint IS UNIQUE")
+        session.run("CREATE INDEX IF NOT EXISTS FOR (a:Asset) ON (a.policy, a.name)")
+        session.run("CREATE TEXT INDEX IF NOT EXISTS FOR (a:Asset) ON (a.display_name)")
+        session.run(f"CREATE FULLTEXT INDEX {ASSET_NAME_INDEX} IF NOT EXISTS FOR (a:Asset) ON EACH [a.display_name]")
+        session.run(HOLDS_INDEX)
+
+        assets_data = [
+            {
+                "fingerprint": asset.fingerprint,
+                "policy": asset.policy,
+                "name": asset.name,
+                "display_name": _display_name(asset.name),
+                "quantity": int(asset.quantity),
+                "utxo_hash": asset.creating_tx_hash,
+                "index": asset.tx_out_index
+            }
+            for asset in assets
+        ]
+
+        logging.info(f"Inserting {len(assets_data)} asset outputs into graph")
+
+        for i in range(0, len(assets_data), batch_size):
+            batch = assets_data[i:i + batch_size]
+            summary = session.execute_write(
+                consume,
+                """
+                UNWIND $assets_data AS asset
+                MERGE (a:Asset {fingerprint: asset.fingerprint})
+                ON CREATE SET a.policy = asset.policy,
+                              a.name = asset.name
+                SET a.display_name = asset.display_name
+                WITH a, asset
+                MATCH (u:UTXO {utxo_hash: asset.utxo_hash, index: asset.index})
+                MERGE (u)-[c:CARRIES]->(a)
+                SET c.quantity = asset.quantity
+                WITH a, asset
+                MATCH (t:Transaction {tx_hash: asset.utxo_hash})
+                MERGE (a)-[:USED_IN]->(t)
+                """,
+                {"assets_data": batch}
+            )
+            logging.info(f"Batch {i // batch_size + 1}: Inserted {summary.counters.nodes_created} asset nodes, "
+                         f"{summary.counters.relationships_created} relationships created.")
+
+            # Each CARRIES is counted into HOLDS once; outputs already spent are released right away
+            session.execute_write(
+                consume,
+                """
+                UNWIND $assets_data AS asset
+                MATCH (u:UTXO {utxo_hash: asset.utxo_hash, index: asset.index})
+                      -[c:CARRIES]->(a:Asset {fingerprint: asset.fingerprint})
+                WHERE c.held IS NULL
+                SET c.held = true
+                WITH u, c, a, EXISTS { (u)-[:INPUT]->(:Transaction) } AS spent
+                SET c.released = CASE WHEN spent THEN true ELSE null END
+                WITH u, c, a, spent
+                WHERE NOT spent
+                MATCH (b:Address)-[:OWNS]->(u)
+                MERGE (b)-[h:HOLDS]->(a)
+                SET h.address = b.address,
+                    h.fingerprint = a.fingerprint,
+                    h.quantity = coalesce(h.quantity, 0) + c.quantity
+                """,
+                {"assets_data": batch}
+            )
+
+    logging.info("Finished inserting assets into graph")
+
+
+def release_spent_holdings(driver: Driver, transactions: Dict[str, Transaction]):
+    """
+    Remove what the inputs of `transactions` carried from the HOLDS index of their owners, dropping holdings that
+    reach zero. Each CARRIES is released once, so re-ingesting a range is a no-op.
+    Must run after the transactions have been inserted with insert_utxos.
+    """
+    inputs = [
+        {"utxo_hash": input_utxo.creating_tx_hash, "index": input_utxo.tx_out_index}
+        for tx in transactions.values() for input_utxo in tx.inputs
+    ]
+    with write_session(driver) as session:
+        addresses = session.execute_write(
+            fetch_single,
+            """
+            UNWIND $inputs AS input
+            MATCH (u:UTXO {utxo_hash: input.utxo_hash, index: input.index})-[c:CARRIES]->(a:Asset)
+            WHERE c.held AND c.released IS NULL
+            SET c.released = true
+            WITH u, c, a
+            MATCH (b:Address)-[:OWNS]->(u)
+            MATCH (b)-[h:HOLDS]->(a)
+            SET h.quantity = h.quantity - c.quantity
+            RETURN collect(DISTINCT b.address) AS addresses
+            """,
+            {"inputs": inputs}
+        )["addresses"]
+        session.execute_write(
+            consume,
+            """
+            UNWIND $addresses AS address
+            MATCH (:Address {address: address})-[h:HOLDS]->(:Asset)
+            WHERE h.quantity <= 0
+            DELETE h
+            """,
+            {"addresses": addresses}
+        )
+
+
+def rebuild_holdings(driver: Driver):
+    """
+    Rebuild the HOLDS index from the unspent UTXOs of every address, for graphs ingested before it was maintained.
+    """
+    with write_session(driver) as session:
+        session.run(HOLDS_INDEX)
+        session.run("""
+        MATCH ()-[h:HOLDS]->()
+        CALL { WITH h DELETE h } IN TRANSACTIONS OF 10000 ROWS
+        """)
+        session.run("""
+        MATCH (b:Address)-[:OWNS]->(u:UTXO)-[c:CARRIES]->(a:Asset)
+        CALL {
+            WITH b, u, c, a
+            SET c.held = true,
+                c.released = CASE WHEN EXISTS { (u)-[:INPUT]->(:Transaction) } THEN true ELSE null END
+            WITH b, c, a
+            WHERE c.released IS NULL
+            MERGE (b)-[h:HOLDS]->(a)
+            SET h.address = b.address,
+                h.fingerprint = a.fingerprint,
+                h.quantity = coalesce(h.quantity, 0) + c.quantity
+        } IN TRANSACTIONS OF 10000 ROWS
+        """)
+    logging.info("Rebuilt token holdings")
+
+
+@single_flight
+def get_address_holdings(driver: Driver, address: str, display_name: Optional[str] = None,
+                         cursor: Optional[str] = None, size: int = 50) -> AddressTokens:
+    """
+    One page of the tokens an address holds, largest quantity first, as a keyset read of the (address, quantity,
+    fingerprint) index on HOLDS that starts right after `cursor`. Sorting on relationship properties only lets the
+    index supply the order, so an address holding thousands of NFTs of quantity 1 costs a page, not a sort.
+    `display_name` matches a substring of the asset name or a fingerprint prefix.
+    :raise ValueError: if `cursor` is malformed.
+    """
+    # One extra row tells whether there is a next page
+    params = {"address": address, "display_name": display_name, "limit": size + 1}
+    keyset = ""
+    if cursor:
+        after = decode_cursor(cursor, {"quantity": integer, "fingerprint": string})
+        params.update(after_quantity=after["quantity"], after_fingerprint=after["fingerprint"])
+        keyset = """
+      AND h.quantity <= $after_quantity
+      AND (h.quantity < $after_quantity OR h.fingerprint < $after_fingerprint)"""
+    query = f"""
+    MATCH (:Address)-[h:HOLDS]->(asset:Asset)
+    WHERE h.address = $address{keyset}
+      AND ($display_name IS NULL
+           OR asset.display_name CONTAINS $display_name
+           OR asset.fingerprint STARTS WITH $display_name)
+    WITH h, asset
+    ORDER BY h.quantity DESC, h.fingerprint DESC
+    LIMIT $limit
+    RETURN asset.policy AS policy, asset.name AS name, asset.display_name AS display_name,
+           asset.fingerprint AS fingerprint, h.quantity AS quantity
+    """
+    with read_session(driver) as session:
+        result = session.execute_read(fetch_all, query, params)
+        tokens = [TokenHolding(**record.data()) for record in result]
+
+    next_cursor = None
+    if len(tokens) > size:
+        tokens = tokens[:size]
+        next_cursor = encode_cursor({"quantity": tokens[-1].quantity, "fingerprint": tokens[-1].fingerprint})
+    return AddressTokens(address=address, tokens=tokens, page_size=size, next_cursor=next_cursor)
+
+
+@single_flight
 def get_graph_by_asset(driver: Driver, asset_id: str, start_time: Optional[str] = None,
-                       end_time: Optional[str] = None) -> GraphData:
-    nodes: List[BaseNode] = []
+                       end_time: Optional[str] = None, limit: int = 1000,
+                       max_holders: Optional[int] = None) -> GraphData:
+    """
+    Transfer graph of a native asset, starting from its indexed Asset node.
+    Only the `limit` most recent transfers in the time window are read, and at most `max_holders` receiving
+    addresses are kept, so the cost follows the number of transfers returned rather than the size of the database.
+    :param asset_id: Asset fingerprint (asset1...).
+    """
+    nodes: Dict[str, BaseNode] = {}
     edges: List[BaseEdge] = []
+    holders = set()
 
     query = """
-    MATCH (a:Address)-[r:INPUT_TRANSACTION]->(t:Transaction {asset_id: $asset_id})-[s:OUTPUT_TRANSACTION]->(b:Address)
-    """
-    if start_time:
-        query += " WHERE t.timestamp >= datetime($start_time)"
-    if end_time:
-        query += " AND t.timestamp <= datetime($end_time)"
-    query += """
-    RETURN a.address AS from, b.address AS to, t.tx_hash AS tx_hash, t.output_value AS value, t.timestamp AS timestamp,
-           t.asset_policy AS asset_policy, t.asset_name AS asset_name, t.asset_quantity AS asset_quantity
+    MATCH (asset:Asset {fingerprint: $asset_id})-[:USED_IN]->(t:Transaction)
+    WHERE ($start_time IS NULL OR t.timestamp >= datetime($start_time))
+      AND ($end_time IS NULL OR t.timestamp <= datetime($end_time))
+    WITH asset, t
+    ORDER BY t.timestamp DESC
+    LIMIT $limit
+    MATCH (t)-[:OUTPUT]->(u:UTXO)-[c:CARRIES]->(asset)
+    MATCH (b:Address)-[:OWNS]->(u)
+    WITH asset, t, b, sum(u.value) AS value, sum(c.quantity) AS quantity
+    OPTIONAL MATCH (a:Address)-[:OWNS]->(:UTXO)-[:INPUT]->(t)
+    RETURN collect(DISTINCT a.address) AS from, b.address AS to, t.tx_hash AS tx_hash, value, t.timestamp AS timestamp,
+           t.fee AS fee, asset.policy AS asset_policy, asset.name AS asset_name, quantity AS asset_quantity
+    ORDER BY timestamp DESC
     """
 
-    params = {'asset_id': asset_id}
-    if start_time:
-        params['start_time'] = parse_timestamp(start_time)
-    if end_time:
-        params['end_time'] = parse_timestamp(end_time)
+    params = {
+        'asset_id': asset_id,
+        'start_time': parse_timestamp(start_time) if start_time else None,
+        'end_time': parse_timestamp(end_time) if end_time else None,
+        'limit': limit
+    }
 
-    with driver.session() as session:
-        result = session.run(query, params)
+    with read_session(driver) as session:
+        result = session.execute_read(fetch_all, query, params)
         for record in result:
-            from_address = record["from"]
             to_address = record["to"]
-            tx_hash = record["tx_hash"]
+            tx_hash = serialize_value(record["tx_hash"])
 
-            if not any(node["id"] == from_address for node in nodes):
-                nodes.append(AddressNode(id=from_address, type="Address", label=from_address))
+            if to_address not in holders:
+                if max_holders is not None and len(holders) >= max_holders:
+                    continue
+                holders.add(to_address)
 
-            if not any(node["id"] == tx_hash for node in nodes):
-                nodes.append(TransactionNode(
+            if tx_hash not in nodes:
+                nodes[tx_hash] = TransactionNode(
                     id=tx_hash, type="Transaction", tx_hash=tx_hash,
-                    timestamp=record["timestamp"].isoformat(), value=record["value"],
+                    timestamp=record["timestamp"].isoformat(), value=int(record["value"] or 0),
+                    fee=float(record["fee"] or 0),
                     asset_policy=record["asset_policy"], asset_name=record["asset_name"],
                     asset_quantity=record["asset_quantity"]
-                ))
+                )
+                for from_address in record["from"]:
+                    if from_address not in nodes:
+                        nodes[from_address] = AddressNode(id=from_address, type="Address", label=from_address)
+                    edges.append(BaseEdge(from_address=from_address, to_address=tx_hash, type="INPUT_TRANSACTION"))
 
-            if not any(node["id"] == to_address for node in nodes):
-                nodes.append(AddressNode(id=to_address, type="Address", label=to_address))
+            if to_address not in nodes:
+                nodes[to_address] = AddressNode(id=to_address, type="Address", label=to_address)
 
-            edges.append(BaseEdge(from_address=from_address, to_address=tx_hash, type="INPUT_TRANSACTION"))
             edges.append(BaseEdge(from_address=tx_hash, to_address=to_address, type="OUTPUT_TRANSACTION"))
 
     stake_query = """
-    MATCH (a:Address)-[:STAKE]->(s:StakeAddress)
+    UNWIND $addresses AS address
+    MATCH (a:Address {address: address})-[:STAKE]->(s:StakeAddress)
     RETURN a.address AS address, s.address AS stake_address
     """
 
-    with driver.session() as session:
-        result = session.run(stake_query)
+    addresses = [node_id for node_id, node in nodes.items() if isinstance(node, AddressNode)]
+
+    with read_session(driver) as session:
+        result = session.execute_read(fetch_all, stake_query, {"addresses": addresses})
         for record in result:
-            if not any(node["id"] == record["stake_address"] for node in nodes):
-                nodes.append(
-                    StakeAddressNode(id=record["stake_address"], type="StakeAddress", label=record["stake_address"]))
+            if record["stake_address"] not in nodes:
+                nodes[record["stake_address"]] = StakeAddressNode(id=record["stake_address"], type="StakeAddress",
+                                                                  label=record["stake_address"])
 
             edges.append(BaseEdge(from_address=record["address"], to_address=record["stake_address"], type="STAKE"))
 
-    return GraphData(nodes=nodes, edges=edges)
+    return GraphData(nodes=list(nodes.values()), edges=edges)
 
 
+@single_flight
 def get_asset_details(driver: Driver, asset_id: str) -> AssetDetails:
     query = """
-    MATCH (a:Asset {asset_id: $asset_id})-[:USED_IN]->(t:Transaction)
+    MATCH (a:Asset {fingerprint: $asset_id})-[:USED_IN]->(t:Transaction)
     RETURN a, collect(t) AS transactions
     """
-    with driver.session() as session:
-        result = session.run(query, {"asset_id": asset_id})
-        record = result.single()
+    with read_session(driver) as session:
+        record = session.execute_read(fetch_single, query, {"asset_id": asset_id})
         if record:
             return {
-                "asset": record["a"],
-                "transactions": record["transactions"]
+                "asset": serialize_node(record["a"]),
+                "transactions": [serialize_node(tx) for tx in record["transactions"]]
             }
         return {}
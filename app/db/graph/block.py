@@ -1,11 +1,14 @@
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict
 
 from neo4j import Driver
 
+from app.db.graph.access import consume, fetch_all, fetch_single, read_session, write_session
 from app.db.graph.db_neo4j import serialize_node
 from app.db.models.base import Block
-from app.models.graph import GraphData, BaseNode, BaseEdge, BlockNode, TransactionNode, EpochNode, Blocks
+from app.models.graph import GraphData, BaseNode, BaseEdge, BlockNode, TransactionNode, EpochNode, Blocks, \
+    BlockDetails
+from app.utils.single_flight import single_flight
 
 
 def insert_blocks(driver: Driver, blocks: List[Block]):
@@ -14,9 +17,11 @@ def insert_blocks(driver: Driver, blocks: List[Block]):
     :param driver:
     :param blocks: List of blocks with their properties.
     """
-    with driver.session() as session:
+    with write_session(driver) as session:
         session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (b:Block) REQUIRE b.hash IS UNIQUE;")
         session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (e:Epoch) REQUIRE e.no IS UNIQUE;")
+        session.run("CREATE INDEX IF NOT EXISTS FOR (b:Block) ON (b.block_no)")
+        session.run("CREATE INDEX IF NOT EXISTS FOR (b:Block) ON (b.block_id)")
 
         blocks_data = [
             {
@@ -46,7 +51,8 @@ def insert_blocks(driver: Driver, blocks: List[Block]):
         batch_size = 1000
         for i in range(0, len(blocks_data), batch_size):
             batch = blocks_data[i:i + batch_size]
-            result = session.run(
+            summary = session.execute_write(
+                consume,
                 """
                 UNWIND $blocks_data AS block
                 MERGE (b:Block {hash: block.hash})
@@ -54,7 +60,7 @@ def insert_blocks(driver: Driver, blocks: List[Block]):
                 WITH block, b
                 CALL {
                     WITH block, b
-                    OPTIONAL MATCH (b2:Block {id: block.previous_id})
+                    OPTIONAL MATCH (b2:Block {block_id: block.previous_id})
                     WITH b, b2 WHERE b2 IS NOT NULL
                     MERGE (b)-[:HAS_PREVIOUS_BLOCK]->(b2)
                 }
@@ -64,13 +70,13 @@ def insert_blocks(driver: Driver, blocks: List[Block]):
                 """,
                 {"blocks_data": batch}
             )
-            summary = result.consume()
             logging.info(f"Batch {i // batch_size + 1}: Inserted {summary.counters.nodes_created} block nodes, "
                          f"{summary.counters.relationships_created} relationships created.")
 
     logging.info("Finished inserting blocks into graph")
 
 
+@single_flight
 def get_graph_by_block_hash(driver: Driver, block_hash: str, depth: int = 1) -> GraphData:
     nodes: List[BaseNode] = []
     edges: List[BaseEdge] = []
@@ -84,9 +90,8 @@ def get_graph_by_block_hash(driver: Driver, block_hash: str, depth: int = 1) ->
     WITH b, collect(t) AS transactions, e, collect(nodes(path)) AS prev_blocks
     RETURN b, transactions, e, prev_blocks
     """
-    with driver.session() as session:
-        result = session.run(query, {"block_hash": block_hash, "depth": depth})
-        record = result.single()
+    with read_session(driver) as session:
+        record = session.execute_read(fetch_single, query, {"block_hash": block_hash, "depth": depth})
 
         if record:
             main_block = record["b"]
@@ -122,31 +127,45 @@ def get_graph_by_block_hash(driver: Driver, block_hash: str, depth: int = 1) ->
     return GraphData(nodes=nodes, edges=edges)
 
 
-def get_block_details(driver: Driver, block_hash: str) -> Dict[str, Any]:
+def get_block_details(driver: Driver, block_hash: str) -> BlockDetails:
+    blocks = get_blocks_details(driver, [block_hash])
+    return blocks.get(block_hash, BlockDetails(block={}, transactions=[], epoch={}))
+
+
+@single_flight
+def get_blocks_details(driver: Driver, block_hashes: List[str]) -> Dict[str, BlockDetails]:
+    """
+    Resolve the details of many blocks with a single UNWIND query.
+    :return: Details keyed by block hash; hashes that were not found are absent.
+    """
     query = """
-    MATCH (b:Block {hash: $block_hash})
-    MATCH (b)-[:CONTAINS]->(t:Transaction)
-    MATCH (e:Epoch)-[:HAS_BLOCK]->(b)
-    RETURN b, collect(t) AS transactions, e
+    UNWIND $block_hashes AS block_hash
+    MATCH (b:Block {hash: block_hash})
+    OPTIONAL MATCH (b)-[:CONTAINS]->(t:Transaction)
+    OPTIONAL MATCH (e:Epoch)-[:HAS_BLOCK]->(b)
+    RETURN block_hash, b, collect(t) AS transactions, e
     """
-    with driver.session() as session:
-        result = session.run(query, {"block_hash": block_hash})
-        record = result.single()
-        if record:
-            return {
-                "block": serialize_node(record.get("b")),
-                "transactions": [serialize_node(tx) for tx in record.get("transactions", [])],
-                "epoch": serialize_node(record.get("e"))
-            }
-        return {"block": {}, "transactions": [], "epoch": {}}
+    details = {}
+    with read_session(driver) as session:
+        result = session.execute_read(fetch_all, query, {"block_hashes": block_hashes})
+        for record in result:
+            details[record["block_hash"]] = BlockDetails(
+                block=serialize_node(record.get("b")),
+                transactions=[serialize_node(tx) for tx in record.get("transactions", [])],
+                epoch=serialize_node(record.get("e")) if record.get("e") else {}
+            )
+    return details
 
 
+@single_flight
 def get_blocks(driver: Driver, skip: int, limit: int) -> Blocks:
+    # The predicate lets the block_no index serve ORDER BY ... LIMIT instead of sorting every block
     query = """
     MATCH (b:Block)
+    WHERE b.block_no IS NOT NULL
     RETURN {
         hash: b.hash,
-        block_id: b.id,
+        block_id: b.block_id,
         epoch_no: b.epoch_no,
         slot_no: b.slot_no,
         epoch_slot_no: b.epoch_slot_no,
@@ -169,11 +188,10 @@ def get_blocks(driver: Driver, skip: int, limit: int) -> Blocks:
 
     query_count = "MATCH (e:Block) RETURN COUNT(e) AS total_count"
 
-    with driver.session() as session:
-        total_count_result = session.run(query_count)
-        total_count = total_count_result.single()["total_count"]
+    with read_session(driver) as session:
+        total_count = session.execute_read(fetch_single, query_count)["total_count"]
 
-        result = session.run(query, {"skip": skip, "limit": limit})
-        blocks = [record["block"] for record in result]
+        result = session.execute_read(fetch_all, query, {"skip": skip, "limit": limit})
+        blocks = [serialize_node(record["block"]) for record in result]
 
-    return {"blocks": blocks, "total_count": total_count}
+    return Blocks(blocks=blocks, total_count=total_count)
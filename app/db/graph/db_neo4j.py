@@ -1,23 +1,45 @@
 import binascii
 import logging
 from datetime import datetime
+from typing import List
 
+from neo4j import Driver
 from neo4j.time import DateTime
 
 from app.db.connections import connect_neo4j
+from app.db.graph.access import fetch_all, read_session, write_session
 
 
 def clear_neo4j_database():
     logging.info("Performing a clean-up of the graph database")
     driver = connect_neo4j()
-    with driver.session() as session:
+    with write_session(driver) as session:
         session.run("MATCH (n) DETACH DELETE n")
     driver.close()
 
 
+def get_pending_indexes(driver: Driver) -> List[str]:
+    """
+    Indexes that are not ONLINE, i.e. still populating or failed. Queries planned while an index is unavailable
+    fall back to scans.
+    """
+    query = """
+    SHOW INDEXES YIELD name, state, populationPercent
+    WHERE state <> 'ONLINE'
+    RETURN name, state, populationPercent
+    """
+    with read_session(driver) as session:
+        return [f"{record['name']} ({record['state']}, {record['populationPercent']}%)"
+                for record in session.execute_read(fetch_all, query)]
+
+
+# Markers the aggregate updates leave on nodes so that a rerun does not count them twice. They are not data and are
+# never serialised.
+BOOKKEEPING_PROPERTIES = frozenset({"stake_counted", "stake_spent_counted", "address_counters_applied"})
+
+
 def serialize_node(node, exclude_keys=None):
-    if exclude_keys is None:
-        exclude_keys = []
+    exclude_keys = BOOKKEEPING_PROPERTIES.union(exclude_keys or [])
 
     if hasattr(node, 'items'):
         return {key: serialize_value(value) for key, value in node.items() if key not in exclude_keys}
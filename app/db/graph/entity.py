@@ -0,0 +1,194 @@
+import logging
+from typing import Dict, Iterator, List, Optional
+
+from neo4j import Driver
+
+from app.db.graph.access import consume, fetch_all, fetch_single, read_session, write_session
+from app.db.graph.db_neo4j import serialize_value
+from app.models.details import EntityDetails
+from app.models.transactions import CoSpend
+
+CLUSTERING_CHECKPOINT = "address_clustering"
+
+
+def iter_graph_co_spends(driver: Driver, start_time: str, end_time: str) -> Iterator[CoSpend]:
+    """
+    Stream the input addresses of every transaction in [start_time, end_time) that spends from more than one
+    address, read from the graph instead of db-sync.
+    """
+    query = """
+    MATCH (t:Transaction)
+    WHERE t.timestamp >= datetime($start_time) AND t.timestamp < datetime($end_time)
+    MATCH (a:Address)-[:OWNS]->(:UTXO)-[:INPUT]->(t)
+    WITH t, collect(DISTINCT a.address) AS addresses
+    WHERE size(addresses) > 1
+    RETURN t.tx_hash AS tx_hash, addresses
+    """
+    with write_session(driver) as session:
+        session.run("CREATE INDEX IF NOT EXISTS FOR (t:Transaction) ON (t.timestamp)")
+    # Auto-commit, so that the co-spends are streamed
+    with read_session(driver) as session:
+        result = session.run(query, {"start_time": start_time, "end_time": end_time})
+        for record in result:
+            yield CoSpend(tx_hash=record["tx_hash"], addresses=record["addresses"])
+
+
+def get_entity_ids(driver: Driver, addresses: List[str], batch_size: int = 10000) -> Dict[str, str]:
+    """
+    :return: Current entity id of every address in `addresses` that has one.
+    """
+    query = """
+    UNWIND $addresses AS address
+    MATCH (a:Address {address: address})
+    WHERE a.entity_id IS NOT NULL
+    RETURN a.address AS address, a.entity_id AS entity_id
+    """
+    entity_ids = {}
+    # Causal, as the ids of the previous run or batch may not have reached every reader yet
+    with read_session(driver, causal=True) as session:
+        for i in range(0, len(addresses), batch_size):
+            result = session.execute_read(fetch_all, query, {"addresses": addresses[i:i + batch_size]})
+            for record in result:
+                entity_ids[record["address"]] = record["entity_id"]
+    return entity_ids
+
+
+def write_entities(driver: Driver, assignments: Dict[str, str], merged: Dict[str, str], batch_size: int = 10000):
+    """
+    Write clustering results back to the graph.
+    :param assignments: New entity id per address.
+    :param merged: Entities absorbed by another one, as old id -> surviving id. Their remaining addresses are
+                   relabelled and their Entity nodes deleted.
+    :param batch_size:
+    """
+    with write_session(driver) as session:
+        session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (e:Entity) REQUIRE e.entity_id IS UNIQUE")
+        session.run("CREATE INDEX IF NOT EXISTS FOR (a:Address) ON (a.entity_id)")
+
+        rows = [{"address": address, "entity_id": entity_id} for address, entity_id in assignments.items()]
+        logging.info(f"Assigning entity ids to {len(rows)} addresses")
+        for i in range(0, len(rows), batch_size):
+            session.execute_write(
+                consume,
+                """
+                UNWIND $rows AS row
+                MATCH (a:Address {address: row.address})
+                SET a.entity_id = row.entity_id
+                """,
+                {"rows": rows[i:i + batch_size]}
+            )
+
+        rows = [{"old_id": old_id, "entity_id": entity_id} for old_id, entity_id in merged.items()]
+        if rows:
+            logging.info(f"Merging {len(rows)} entities into their successors")
+            session.run(
+                """
+                UNWIND $rows AS row
+                MATCH (a:Address {entity_id: row.old_id})
+                CALL {
+                    WITH a, row
+                    SET a.entity_id = row.entity_id
+                } IN TRANSACTIONS OF 10000 ROWS
+                """,
+                {"rows": rows}
+            )
+            session.execute_write(
+                consume,
+                "UNWIND $old_ids AS old_id MATCH (e:Entity {entity_id: old_id}) DETACH DELETE e",
+                {"old_ids": list(merged)}
+            )
+
+
+def update_entity_aggregates(driver: Driver, entity_ids: List[str], batch_size: int = 100):
+    """
+    Recompute the aggregates stored on the Entity nodes of `entity_ids` from their member addresses, so that
+    reading an entity never has to touch its addresses.
+    """
+    query = """
+    UNWIND $entity_ids AS entity_id
+    CALL {
+        WITH entity_id
+        MATCH (a:Address {entity_id: entity_id})
+        OPTIONAL MATCH (a)-[:OWNS]->(u:UTXO)
+        WHERE NOT (u)-[:INPUT]->(:Transaction)
+        RETURN count(DISTINCT a) AS address_count, sum(u.value) AS balance
+    }
+    CALL {
+        WITH entity_id
+        OPTIONAL MATCH (:Address {entity_id: entity_id})-[:OWNS]->(:UTXO)-[:INPUT|OUTPUT]-(t:Transaction)
+        WITH DISTINCT t
+        RETURN count(t) AS transaction_count, min(t.timestamp) AS first_seen, max(t.timestamp) AS last_seen
+    }
+    MERGE (e:Entity {entity_id: entity_id})
+    SET e.address_count = address_count,
+        e.balance = balance,
+        e.transaction_count = transaction_count,
+        e.first_seen = first_seen,
+        e.last_seen = last_seen,
+        e.updated_at = datetime()
+    """
+    with write_session(driver) as session:
+        for i in range(0, len(entity_ids), batch_size):
+            session.execute_write(consume, query, {"entity_ids": entity_ids[i:i + batch_size]})
+            logging.info(f"Updated aggregates of {min(i + batch_size, len(entity_ids))}/{len(entity_ids)} entities")
+
+
+def clear_entities(driver: Driver):
+    with write_session(driver) as session:
+        session.run("""
+        MATCH (a:Address) WHERE a.entity_id IS NOT NULL
+        CALL { WITH a REMOVE a.entity_id } IN TRANSACTIONS OF 10000 ROWS
+        """)
+        session.run("""
+        MATCH (e:Entity)
+        CALL { WITH e DETACH DELETE e } IN TRANSACTIONS OF 10000 ROWS
+        """)
+        session.execute_write(consume, "MATCH (c:Checkpoint {name: $name}) DELETE c", {"name": CLUSTERING_CHECKPOINT})
+
+
+def get_clustering_checkpoint(driver: Driver) -> Optional[str]:
+    """
+    :return: End of the last clustered time range, in ISO format.
+    """
+    with read_session(driver, causal=True) as session:
+        record = session.execute_read(fetch_single, "MATCH (c:Checkpoint {name: $name}) RETURN c.end AS end",
+                                      {"name": CLUSTERING_CHECKPOINT})
+        return serialize_value(record["end"]) if record else None
+
+
+def set_clustering_checkpoint(driver: Driver, end: str):
+    with write_session(driver) as session:
+        session.execute_write(consume, "MERGE (c:Checkpoint {name: $name}) SET c.end = datetime($end)",
+                              {"name": CLUSTERING_CHECKPOINT, "end": end})
+
+
+def get_entity(driver: Driver, entity_id: str, address_limit: int = 100) -> Optional[EntityDetails]:
+    """
+    Precomputed entity by id: one unique-index lookup for the aggregates and one index range read for the first
+    `address_limit` member addresses.
+    """
+    query = """
+    MATCH (e:Entity {entity_id: $entity_id})
+    CALL {
+        WITH e
+        MATCH (a:Address {entity_id: e.entity_id})
+        WITH a LIMIT $address_limit
+        RETURN collect(a.address) AS addresses
+    }
+    RETURN e, addresses
+    """
+    with read_session(driver) as session:
+        record = session.execute_read(fetch_single, query, {"entity_id": entity_id, "address_limit": address_limit})
+        if not record:
+            return None
+        entity = record["e"]
+        return EntityDetails(
+            entity_id=entity["entity_id"],
+            address_count=entity["address_count"],
+            balance=str(entity.get("balance") or 0),
+            transaction_count=entity["transaction_count"],
+            first_seen=serialize_value(entity.get("first_seen")),
+            last_seen=serialize_value(entity.get("last_seen")),
+            updated_at=serialize_value(entity.get("updated_at")),
+            addresses=record["addresses"]
+        )
@@ -2,30 +2,33 @@ import logging
 
 from neo4j import Driver
 
+from app.db.graph.access import consume, fetch_all, fetch_single, read_session, write_session
 from app.db.graph.db_neo4j import serialize_node
 from app.models.graph import Epochs, EpochDetails
 from app.utils.currency_converter import CurrencyConverter
+from app.utils.single_flight import single_flight
 
 
+@single_flight
 def get_epoch_details(driver: Driver, epoch_no: int) -> EpochDetails:
     query = """
     MATCH (e:Epoch {no: $epoch_no})
     OPTIONAL MATCH (e)-[:HAS_BLOCK]->(b:Block)
     RETURN e, count(b) AS block_count, sum(b.tx_count) AS tx_count, sum(b.size) AS total_size
     """
-    with driver.session() as session:
-        result = session.run(query, {"epoch_no": epoch_no})
-        record = result.single()
+    with read_session(driver) as session:
+        record = session.execute_read(fetch_single, query, {"epoch_no": epoch_no})
         if record:
-            return {
-                "epoch": serialize_node(record["e"]),
-                "block_count": record["block_count"],
-                "tx_count": record["tx_count"],
-                "total_size": record["total_size"]
-            }
-        return {"epoch": {}, "block_count": 0, "tx_count": 0, "total_size": 0}
+            return EpochDetails(
+                epoch=serialize_node(record["e"]),
+                block_count=record["block_count"],
+                tx_count=record["tx_count"],
+                total_size=record["total_size"]
+            )
+        return EpochDetails(epoch={}, block_count=0, tx_count=0, total_size=0)
 
 
+@single_flight
 def get_epochs(driver: Driver, skip: int, limit: int) -> Epochs:
     query_data = """
     MATCH (e:Epoch)
@@ -46,14 +49,13 @@ def get_epochs(driver: Driver, skip: int, limit: int) -> Epochs:
 
     query_count = "MATCH (e:Epoch) RETURN COUNT(e) AS total_count"
 
-    with driver.session() as session:
-        total_count_result = session.run(query_count)
-        total_count = total_count_result.single()["total_count"]
+    with read_session(driver) as session:
+        total_count = session.execute_read(fetch_single, query_count)["total_count"]
 
-        result = session.run(query_data, {"skip": skip, "limit": limit})
+        result = session.execute_read(fetch_all, query_data, {"skip": skip, "limit": limit})
         epochs = [record["epoch"] for record in result]
 
-    return {"epochs": epochs, "total_count": total_count}
+    return Epochs(epochs=epochs, total_count=total_count)
 
 
 def insert_epochs(driver: Driver, epochs: Epochs):
@@ -63,7 +65,7 @@ def insert_epochs(driver: Driver, epochs: Epochs):
     :param epochs:
     :return:
     """
-    with driver.session() as session:
+    with write_session(driver) as session:
         session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (e:Epoch) REQUIRE e.no IS UNIQUE")
 
         logging.info(f"Inserting {len(epochs)} epochs into graph")
@@ -78,7 +80,8 @@ def insert_epochs(driver: Driver, epochs: Epochs):
             for epoch in epochs
         ]
 
-        result = session.run(
+        summary = session.execute_write(
+            consume,
             """
             UNWIND $epoch_data AS data
             MERGE (e:Epoch {no: data.no})
@@ -89,12 +92,12 @@ def insert_epochs(driver: Driver, epochs: Epochs):
             """,
             {"epoch_data": epoch_data}
         )
-        summary = result.consume()
         logging.info(
             f"Inserted {summary.counters.nodes_created} nodes, {summary.counters.nodes_deleted} nodes deleted.")
 
         # Create relationships between consecutive epochs
-        result = session.run(
+        summary = session.execute_write(
+            consume,
             """
             MATCH (e1:Epoch), (e2:Epoch)
             WHERE e1.no = e2.no - 1
@@ -102,5 +105,4 @@ def insert_epochs(driver: Driver, epochs: Epochs):
             """
         )
 
-        summary = result.consume()
         logging.info(f"Created {summary.counters.relationships_created} HAS_SUCCESSOR relationships.")
@@ -0,0 +1,310 @@
+import logging
+import os
+import random
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from neo4j import Driver, Query, ResultSummary, unit_of_work
+
+from app.utils.latency import LatencyWindow
+
+# Statements that cannot be prefixed with PROFILE
+_UNPROFILABLE = ("CREATE ", "DROP ", "SHOW ", "EXPLAIN ", "PROFILE ")
+# Modules between a query function and the statement it runs: the driver running managed transactions, this
+# instrumentation and the units of work of app.db.graph.access
+_PASS_THROUGH_MODULES = ("neo4j", __name__, "app.db.graph.access")
+
+
+def query_caller(*skip: str):
+    """The frame of the function a statement belongs to, i.e. the first caller outside the driver and its wrappers."""
+    frame = sys._getframe(1)
+    modules = _PASS_THROUGH_MODULES + skip
+    while frame.f_back is not None and frame.f_globals.get("__name__", "").startswith(modules):
+        frame = frame.f_back
+    return frame
+
+
+class _QueryStats:
+    def __init__(self):
+        self.available_after = LatencyWindow()
+        self.consumed_after = LatencyWindow()
+        self.rows = 0
+        self.max_rows = 0
+        self.max_param_cardinality = 0
+        self.profiled = 0
+        self.db_hits = 0
+        self.slow = 0
+
+
+class QueryStatsRecorder:
+    """
+    Per-query timings reported by the server in each ResultSummary. A query is named after the function and line
+    that ran it, e.g. `block.get_blocks:190`, so repeated calls of the same statement aggregate together.
+    """
+
+    def __init__(self, profile_sample_rate: float = 0.0, slow_query_ms: float = 1000.0):
+        self.profile_sample_rate = profile_sample_rate
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _QueryStats] = {}
+
+    def should_profile(self, text: str) -> bool:
+        if self.profile_sample_rate <= 0 or random.random() >= self.profile_sample_rate:
+            return False
+        statement = text.lstrip().upper()
+        # Schema commands cannot be profiled, and batched writes commit outside the profiled transaction
+        return not statement.startswith(_UNPROFILABLE) and "IN TRANSACTIONS" not in statement
+
+    def record(self, name: str, summary: ResultSummary, rows: int, param_cardinality: int, profiled: bool):
+        available_after = summary.result_available_after or 0
+        consumed_after = summary.result_consumed_after or 0
+        db_hits = _db_hits(summary.profile) if profiled and summary.profile else 0
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = _QueryStats()
+            stats.rows += rows
+            stats.max_rows = max(stats.max_rows, rows)
+            stats.max_param_cardinality = max(stats.max_param_cardinality, param_cardinality)
+            if profiled:
+                stats.profiled += 1
+                stats.db_hits += db_hits
+            slow = available_after + consumed_after >= self.slow_query_ms
+            if slow:
+                stats.slow += 1
+        stats.available_after.record(available_after / 1000)
+        stats.consumed_after.record(consumed_after / 1000)
+        if slow:
+            logging.warning(f"Slow Neo4j query {name}: available after {available_after} ms, consumed after "
+                            f"{consumed_after} ms, {rows} rows, parameter cardinality {param_cardinality}"
+                            + (f", {db_hits} db hits" if profiled else ""))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            name: {
+                "available_after": query.available_after.snapshot(),
+                "consumed_after": query.consumed_after.snapshot(),
+                "rows": query.rows,
+                "max_rows": query.max_rows,
+                "max_param_cardinality": query.max_param_cardinality,
+                "profiled": query.profiled,
+                "mean_db_hits": round(query.db_hits / query.profiled, 1) if query.profiled else None,
+                "slow": query.slow
+            }
+            for name, query in sorted(stats.items())
+        }
+
+
+def _db_hits(profile: Dict[str, Any]) -> int:
+    return profile.get("dbHits", 0) + sum(_db_hits(child) for child in profile.get("children", []))
+
+
+def _param_cardinality(parameters: Optional[Dict[str, Any]]) -> int:
+    """Size of the largest list parameter, i.e. the number of rows an UNWIND batch fans out to."""
+    if not parameters:
+        return 0
+    return max((len(value) for value in parameters.values() if isinstance(value, (list, tuple))), default=1)
+
+
+query_stats = QueryStatsRecorder(
+    profile_sample_rate=float(os.getenv("NEO4J_PROFILE_SAMPLE_RATE", "0")),
+    slow_query_ms=float(os.getenv("NEO4J_SLOW_QUERY_MS", "1000"))
+)
+
+
+class InstrumentedResult:
+    """Counts the rows read from a Result and records its summary once it has been consumed."""
+
+    def __init__(self, result, name: str, param_cardinality: int, profiled: bool):
+        self._result = result
+        self._name = name
+        self._param_cardinality = param_cardinality
+        self._profiled = profiled
+        self._rows = 0
+        self._recorded = False
+
+    def __iter__(self):
+        for record in self._result:
+            self._rows += 1
+            yield record
+        self._finish()
+
+    def single(self, *args, **kwargs):
+        record = self._result.single(*args, **kwargs)
+        self._rows += record is not None
+        self._finish()
+        return record
+
+    def values(self, *args, **kwargs):
+        values = self._result.values(*args, **kwargs)
+        self._rows += len(values)
+        self._finish()
+        return values
+
+    def data(self, *args, **kwargs):
+        data = self._result.data(*args, **kwargs)
+        self._rows += len(data)
+        self._finish()
+        return data
+
+    def consume(self) -> ResultSummary:
+        summary = self._result.consume()
+        self._finish(summary)
+        return summary
+
+    def _finish(self, summary: Optional[ResultSummary] = None):
+        if self._recorded:
+            return
+        self._recorded = True
+        try:
+            summary = summary or self._result.consume()
+            query_stats.record(self._name, summary, self._rows, self._param_cardinality, self._profiled)
+        except Exception as e:
+            logging.debug(f"Could not record the summary of {self._name}: {e}")
+
+    def __getattr__(self, item):
+        return getattr(self._result, item)
+
+
+def _run(target, query, parameters: Optional[Dict[str, Any]], kwargs: Dict[str, Any], pending: list):
+    caller = query_caller()
+    name = f"{Path(caller.f_code.co_filename).stem}.{caller.f_code.co_name}:{caller.f_lineno}"
+    text = query.text if isinstance(query, Query) else query
+    profiled = query_stats.should_profile(text)
+    if profiled:
+        query = Query("PROFILE " + text, query.metadata, query.timeout) if isinstance(query, Query) \
+            else "PROFILE " + text
+    result = InstrumentedResult(target.run(query, parameters, **kwargs), name,
+                                _param_cardinality(parameters), profiled)
+    # Long ingestion sessions run thousands of statements; only keep those still waiting to be recorded
+    pending[:] = [previous for previous in pending if not previous._recorded]
+    pending.append(result)
+    return result
+
+
+class InstrumentedTransaction:
+    def __init__(self, transaction):
+        self._transaction = transaction
+        self._pending = []
+
+    def run(self, query, parameters: Optional[Dict[str, Any]] = None, **kwargs):
+        return _run(self._transaction, query, parameters, kwargs, self._pending)
+
+    def _finish_pending(self):
+        for result in self._pending:
+            result._finish()
+        self._pending.clear()
+
+    def commit(self):
+        self._finish_pending()
+        return self._transaction.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self._finish_pending()
+        return self._transaction.__exit__(exc_type, exc_value, traceback)
+
+    def __getattr__(self, item):
+        return getattr(self._transaction, item)
+
+
+def _instrumented_work(transaction_function):
+    """
+    Unit of work for execute_read/execute_write running `transaction_function`, with its timeout and metadata, on
+    an instrumented transaction. Retries run it anew.
+    """
+
+    @unit_of_work(getattr(transaction_function, "metadata", None), getattr(transaction_function, "timeout", None))
+    def work(tx, *args, **kwargs):
+        transaction = InstrumentedTransaction(tx)
+        value = transaction_function(transaction, *args, **kwargs)
+        # Managed transactions commit once the function returns, after which results cannot be consumed
+        transaction._finish_pending()
+        return value
+
+    return work
+
+
+class InstrumentedSession:
+    """
+    Session whose run() results report their summaries to query_stats. Results the caller never consumes
+    (schema commands, writes) are consumed when the session closes.
+    """
+
+    def __init__(self, session, driver: "InstrumentedDriver"):
+        self._session = session
+        self._driver = driver
+        self._pending = []
+        self._open = True
+        driver._session_opened()
+
+    def run(self, query, parameters: Optional[Dict[str, Any]] = None, **kwargs):
+        return _run(self._session, query, parameters, kwargs, self._pending)
+
+    def begin_transaction(self, *args, **kwargs) -> InstrumentedTransaction:
+        return InstrumentedTransaction(self._session.begin_transaction(*args, **kwargs))
+
+    def execute_read(self, transaction_function, *args, **kwargs):
+        return self._session.execute_read(_instrumented_work(transaction_function), *args, **kwargs)
+
+    def execute_write(self, transaction_function, *args, **kwargs):
+        return self._session.execute_write(_instrumented_work(transaction_function), *args, **kwargs)
+
+    def _finish_pending(self):
+        for result in self._pending:
+            result._finish()
+        self._pending.clear()
+
+    def _closed(self):
+        if self._open:
+            self._open = False
+            self._driver._session_closed()
+
+    def close(self):
+        self._finish_pending()
+        self._session.close()
+        self._closed()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self._finish_pending()
+        try:
+            return self._session.__exit__(exc_type, exc_value, traceback)
+        finally:
+            self._closed()
+
+    def __getattr__(self, item):
+        return getattr(self._session, item)
+
+
+class InstrumentedDriver:
+    """Drop-in wrapper of a neo4j Driver whose sessions are instrumented; everything else is delegated."""
+
+    def __init__(self, driver: Driver):
+        self._driver = driver
+        self._lock = threading.Lock()
+        self.sessions_in_use = 0
+
+    def session(self, **config) -> InstrumentedSession:
+        return InstrumentedSession(self._driver.session(**config), self)
+
+    def _session_opened(self):
+        with self._lock:
+            self.sessions_in_use += 1
+
+    def _session_closed(self):
+        with self._lock:
+            self.sessions_in_use -= 1
+
+    def __getattr__(self, item):
+        return getattr(self._driver, item)
@@ -0,0 +1,330 @@
+import asyncio
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from neo4j import Driver, Query, unit_of_work
+
+from app.db.graph.access import fetch_single, read_session, write_session
+from app.db.graph.address import get_graph_by_address, expand_address_graph, get_address_details, \
+    get_address_transactions, get_address_utxos, get_address_summaries
+from app.db.graph.analytics import get_top_addresses, get_analytics_run, create_analytics_indexes
+from app.db.graph.asset import get_address_holdings, get_graph_by_asset, get_asset_details, insert_assets
+from app.db.graph.block import get_graph_by_block_hash, get_blocks_details, get_blocks, insert_blocks
+from app.db.graph.entity import get_entity, write_entities
+from app.db.graph.epoch import get_epoch_details, get_epochs, insert_epochs
+from app.db.graph.instrumentation import query_caller
+from app.db.graph.search import classify, _run_lookup, create_search_indexes
+from app.db.graph.stake import get_stake_details
+from app.db.graph.transaction import get_transactions_details, get_transaction_utxos
+from app.db.graph.utxo import insert_utxos
+from app.models.analytics import RankingMetric
+from app.models.graph import Direction
+from app.routers import address as address_router, transaction as transaction_router
+from app.utils.cursor import encode_cursor
+
+# Labels that grow with the chain; scanning any of them is a full pass over the graph
+LARGE_LABELS = {"Block", "Transaction", "UTXO", "Address", "StakeAddress", "Asset", "Entity"}
+
+# READ_QUERIES entry -> plan findings its statements are allowed to have, each with the reason it is accepted.
+# Keyed by entry rather than by function, so that allowing one variant of a query does not allow the others.
+ALLOWED_FINDINGS: Dict[str, Dict[str, str]] = {
+    **{f"addresses by {sort}": {
+        "NodeByLabelScan(Address)": "Computes the balance of every address at request time, whatever the sort",
+    } for sort in ("address", "balance", "transactionCount")},
+    "transactions by total_output": {
+        "NodeByLabelScan(Transaction)": "sort_by=total_output sums the outputs of every transaction first",
+    },
+}
+
+# Full passes over every relationship, or every relationship of a type; the latter is what a query relying on a
+# relationship property index falls back to when the index is not used
+_RELATIONSHIP_SCANS = ("DirectedRelationshipTypeScan", "UndirectedRelationshipTypeScan",
+                       "DirectedAllRelationshipsScan", "UndirectedAllRelationshipsScan")
+
+# Schema commands and statements already prefixed cannot be explained
+_UNEXPLAINABLE = ("CREATE ", "DROP ", "SHOW ", "EXPLAIN ", "PROFILE ")
+
+
+@dataclass
+class StatementPlan:
+    name: str
+    text: str
+    operators: List[str]
+    findings: List[str]
+    # READ_QUERIES entries that ran the statement
+    entries: List[str] = field(default_factory=list)
+
+    @property
+    def violations(self) -> List[str]:
+        """Findings that are not allowed for every entry that ran the statement."""
+        allowed = [ALLOWED_FINDINGS.get(entry, {}) for entry in self.entries] or [{}]
+        return [finding for finding in self.findings if any(finding not in entry for entry in allowed)]
+
+
+def _walk(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("children", []):
+        yield from _walk(child)
+
+
+def plan_findings(plan: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """
+    :return: Operator names of an EXPLAIN plan, and its full scans of large labels, full scans of relationships
+             and Cartesian products.
+    """
+    operators = []
+    findings = []
+    for operator in _walk(plan):
+        # e.g. "NodeByLabelScan@neo4j"
+        operator_type = operator["operatorType"].split("@")[0]
+        operators.append(operator_type)
+        if operator_type in ("AllNodesScan", "CartesianProduct"):
+            findings.append(operator_type)
+        elif operator_type == "NodeByLabelScan":
+            # Details read like "t:Transaction"
+            label = operator.get("arguments", {}).get("Details", "").rsplit(":", 1)[-1].strip("`")
+            if label in LARGE_LABELS:
+                findings.append(f"NodeByLabelScan({label})")
+        elif operator_type in _RELATIONSHIP_SCANS:
+            # Details read like "(a)-[r:HOLDS]->(asset)"; the all-relationships scans have no type
+            relationship_type = re.search(r":`?(\w+)`?]", operator.get("arguments", {}).get("Details", ""))
+            findings.append(f"{operator_type}({relationship_type.group(1)})" if relationship_type else operator_type)
+    return operators, list(dict.fromkeys(findings))
+
+
+class PlanRecorder:
+    """
+    Registry of the Cypher statements run through an ExplainingDriver. A statement is named after the module and
+    function that ran it, e.g. `db.graph.block.get_blocks`, with `#2`, `#3`... for further distinct statements of
+    the same function. Statements are attributed to the READ_QUERIES entry set in `entry` while they run.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.plans: Dict[Tuple[str, str], StatementPlan] = {}
+        self.entry: Optional[str] = None
+
+    def known(self, caller: str, text: str) -> bool:
+        """Whether the statement was explained already; if so, it is attributed to the current entry as well."""
+        with self._lock:
+            plan = self.plans.get((caller, text))
+            if plan is not None and self.entry and self.entry not in plan.entries:
+                plan.entries.append(self.entry)
+            return plan is not None
+
+    def record(self, caller: str, text: str, plan: Dict[str, Any]):
+        operators, findings = plan_findings(plan)
+        with self._lock:
+            if (caller, text) in self.plans:
+                return
+            ordinal = sum(1 for name, _ in self.plans if name == caller) + 1
+            name = caller if ordinal == 1 else f"{caller}#{ordinal}"
+            self.plans[(caller, text)] = StatementPlan(name=name, text=text, operators=operators,
+                                                       findings=findings, entries=[self.entry] if self.entry else [])
+
+
+def _explain_and_run(target, recorder: PlanRecorder, query, parameters: Optional[Dict[str, Any]], kwargs):
+    caller = query_caller(__name__)
+    name = f"{caller.f_globals['__name__'].removeprefix('app.')}.{caller.f_code.co_name}"
+    text = query.text if isinstance(query, Query) else query
+    if not text.lstrip().upper().startswith(_UNEXPLAINABLE) and not recorder.known(name, text):
+        plan = target.run("EXPLAIN " + text, parameters, **kwargs).consume().plan
+        recorder.record(name, text, plan)
+    # Run it as well, so that functions issuing several statements reach the later ones
+    return target.run(query, parameters, **kwargs)
+
+
+class _ExplainingTransaction:
+    def __init__(self, transaction, recorder: PlanRecorder):
+        self._transaction = transaction
+        self._recorder = recorder
+
+    def run(self, query, parameters: Optional[Dict[str, Any]] = None, **kwargs):
+        return _explain_and_run(self._transaction, self._recorder, query, parameters, kwargs)
+
+    def __getattr__(self, item):
+        return getattr(self._transaction, item)
+
+
+def _explaining_work(transaction_function, recorder: PlanRecorder):
+    @unit_of_work(getattr(transaction_function, "metadata", None), getattr(transaction_function, "timeout", None))
+    def work(tx, *args, **kwargs):
+        return transaction_function(_ExplainingTransaction(tx, recorder), *args, **kwargs)
+
+    return work
+
+
+class _ExplainingSession:
+    def __init__(self, session, recorder: PlanRecorder):
+        self._session = session
+        self._recorder = recorder
+
+    def run(self, query, parameters: Optional[Dict[str, Any]] = None, **kwargs):
+        return _explain_and_run(self._session, self._recorder, query, parameters, kwargs)
+
+    def execute_read(self, transaction_function, *args, **kwargs):
+        return self._session.execute_read(_explaining_work(transaction_function, self._recorder), *args, **kwargs)
+
+    def execute_write(self, transaction_function, *args, **kwargs):
+        return self._session.execute_write(_explaining_work(transaction_function, self._recorder), *args, **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._session.__exit__(exc_type, exc_value, traceback)
+
+    def __getattr__(self, item):
+        return getattr(self._session, item)
+
+
+class ExplainingDriver:
+    """Driver wrapper whose sessions EXPLAIN every statement into `recorder` before running it."""
+
+    def __init__(self, driver: Driver, recorder: PlanRecorder):
+        self._driver = driver
+        self.recorder = recorder
+
+    def session(self, **kwargs) -> _ExplainingSession:
+        return _ExplainingSession(self._driver.session(**kwargs), self.recorder)
+
+    def __getattr__(self, item):
+        return getattr(self._driver, item)
+
+
+@dataclass
+class PlanSamples:
+    """Keys the read queries are called with; existing ones when the graph has data, placeholders otherwise."""
+    block_hash: str = "0" * 64
+    tx_hash: str = "0" * 64
+    address: str = "addr1q" + "0" * 52
+    stake_address: str = "stake1u" + "0" * 52
+    fingerprint: str = "asset1" + "0" * 38
+    epoch_no: int = 0
+    entity_id: str = "entity_0"
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+_SAMPLE_QUERIES = {
+    "block_hash": "MATCH (b:Block) RETURN b.hash AS value LIMIT 1",
+    "tx_hash": "MATCH (t:Transaction) RETURN t.tx_hash AS value LIMIT 1",
+    "address": "MATCH (a:Address)-[:OWNS]->(:UTXO) RETURN a.address AS value LIMIT 1",
+    "stake_address": "MATCH (s:StakeAddress) RETURN s.address AS value LIMIT 1",
+    "fingerprint": "MATCH (a:Asset) RETURN a.fingerprint AS value LIMIT 1",
+    "epoch_no": "MATCH (e:Epoch) RETURN e.no AS value LIMIT 1",
+    "entity_id": "MATCH (e:Entity) RETURN e.entity_id AS value LIMIT 1",
+}
+
+
+def load_samples(driver: Driver) -> PlanSamples:
+    samples = PlanSamples()
+    with read_session(driver) as session:
+        for key, query in _SAMPLE_QUERIES.items():
+            record = session.execute_read(fetch_single, query)
+            if record and record["value"] is not None:
+                setattr(samples, key, record["value"])
+    return samples
+
+
+def _search(driver: Driver, q: str):
+    # Lookups run one by one: search() itself would drop those exceeding its time budget
+    for hit_type, query, params in classify(q):
+        _run_lookup(driver, hit_type, query, {**params, "limit": 10}, q, timeout=30)
+
+
+# Every read path, with the argument variants that change the Cypher that runs
+READ_QUERIES: List[Tuple[str, Callable[[Driver, PlanSamples], Any]]] = [
+    ("address graph", lambda driver, s: get_graph_by_address(driver, s.address)),
+    ("address graph in a time range", lambda driver, s: get_graph_by_address(
+        driver, s.address, "2024-01-01T00:00:00", "2024-02-01T00:00:00")),
+    *[(f"address expansion {direction.value}", lambda driver, s, direction=direction: expand_address_graph(
+        driver, s.address, depth=2, direction=direction)) for direction in Direction],
+    ("address details", lambda driver, s: get_address_details(driver, s.address)),
+    ("address transactions", lambda driver, s: get_address_transactions(driver, s.address)),
+    ("address transactions ascending", lambda driver, s: get_address_transactions(driver, s.address, ascending=True)),
+    ("address transactions after a cursor", lambda driver, s: get_address_transactions(
+        driver, s.address, encode_cursor({"timestamp": "2024-01-01T00:00:00Z", "tx_hash": s.tx_hash}))),
+    ("address UTXOs", lambda driver, s: get_address_utxos(driver, s.address)),
+    ("address UTXOs with spent", lambda driver, s: get_address_utxos(driver, s.address, unspent_only=False)),
+    ("address summaries", lambda driver, s: get_address_summaries(driver, [s.address])),
+    ("address holdings", lambda driver, s: get_address_holdings(driver, s.address)),
+    ("address holdings by name", lambda driver, s: get_address_holdings(driver, s.address, display_name="Tok")),
+    ("address holdings after a cursor", lambda driver, s: get_address_holdings(
+        driver, s.address, cursor=encode_cursor({"quantity": 1, "fingerprint": s.fingerprint}))),
+    *[(f"addresses by {sort}", lambda driver, s, sort=sort: asyncio.run(address_router.get_addresses(
+        page=0, size=10, sort=f"{sort},desc", driver=driver))) for sort in ("address", "balance", "transactionCount")],
+    ("address analytics", lambda driver, s: asyncio.run(address_router.get_address_analytics(
+        s.address, address_router.TimePeriod.ONE_MONTH, driver=driver))),
+    ("analytics run", lambda driver, s: get_analytics_run(driver)),
+    *[(f"top addresses by {metric.value}", lambda driver, s, metric=metric: get_top_addresses(driver, metric, 10))
+      for metric in RankingMetric],
+    ("asset graph", lambda driver, s: get_graph_by_asset(driver, s.fingerprint)),
+    ("asset details", lambda driver, s: get_asset_details(driver, s.fingerprint)),
+    ("block graph", lambda driver, s: get_graph_by_block_hash(driver, s.block_hash)),
+    ("block details", lambda driver, s: get_blocks_details(driver, [s.block_hash])),
+    ("blocks", lambda driver, s: get_blocks(driver, 0, 10)),
+    ("entity", lambda driver, s: get_entity(driver, s.entity_id)),
+    ("epoch details", lambda driver, s: get_epoch_details(driver, s.epoch_no)),
+    ("epochs", lambda driver, s: get_epochs(driver, 0, 10)),
+    ("stake details", lambda driver, s: get_stake_details(driver, s.stake_address)),
+    ("transaction details", lambda driver, s: get_transactions_details(driver, [s.tx_hash])),
+    ("transaction UTXOs", lambda driver, s: get_transaction_utxos(driver, s.tx_hash)),
+    ("transaction signatories", lambda driver, s: transaction_router.get_transaction_signatories(s.tx_hash, driver)),
+    *[(f"transactions by {sort_by}", lambda driver, s, sort_by=sort_by: asyncio.run(transaction_router.get_transactions(
+        driver=driver, page=1, page_size=20, sort_by=sort_by, sort_order="DESC", tx_hash_filter=None,
+        tx_hash_prefix=None)))
+      for sort_by in ("fee", "total_output", "slot_no", "timestamp")],
+    ("transactions by timestamp ascending, later page", lambda driver, s: asyncio.run(
+        transaction_router.get_transactions(driver=driver, page=5, page_size=20, sort_by="timestamp",
+                                            sort_order="ASC", tx_hash_filter=None, tx_hash_prefix=None))),
+    ("transactions by hash prefix", lambda driver, s: asyncio.run(transaction_router.get_transactions(
+        driver=driver, page=1, page_size=20, sort_by="timestamp", sort_order="DESC", tx_hash_filter=None,
+        tx_hash_prefix=s.tx_hash[:8]))),
+    ("transactions by hash substring", lambda driver, s: asyncio.run(transaction_router.get_transactions(
+        driver=driver, page=1, page_size=20, sort_by="timestamp", sort_order="DESC", tx_hash_filter=s.tx_hash[8:16],
+        tx_hash_prefix=None))),
+    ("search by number", lambda driver, s: _search(driver, "1")),
+    ("search by hash prefix", lambda driver, s: _search(driver, s.tx_hash[:8])),
+    ("search by address", lambda driver, s: _search(driver, s.address[:12])),
+    ("search by stake address", lambda driver, s: _search(driver, s.stake_address[:12])),
+    ("search by fingerprint", lambda driver, s: _search(driver, s.fingerprint[:12])),
+    ("search by token name", lambda driver, s: _search(driver, "token")),
+]
+
+
+def init_schema(driver: Driver):
+    """
+    Create every constraint and index the ingestion and analytics jobs create, without writing any data, so that
+    plans can be checked against an otherwise empty database.
+    """
+    insert_epochs(driver, [])
+    insert_blocks(driver, [])
+    insert_utxos(driver, {})
+    insert_assets(driver, [])
+    write_entities(driver, {}, {})
+    create_search_indexes(driver)
+    create_analytics_indexes(driver)
+    with write_session(driver) as session:
+        session.run("CALL db.awaitIndexes(300)")
+
+
+def check_plans(driver: Driver) -> Tuple[List[StatementPlan], Dict[str, str]]:
+    """
+    Run every entry of READ_QUERIES through an ExplainingDriver.
+    :return: The plan of every distinct statement, and the error of each entry that failed to run.
+    """
+    recorder = PlanRecorder()
+    explaining_driver = ExplainingDriver(driver, recorder)
+    samples = load_samples(driver)
+    errors = {}
+    for name, call in READ_QUERIES:
+        recorder.entry = name
+        try:
+            call(explaining_driver, samples)
+        except Exception as e:
+            logging.warning(f"Read query '{name}' failed: {e}")
+            errors[name] = str(e)
+    return sorted(recorder.plans.values(), key=lambda plan: plan.name), errors
@@ -0,0 +1,166 @@
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Tuple
+
+from neo4j import Driver, unit_of_work
+
+from app.db.graph.access import fetch_all, read_session, write_session
+from app.db.graph.asset import ASSET_NAME_INDEX
+from app.db.graph.db_neo4j import serialize_value
+from app.models.search import SearchHit, SearchHitType, SearchResults
+
+_HEX = re.compile(r"^[0-9a-f]+$")
+_LUCENE_UNSAFE = re.compile(r"[^0-9A-Za-z_]")
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="search")
+
+# (hit type, Cypher) per lookup. Prefix lookups go through the range indexes backing the uniqueness constraints,
+# which serve STARTS WITH directly; every query returns `id`, `label` and `exact`.
+_PREFIX_LOOKUPS = {
+    SearchHitType.TRANSACTION: """
+    MATCH (t:Transaction) WHERE t.tx_hash STARTS WITH $q
+    RETURN t.tx_hash AS id, t.tx_hash AS label, t.tx_hash = $q AS exact
+    LIMIT $limit
+    """,
+    SearchHitType.BLOCK: """
+    MATCH (b:Block) WHERE b.hash STARTS WITH $q
+    RETURN b.hash AS id, 'Block ' + toString(b.block_no) AS label, b.hash = $q AS exact
+    LIMIT $limit
+    """,
+    SearchHitType.ADDRESS: """
+    MATCH (a:Address) WHERE a.address STARTS WITH $q
+    RETURN a.address AS id, a.address AS label, a.address = $q AS exact
+    LIMIT $limit
+    """,
+    SearchHitType.STAKE_ADDRESS: """
+    MATCH (s:StakeAddress) WHERE s.address STARTS WITH $q
+    RETURN s.address AS id, s.address AS label, s.address = $q AS exact
+    LIMIT $limit
+    """,
+    SearchHitType.ASSET: """
+    MATCH (a:Asset) WHERE a.fingerprint STARTS WITH $q
+    RETURN a.fingerprint AS id, coalesce(a.display_name, a.fingerprint) AS label, a.fingerprint = $q AS exact
+    LIMIT $limit
+    """,
+}
+
+_NUMBER_LOOKUPS = {
+    SearchHitType.EPOCH: """
+    MATCH (e:Epoch {no: $number})
+    RETURN toString(e.no) AS id, 'Epoch ' + toString(e.no) AS label, true AS exact
+    """,
+    SearchHitType.BLOCK: """
+    MATCH (b:Block {block_no: $number})
+    RETURN b.hash AS id, 'Block ' + toString(b.block_no) AS label, true AS exact
+    """,
+}
+
+_ASSET_NAME_LOOKUP = f"""
+CALL db.index.fulltext.queryNodes('{ASSET_NAME_INDEX}', $text, {{limit: $limit}}) YIELD node, score
+RETURN node.fingerprint AS id, coalesce(node.display_name, node.fingerprint) AS label, false AS exact, score
+"""
+
+# Tie-breaker between equally good hits of different types
+_TYPE_PRIORITY = {
+    SearchHitType.TRANSACTION: 0.06,
+    SearchHitType.BLOCK: 0.05,
+    SearchHitType.EPOCH: 0.04,
+    SearchHitType.ADDRESS: 0.03,
+    SearchHitType.STAKE_ADDRESS: 0.02,
+    SearchHitType.ASSET: 0.01,
+}
+
+
+def create_search_indexes(driver: Driver):
+    """
+    Indexes used by search on top of the uniqueness constraints. Ingestion creates them as well; this is for graphs
+    built before search existed.
+    """
+    with write_session(driver) as session:
+        session.run("CREATE INDEX IF NOT EXISTS FOR (b:Block) ON (b.block_no)")
+        session.run("CREATE TEXT INDEX IF NOT EXISTS FOR (t:Transaction) ON (t.tx_hash)")
+        session.run(f"CREATE FULLTEXT INDEX {ASSET_NAME_INDEX} IF NOT EXISTS FOR (a:Asset) ON EACH [a.display_name]")
+
+
+def classify(q: str) -> List[Tuple[SearchHitType, str, Dict]]:
+    """
+    Pick the lookups worth running for a search string from its format alone, so that e.g. a bech32 address
+    never hits the transaction index.
+    :return: (hit type, Cypher, parameters) per lookup.
+    """
+    lookups = []
+    lowered = q.lower()
+    if q.isdigit():
+        for hit_type, query in _NUMBER_LOOKUPS.items():
+            lookups.append((hit_type, query, {"number": int(q)}))
+    if _HEX.match(lowered) and len(lowered) >= 4:
+        # Hashes are 64 hex chars; a partial hash can be either kind
+        for hit_type in (SearchHitType.TRANSACTION, SearchHitType.BLOCK):
+            lookups.append((hit_type, _PREFIX_LOOKUPS[hit_type], {"q": lowered}))
+    if lowered.startswith(("addr1", "addr_test1")) or q.startswith(("Ae2", "DdzFF")):
+        lookups.append((SearchHitType.ADDRESS, _PREFIX_LOOKUPS[SearchHitType.ADDRESS], {"q": q}))
+    elif lowered.startswith(("stake1", "stake_test1")):
+        lookups.append((SearchHitType.STAKE_ADDRESS, _PREFIX_LOOKUPS[SearchHitType.STAKE_ADDRESS], {"q": lowered}))
+    elif lowered.startswith("asset1"):
+        lookups.append((SearchHitType.ASSET, _PREFIX_LOOKUPS[SearchHitType.ASSET], {"q": lowered}))
+    elif not lookups:
+        # Free text: token names. Lucene syntax is stripped, each remaining term is matched as a prefix
+        terms = [_LUCENE_UNSAFE.sub("", term) for term in q.split()]
+        text = " ".join(f"{term}*" for term in terms if term)
+        if text:
+            lookups.append((SearchHitType.ASSET, _ASSET_NAME_LOOKUP, {"text": text}))
+    return lookups
+
+
+def _run_lookup(driver: Driver, hit_type: SearchHitType, query: str, params: Dict, q: str,
+                timeout: float) -> List[SearchHit]:
+    hits = []
+    with read_session(driver) as session:
+        result = session.execute_read(unit_of_work(timeout=timeout)(fetch_all), query, params)
+        for record in result:
+            hit_id = serialize_value(record["id"])
+            if record["exact"]:
+                score = 1.0
+            elif "score" in record.keys():
+                # Lucene scores are unbounded; squash them below exact and prefix matches
+                score = 0.5 * record["score"] / (1 + record["score"])
+            else:
+                # Prefix match: the more of the id the query covers, the better
+                score = 0.5 + 0.4 * len(q) / max(len(hit_id), 1)
+            hits.append(SearchHit(type=hit_type, id=hit_id, label=str(record["label"]),
+                                  score=round(score + _TYPE_PRIORITY[hit_type], 4)))
+    return hits
+
+
+def search(driver: Driver, q: str, limit: int = 10, budget: float = 0.5) -> SearchResults:
+    """
+    Run every lookup that matches the format of `q` in parallel and merge the hits by score. Lookups that have not
+    finished after `budget` seconds are left out and the result is flagged as partial; each query also carries a
+    server-side timeout so that it does not keep running in Neo4j.
+    """
+    started = time.monotonic()
+    q = q.strip()
+    lookups = classify(q)
+
+    futures = [
+        _executor.submit(_run_lookup, driver, hit_type, query, {**params, "limit": limit}, q, budget)
+        for hit_type, query, params in lookups
+    ]
+    done, not_done = wait(futures, timeout=budget)
+
+    hits: Dict[Tuple[SearchHitType, str], SearchHit] = {}
+    for future in done:
+        try:
+            for hit in future.result():
+                key = (hit.type, hit.id)
+                if key not in hits or hits[key].score < hit.score:
+                    hits[key] = hit
+        except Exception as e:
+            logging.warning(f"Search lookup failed for {q!r}: {e}")
+    for future in not_done:
+        future.cancel()
+
+    ranked = sorted(hits.values(), key=lambda hit: hit.score, reverse=True)[:limit]
+    return SearchResults(query=q, hits=ranked, partial=bool(not_done),
+                         took_ms=round((time.monotonic() - started) * 1000, 1))
@@ -0,0 +1,178 @@
+from collections import defaultdict
+from typing import Dict, List, Protocol, Set, Tuple
+
+from neo4j import Driver
+
+from app.db.graph.asset import insert_assets, _display_name
+from app.db.graph.block import insert_blocks
+from app.db.graph.epoch import insert_epochs
+from app.db.graph.utxo import insert_utxos
+from app.db.models.base import Block, Epoch
+from app.models.transactions import Transaction, UTXOAsset
+from app.utils.currency_converter import CurrencyConverter
+
+
+class GraphSink(Protocol):
+    """Destination of the ingestion pipeline, in the order app/extract_transactions_to_graph_store.py writes."""
+
+    def insert_epochs(self, epochs: List[Epoch]): ...
+
+    def insert_blocks(self, blocks: List[Block]): ...
+
+    def insert_utxos(self, transactions: Dict[str, Transaction]): ...
+
+    def insert_assets(self, assets: List[UTXOAsset]): ...
+
+
+class Neo4jSink:
+    def __init__(self, driver: Driver):
+        self.driver = driver
+
+    def insert_epochs(self, epochs: List[Epoch]):
+        insert_epochs(self.driver, epochs)
+
+    def insert_blocks(self, blocks: List[Block]):
+        insert_blocks(self.driver, blocks)
+
+    def insert_utxos(self, transactions: Dict[str, Transaction]):
+        insert_utxos(self.driver, transactions)
+
+    def insert_assets(self, assets: List[UTXOAsset]):
+        insert_assets(self.driver, assets)
+
+
+class InMemorySink:
+    """
+    Keeps the nodes and relationships the Neo4j writers MERGE, keyed like their uniqueness constraints, with the
+    same property conversions. The aggregates maintained alongside insert_utxos (address, stake and holding
+    counters) are not computed.
+    """
+
+    def __init__(self):
+        # Label -> key -> properties
+        self.nodes: Dict[str, Dict[object, dict]] = defaultdict(dict)
+        # Type -> (from key, to key)
+        self.relationships: Dict[str, Set[Tuple[object, object]]] = defaultdict(set)
+        self._block_ids: Dict[int, str] = {}
+
+    def insert_epochs(self, epochs: List[Epoch]):
+        for epoch in epochs:
+            self.nodes["Epoch"].setdefault(epoch.no, {
+                "no": epoch.no,
+                "out_sum": CurrencyConverter.lovelace_to_ada(epoch.out_sum),
+                "fees": CurrencyConverter.lovelace_to_ada(epoch.fees),
+                "start_time": epoch.start_time.isoformat(),
+                "end_time": epoch.end_time.isoformat()
+            })
+        for no in self.nodes["Epoch"]:
+            if no + 1 in self.nodes["Epoch"]:
+                self.relationships["HAS_SUCCESSOR"].add((no, no + 1))
+
+    def insert_blocks(self, blocks: List[Block]):
+        for block in blocks:
+            block_hash = block.hash.hex()
+            self._block_ids[block.id] = block_hash
+            self.nodes["Block"].setdefault(block_hash, {}).update({
+                "hash": block_hash,
+                "block_id": block.id,
+                "epoch_no": block.epoch_no,
+                "slot_no": block.slot_no,
+                "epoch_slot_no": block.epoch_slot_no,
+                "block_no": block.block_no,
+                "previous_id": block.previous_id,
+                "slot_leader_id": block.slot_leader_id,
+                "size": block.size,
+                "time": block.time.isoformat(),
+                "tx_count": block.tx_count,
+                "proto_major": block.proto_major,
+                "proto_minor": block.proto_minor,
+                "vrf_key": block.vrf_key,
+                "op_cert": block.op_cert,
+                "op_cert_counter": block.op_cert_counter
+            })
+            previous = self._block_ids.get(block.previous_id)
+            if previous:
+                self.relationships["HAS_PREVIOUS_BLOCK"].add((block_hash, previous))
+            self.nodes["Epoch"].setdefault(block.epoch_no, {"no": block.epoch_no})
+            self.relationships["HAS_BLOCK"].add((block.epoch_no, block_hash))
+
+    def _utxo(self, utxo_hash: str, index: int, value: int, utxo) -> Tuple[str, int]:
+        key = (utxo_hash, index)
+        self.nodes["UTXO"].setdefault(key, {
+            "utxo_hash": utxo_hash,
+            "index": index,
+            "value": int(value) / 1000000,
+            "asset_policy": utxo.asset_policy,
+            "asset_name": utxo.asset_name,
+            "asset_quantity": utxo.asset_quantity,
+            "timestamp": utxo.creating_timestamp
+        })
+        return key
+
+    def _address(self, address: str, stake_address: str):
+        self.nodes["Address"].setdefault(address, {"address": address})
+        if stake_address:
+            self.nodes["StakeAddress"].setdefault(stake_address, {"address": stake_address})
+            self.relationships["STAKE"].add((address, stake_address))
+            self.relationships["STAKE_OF"].add((stake_address, address))
+
+    def insert_utxos(self, transactions: Dict[str, Transaction]):
+        for tx_hash, tx in transactions.items():
+            if tx.outputs:
+                timestamp = tx.outputs[0].creating_timestamp
+            elif tx.inputs:
+                timestamp = tx.inputs[0].consuming_timestamp
+            else:
+                continue
+            self.nodes["Transaction"].setdefault(tx_hash, {"tx_hash": tx_hash, "timestamp": timestamp,
+                                                           "fee": int(tx.fee) / 1000000})
+            if tx.block_hash in self.nodes["Block"]:
+                self.relationships["CONTAINS"].add((tx.block_hash, tx_hash))
+                self.relationships["CONTAINED_BY"].add((tx_hash, tx.block_hash))
+
+            for input_utxo in tx.inputs:
+                key = self._utxo(input_utxo.creating_tx_hash, input_utxo.tx_out_index, input_utxo.input_value,
+                                 input_utxo)
+                self._address(input_utxo.input_address, input_utxo.stake_address)
+                self.relationships["OWNS"].add((input_utxo.input_address, key))
+                self.relationships["INPUT"].add((key, tx_hash))
+
+            for output_utxo in tx.outputs:
+                key = self._utxo(output_utxo.creating_tx_hash, output_utxo.tx_out_index, output_utxo.output_value,
+                                 output_utxo)
+                self._address(output_utxo.output_address, output_utxo.stake_address)
+                self.relationships["OUTPUT"].add((tx_hash, key))
+                self.relationships["OWNS"].add((output_utxo.output_address, key))
+
+    def insert_assets(self, assets: List[UTXOAsset]):
+        for asset in assets:
+            node = self.nodes["Asset"].setdefault(asset.fingerprint, {"fingerprint": asset.fingerprint,
+                                                                      "policy": asset.policy, "name": asset.name})
+            node["display_name"] = _display_name(asset.name)
+            key = (asset.creating_tx_hash, asset.tx_out_index)
+            if key in self.nodes["UTXO"]:
+                self.relationships["CARRIES"].add((key, asset.fingerprint))
+            if asset.creating_tx_hash in self.nodes["Transaction"]:
+                self.relationships["USED_IN"].add((asset.fingerprint, asset.creating_tx_hash))
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        return {
+            "nodes": {label: len(nodes) for label, nodes in self.nodes.items()},
+            "relationships": {rel_type: len(pairs) for rel_type, pairs in self.relationships.items()}
+        }
+
+
+class NullSink:
+    """Drops everything, to time extraction and transformation without any write cost."""
+
+    def insert_epochs(self, epochs: List[Epoch]):
+        pass
+
+    def insert_blocks(self, blocks: List[Block]):
+        pass
+
+    def insert_utxos(self, transactions: Dict[str, Transaction]):
+        pass
+
+    def insert_assets(self, assets: List[UTXOAsset]):
+        pass
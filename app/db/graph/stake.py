@@ -0,0 +1,151 @@
+import logging
+from typing import Dict, Optional
+
+from neo4j import Driver
+
+from app.db.graph.access import consume, fetch_single, read_session, write_session
+from app.db.graph.db_neo4j import serialize_value
+from app.models.details import StakeDetails
+from app.models.transactions import Transaction
+from app.utils.single_flight import single_flight
+
+
+def update_stake_aggregates(driver: Driver, transactions: Dict[str, Transaction]):
+    """
+    Fold the outputs created and inputs spent by `transactions` into the aggregates kept on their StakeAddress
+    nodes: controlled balance, unspent UTXO count, linked address count and last activity.
+    Every UTXO is counted once on creation and once on spending, whatever order ranges are ingested in, so
+    re-ingesting a range does not change the totals. The markers that record it on the UTXO nodes are listed in
+    db_neo4j.BOOKKEEPING_PROPERTIES, which keeps them out of responses.
+    Must run after the transactions have been inserted with insert_utxos.
+    """
+    created = []
+    spent = []
+    for tx_hash, tx in transactions.items():
+        for output_utxo in tx.outputs:
+            if output_utxo.stake_address:
+                created.append({
+                    "utxo_hash": output_utxo.creating_tx_hash,
+                    "index": output_utxo.tx_out_index,
+                    "stake_address": output_utxo.stake_address,
+                    "timestamp": output_utxo.creating_timestamp
+                })
+        for input_utxo in tx.inputs:
+            if input_utxo.stake_address:
+                spent.append({
+                    "utxo_hash": input_utxo.creating_tx_hash,
+                    "index": input_utxo.tx_out_index,
+                    "stake_address": input_utxo.stake_address,
+                    "timestamp": input_utxo.consuming_timestamp
+                })
+
+    with write_session(driver) as session:
+        session.run("CREATE INDEX IF NOT EXISTS FOR (s:StakeAddress) ON (s.balance)")
+
+        session.execute_write(
+            consume,
+            """
+            UNWIND $rows AS row
+            MATCH (u:UTXO {utxo_hash: row.utxo_hash, index: row.index})
+            WHERE u.stake_counted IS NULL
+            SET u.stake_counted = true
+            WITH u, row
+            MATCH (s:StakeAddress {address: row.stake_address})
+            SET s.balance = coalesce(s.balance, 0) + u.value,
+                s.utxo_count = coalesce(s.utxo_count, 0) + 1,
+                s.last_activity = CASE WHEN s.last_activity IS NULL OR s.last_activity < datetime(row.timestamp)
+                                       THEN datetime(row.timestamp) ELSE s.last_activity END
+            """,
+            {"rows": created}
+        )
+        session.execute_write(
+            consume,
+            """
+            UNWIND $rows AS row
+            MATCH (u:UTXO {utxo_hash: row.utxo_hash, index: row.index})
+            WHERE u.stake_spent_counted IS NULL
+            SET u.stake_spent_counted = true
+            WITH u, row
+            MATCH (s:StakeAddress {address: row.stake_address})
+            SET s.balance = coalesce(s.balance, 0) - u.value,
+                s.utxo_count = coalesce(s.utxo_count, 0) - 1,
+                s.last_activity = CASE WHEN s.last_activity IS NULL OR s.last_activity < datetime(row.timestamp)
+                                       THEN datetime(row.timestamp) ELSE s.last_activity END
+            """,
+            {"rows": spent}
+        )
+        # Relationship counts come from the node's degree store; no need to expand the addresses
+        session.execute_write(
+            consume,
+            """
+            UNWIND $stake_addresses AS stake_address
+            MATCH (s:StakeAddress {address: stake_address})
+            SET s.address_count = COUNT { (s)-[:STAKE_OF]->(:Address) }
+            """,
+            {"stake_addresses": list({row["stake_address"] for row in created + spent})}
+        )
+
+    logging.info(f"Updated stake aggregates with {len(created)} created and {len(spent)} spent UTXOs")
+
+
+def rebuild_stake_aggregates(driver: Driver):
+    """
+    Recompute the aggregates of every StakeAddress from scratch, for graphs ingested before they were maintained.
+    """
+    with write_session(driver) as session:
+        session.run("CREATE INDEX IF NOT EXISTS FOR (s:StakeAddress) ON (s.balance)")
+        session.run(
+            """
+            MATCH (s:StakeAddress)
+            CALL {
+                WITH s
+                OPTIONAL MATCH (s)-[:STAKE_OF]->(:Address)-[:OWNS]->(u:UTXO)
+                OPTIONAL MATCH (u)-[:INPUT]->(t:Transaction)
+                SET u.stake_counted = true,
+                    u.stake_spent_counted = CASE WHEN t IS NULL THEN null ELSE true END
+                WITH s, u, t
+                WITH s,
+                     sum(CASE WHEN u IS NOT NULL AND t IS NULL THEN u.value ELSE 0 END) AS balance,
+                     count(CASE WHEN u IS NOT NULL AND t IS NULL THEN 1 END) AS utxo_count,
+                     max(CASE WHEN t IS NULL THEN u.timestamp ELSE t.timestamp END) AS last_activity
+                SET s.balance = balance,
+                    s.utxo_count = utxo_count,
+                    s.last_activity = last_activity,
+                    s.address_count = COUNT { (s)-[:STAKE_OF]->(:Address) }
+            } IN TRANSACTIONS OF 1000 ROWS
+            """
+        )
+    logging.info("Rebuilt stake aggregates")
+
+
+@single_flight
+def get_stake_details(driver: Driver, stake_address: str, page: int = 0, size: int = 50) -> Optional[StakeDetails]:
+    """
+    Precomputed aggregates of a stake key plus one page of its payment addresses.
+    """
+    query = """
+    MATCH (s:StakeAddress {address: $stake_address})
+    CALL {
+        WITH s
+        MATCH (s)-[:STAKE_OF]->(a:Address)
+        WITH a ORDER BY a.address SKIP $skip LIMIT $limit
+        RETURN collect(a.address) AS addresses
+    }
+    RETURN s, addresses
+    """
+    with read_session(driver) as session:
+        record = session.execute_read(fetch_single, query, {"stake_address": stake_address, "skip": page * size,
+                                                            "limit": size})
+        if not record:
+            return None
+        stake = record["s"]
+        return StakeDetails(
+            stake_address=stake["address"],
+            address_count=stake.get("address_count") or 0,
+            balance=str(stake.get("balance") or 0),
+            utxo_count=stake.get("utxo_count") or 0,
+            last_activity=serialize_value(stake.get("last_activity")),
+            addresses=record["addresses"],
+            page=page,
+            page_size=size
+        )
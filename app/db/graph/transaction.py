@@ -1,12 +1,27 @@
+from typing import Dict, List, Optional
+
 from neo4j import Driver
 
+from app.db.graph.access import fetch_all, fetch_single, read_session
 from app.db.graph.db_neo4j import serialize_node
 from app.models.details import TransactionDetails
+from app.models.graph import TransactionUTXOs
+from app.utils.single_flight import single_flight
+
 
+def get_transaction_details(driver: Driver, transaction_hash: str) -> Optional[TransactionDetails]:
+    return get_transactions_details(driver, [transaction_hash]).get(transaction_hash)
 
-def get_transaction_details(driver: Driver, transaction_hash: str) -> TransactionDetails:
+
+@single_flight
+def get_transactions_details(driver: Driver, transaction_hashes: List[str]) -> Dict[str, TransactionDetails]:
+    """
+    Resolve the details of many transactions with a single UNWIND query.
+    :return: Details keyed by transaction hash; hashes that were not found are absent.
+    """
     query = """
-    MATCH (t:Transaction {tx_hash: $transaction_hash})
+    UNWIND $transaction_hashes AS transaction_hash
+    MATCH (t:Transaction {tx_hash: transaction_hash})
     MATCH (input:UTXO)-[:INPUT]->(t)
     MATCH (t)-[:OUTPUT]->(output:UTXO)
     MATCH (input)<-[:OWNS]-(inputAddress:Address)
@@ -14,64 +29,85 @@ def get_transaction_details(driver: Driver, transaction_hash: str) -> Transactio
     MATCH (t)-[:CONTAINED_BY]->(b:Block)
     OPTIONAL MATCH (inputAddress)-[:STAKE]->(inputStake:StakeAddress)
     OPTIONAL MATCH (outputAddress)-[:STAKE]->(outputStake:StakeAddress)
-    WITH t, input, output, inputAddress, outputAddress, inputStake, outputStake, b
-    RETURN t, 
+    WITH transaction_hash, t, input, output, inputAddress, outputAddress, inputStake, outputStake, b
+    RETURN transaction_hash, t,
            collect(DISTINCT {utxo: input, address: inputAddress, stake: inputStake}) AS inputs,
            collect(DISTINCT {utxo: output, address: outputAddress, stake: outputStake}) AS outputs,
            b
     """
-    with driver.session() as session:
-        result = session.run(query, {"transaction_hash": transaction_hash})
-        record = result.single()
-        if record:
-            transaction = serialize_node(record["t"])
-            inputs = [serialize_node(utxo_input) for utxo_input in record["inputs"]]
-            outputs = [serialize_node(output) for output in record["outputs"]]
-            block = serialize_node(record["b"]) if record["b"] else None
+    details = {}
+    with read_session(driver) as session:
+        result = session.execute_read(fetch_all, query, {"transaction_hashes": transaction_hashes})
+        for record in result:
+            details[record["transaction_hash"]] = _build_transaction_details(record)
+    return details
+
 
-            # Create a summary of inputs and outputs
-            summary = {}
-            for input in inputs:
-                address = input["address"]["address"]
-                if address not in summary:
-                    summary[address] = {"sent": 0, "received": 0, "tokens_sent": 0, "tokens_received": 0}
-                summary[address]["sent"] += input["utxo"]["value"]
-                summary[address]["tokens_sent"] += 0 # hardcoded to 0
+def _build_transaction_details(record) -> TransactionDetails:
+    transaction = serialize_node(record["t"])
+    inputs = [serialize_node(utxo_input) for utxo_input in record["inputs"]]
+    outputs = [serialize_node(output) for output in record["outputs"]]
+    block = serialize_node(record["b"]) if record["b"] else None
 
-            for output in outputs:
-                address = output["address"]["address"]
-                if address not in summary:
-                    summary[address] = {"sent": 0, "received": 0, "tokens_sent": 0, "tokens_received": 0}
-                summary[address]["received"] += output["utxo"]["value"]
-                summary[address]["tokens_received"] += 0  # hardcoded to 0
+    # Create a summary of inputs and outputs
+    summary = {}
+    for input in inputs:
+        address = input["address"]["address"]
+        if address not in summary:
+            summary[address] = {"sent": 0, "received": 0, "tokens_sent": 0, "tokens_received": 0}
+        summary[address]["sent"] += input["utxo"]["value"]
+        summary[address]["tokens_sent"] += 0 # hardcoded to 0
 
-            return {
-                "hash": transaction["tx_hash"],
-                "created_at": transaction["timestamp"],
-                "total_output": sum(output["utxo"]["value"] for output in outputs),
-                "fees": transaction["fee"],
-                "block_no": block.get("block_no") if block else None,
-                "slot_no": block.get("slot_no") if block else None,
-                "absolute_slot_no": block.get("absolute_slot") if block else None,
-                "inputs": [{
-                    "address": utxo_input["address"]["address"],
-                    "stake_address": utxo_input["stake"]["address"] if utxo_input["stake"] else None,
-                    "amount": utxo_input["utxo"]["value"],
-                    "utxo_hash": utxo_input["utxo"]["utxo_hash"],
-                    "utxo_index": utxo_input["utxo"]["index"]
-                } for utxo_input in inputs],
-                "outputs": [{
-                    "address": output["address"]["address"],
-                    "stake_address": output["stake"]["address"] if output["stake"] else None,
-                    "amount": output["utxo"]["value"]
-                } for output in outputs],
-                "summary": [
-                    {
-                        "address": addr,
-                        "net_amount": data["received"] - data["sent"],
-                        "tokens_sent": 0,  # hardcoded to 0
-                        "tokens_received": 0  # hardcoded to 0
-                    } for addr, data in summary.items()
-                ]
-            }
-        return None
+    for output in outputs:
+        address = output["address"]["address"]
+        if address not in summary:
+            summary[address] = {"sent": 0, "received": 0, "tokens_sent": 0, "tokens_received": 0}
+        summary[address]["received"] += output["utxo"]["value"]
+        summary[address]["tokens_received"] += 0  # hardcoded to 0
+
+    return {
+        "hash": transaction["tx_hash"],
+        "created_at": transaction["timestamp"],
+        "total_output": sum(output["utxo"]["value"] for output in outputs),
+        "fees": transaction["fee"],
+        "block_no": block.get("block_no") if block else None,
+        "slot_no": block.get("slot_no") if block else None,
+        "absolute_slot_no": block.get("absolute_slot") if block else None,
+        "inputs": [{
+            "address": utxo_input["address"]["address"],
+            "stake_address": utxo_input["stake"]["address"] if utxo_input["stake"] else None,
+            "amount": utxo_input["utxo"]["value"],
+            "utxo_hash": utxo_input["utxo"]["utxo_hash"],
+            "utxo_index": utxo_input["utxo"]["index"]
+        } for utxo_input in inputs],
+        "outputs": [{
+            "address": output["address"]["address"],
+            "stake_address": output["stake"]["address"] if output["stake"] else None,
+            "amount": output["utxo"]["value"]
+        } for output in outputs],
+        "summary": [
+            {
+                "address": addr,
+                "net_amount": data["received"] - data["sent"],
+                "tokens_sent": 0,  # hardcoded to 0
+                "tokens_received": 0  # hardcoded to 0
+            } for addr, data in summary.items()
+        ]
+    }
+
+
+def get_transaction_utxos(driver: Driver, transaction_hash: str) -> TransactionUTXOs:
+    query = """
+    MATCH (t:Transaction {tx_hash: $transaction_hash})
+    OPTIONAL MATCH (input:UTXO)-[:INPUT]->(t)
+    OPTIONAL MATCH (t)-[:OUTPUT]->(output:UTXO)
+    RETURN collect(DISTINCT input) AS inputs, collect(DISTINCT output) AS outputs
+    """
+    with read_session(driver) as session:
+        record = session.execute_read(fetch_single, query, {"transaction_hash": transaction_hash})
+        if record:
+            return TransactionUTXOs(
+                inputs=[serialize_node(utxo) for utxo in record["inputs"]],
+                outputs=[serialize_node(utxo) for utxo in record["outputs"]]
+            )
+        return TransactionUTXOs(inputs=[], outputs=[])
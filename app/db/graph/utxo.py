@@ -1,32 +1,43 @@
 import logging
 from typing import Dict
 
-from neo4j import Driver
+from neo4j import Driver, ManagedTransaction
 
+from app.db.graph.address import update_address_aggregates
+from app.db.graph.access import write_session
+from app.db.graph.asset import release_spent_holdings
+from app.db.graph.stake import update_stake_aggregates
 from app.models.transactions import Transaction
 
 
 def insert_utxos(driver: Driver, transactions: Dict[str, Transaction], batch_size: int = 1000):
-    with driver.session() as session:
+    with write_session(driver) as session:
         # Create constraints to ensure uniqueness of addresses, transactions, stake addresses, and UTXOs
         session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (a:Address) REQUIRE a.address IS UNIQUE")
         session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (t:Transaction) REQUIRE t.tx_hash IS UNIQUE")
         session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (s:StakeAddress) REQUIRE s.address IS UNIQUE")
         session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (u:UTXO) REQUIRE (u.utxo_hash, u.index) IS UNIQUE")
+        # Sort keys of the transaction list
+        session.run("CREATE INDEX IF NOT EXISTS FOR (t:Transaction) ON (t.timestamp)")
+        session.run("CREATE INDEX IF NOT EXISTS FOR (t:Transaction) ON (t.fee)")
+        # Serves the CONTAINS filter of the transaction list
+        session.run("CREATE TEXT INDEX IF NOT EXISTS FOR (t:Transaction) ON (t.tx_hash)")
 
-        def process_batch(batch_to_process: Dict[str, Transaction]):
-            for tx_hash, tx in batch_to_process.items():
+        # Each batch is one managed transaction; its statements only MERGE, so a retry after a failover is safe
+        def process_batch(tx: ManagedTransaction, batch_to_process: Dict[str, Transaction]):
+            for tx_hash, transaction in batch_to_process.items():
 
-                if tx.outputs:
-                    timestamp = tx.outputs[0].creating_timestamp  # Assuming the timestamp is consistent across outputs
-                elif tx.inputs:
-                    timestamp = tx.inputs[0].consuming_timestamp  # Assuming the timestamp is consistent across inputs
+                # Assuming the timestamp is consistent across outputs, or across inputs
+                if transaction.outputs:
+                    timestamp = transaction.outputs[0].creating_timestamp
+                elif transaction.inputs:
+                    timestamp = transaction.inputs[0].consuming_timestamp
                 else:
                     logging.warning(f"Transaction {tx_hash} has no inputs or outputs")
                     continue
 
                 logging.debug(f'Inserting transaction: {tx_hash}')
-                session.run(
+                tx.run(
                     """
                     MERGE (t:Transaction {tx_hash: $tx_hash})
                     ON CREATE SET t.timestamp = datetime($timestamp),
@@ -35,12 +46,12 @@ def insert_utxos(driver: Driver, transactions: Dict[str, Transaction], batch_siz
                     {
                         "tx_hash": tx_hash,
                         "timestamp": timestamp,
-                        "fee": int(tx.fee) / 1000000,
-                        "block_index": tx.block_index
+                        "fee": int(transaction.fee) / 1000000,
+                        "block_index": transaction.block_index
                     }
                 )
 
-                session.run(
+                tx.run(
                     """
                     MATCH (t:Transaction {tx_hash: $tx_hash})
                     MATCH (b:Block {hash: $block_hash})
@@ -49,13 +60,13 @@ def insert_utxos(driver: Driver, transactions: Dict[str, Transaction], batch_siz
                     """,
                     {
                         "tx_hash": tx_hash,
-                        "block_hash": tx.block_hash
+                        "block_hash": transaction.block_hash
                     }
                 )
 
-                for input_utxo in tx.inputs:
+                for input_utxo in transaction.inputs:
                     utxo_hash = input_utxo.creating_tx_hash
-                    session.run(
+                    tx.run(
                         """
                         MERGE (u:UTXO {utxo_hash: $utxo_hash, index: $index})
                         ON CREATE SET u.value = $value,
@@ -74,11 +85,11 @@ def insert_utxos(driver: Driver, transactions: Dict[str, Transaction], batch_siz
                             "timestamp": input_utxo.creating_timestamp
                         }
                     )
-                    session.run(
+                    tx.run(
                         "MERGE (a:Address {address: $address})",
                         {"address": input_utxo.input_address}
                     )
-                    session.run(
+                    tx.run(
                         """
                         MATCH (a:Address {address: $input_address})
                         MATCH (u:UTXO {utxo_hash: $utxo_hash, index: $index})
@@ -90,7 +101,7 @@ def insert_utxos(driver: Driver, transactions: Dict[str, Transaction], batch_siz
                             "index": input_utxo.tx_out_index
                         }
                     )
-                    session.run(
+                    tx.run(
                         """
                         MATCH (u:UTXO {utxo_hash: $utxo_hash, index: $index})
                         MATCH (t:Transaction {tx_hash: $tx_hash})
@@ -104,11 +115,11 @@ def insert_utxos(driver: Driver, transactions: Dict[str, Transaction], batch_siz
                     )
 
                     if input_utxo.stake_address:
-                        session.run(
+                        tx.run(
                             "MERGE (s:StakeAddress {address: $address})",
                             {"address": input_utxo.stake_address}
                         )
-                        session.run(
+                        tx.run(
                             """
                             MATCH (a:Address {address: $address})
                             MATCH (s:StakeAddress {address: $stake_address})
@@ -121,9 +132,9 @@ def insert_utxos(driver: Driver, transactions: Dict[str, Transaction], batch_siz
                             }
                         )
 
-                for output_utxo in tx.outputs:
+                for output_utxo in transaction.outputs:
                     utxo_hash = output_utxo.creating_tx_hash
-                    session.run(
+                    tx.run(
                         """
                         MERGE (u:UTXO {utxo_hash: $utxo_hash, index: $index})
                         ON CREATE SET u.value = $value,
@@ -142,11 +153,11 @@ def insert_utxos(driver: Driver, transactions: Dict[str, Transaction], batch_siz
                             "timestamp": output_utxo.consuming_timestamp
                         }
                     )
-                    session.run(
+                    tx.run(
                         "MERGE (b:Address {address: $address})",
                         {"address": output_utxo.output_address}
                     )
-                    session.run(
+                    tx.run(
                         """
                         MATCH (t:Transaction {tx_hash: $tx_hash})
                         MATCH (u:UTXO {utxo_hash: $utxo_hash, index: $index})
@@ -158,7 +169,7 @@ def insert_utxos(driver: Driver, transactions: Dict[str, Transaction], batch_siz
                             "index": output_utxo.tx_out_index
                         }
                     )
-                    session.run(
+                    tx.run(
                         """
                         MATCH (u:UTXO {utxo_hash: $utxo_hash, index: $index})
                         MATCH (b:Address {address: $address})
@@ -172,11 +183,11 @@ def insert_utxos(driver: Driver, transactions: Dict[str, Transaction], batch_siz
                     )
 
                     if output_utxo.stake_address:
-                        session.run(
+                        tx.run(
                             "MERGE (s:StakeAddress {address: $address})",
                             {"address": output_utxo.stake_address}
                         )
-                        session.run(
+                        tx.run(
                             """
                             MATCH (a:Address {address: $address})
                             MATCH (s:StakeAddress {address: $stake_address})
@@ -197,5 +208,8 @@ def insert_utxos(driver: Driver, transactions: Dict[str, Transaction], batch_siz
             batch = {k: transactions[k] for k in list(transactions)[start_index:end_index]}
 
             logging.info(f"Processing batch {i + 1}/{total_batches}")
-            process_batch(batch)
+            session.execute_write(process_batch, batch)
+            update_address_aggregates(driver, batch)
+            update_stake_aggregates(driver, batch)
+            release_spent_holdings(driver, batch)
             logging.info(f"Processed batch of size {len(batch)}")
@@ -0,0 +1,109 @@
+import logging
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import Engine, event
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+from app.utils.latency import LatencyWindow
+
+# Statements slower than this are logged with their SQL
+SLOW_QUERY_SECONDS = 1.0
+
+
+class EngineStats:
+    """Pool checkout waits and statement timings of one engine."""
+
+    def __init__(self):
+        self.checkout = LatencyWindow()
+        self.queries = LatencyWindow()
+        self.slow_queries = 0
+
+
+_stats: Dict[str, EngineStats] = {}
+_engines: Dict[str, Engine] = {}
+_stats_lock = threading.Lock()
+
+
+def _engine_stats(name: str) -> EngineStats:
+    with _stats_lock:
+        return _stats.setdefault(name, EngineStats())
+
+
+class _TimedPoolMixin:
+    """Times how long callers wait for a connection, which is where an undersized pool shows up."""
+    stats_name = "postgres"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _engine_stats(self.stats_name).checkout.record(time.perf_counter() - started)
+
+    @classmethod
+    def named(cls, name: str) -> type:
+        """
+        Pool class recording its waits under `name`. Disposing an engine recreates its pool from the class, so the
+        name has to live there rather than on the pool.
+        """
+        return type(cls.__name__, (cls,), {"stats_name": name})
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine: Engine, name: str) -> Engine:
+    """
+    Record the statement timings of `engine` under `name`; its pool is named by its class, see
+    _TimedPoolMixin.named. For an AsyncEngine pass its sync_engine.
+    """
+    stats = _engine_stats(name)
+    with _stats_lock:
+        _engines[name] = engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        stats.queries.record(elapsed)
+        if elapsed >= SLOW_QUERY_SECONDS:
+            stats.slow_queries += 1
+            logging.warning(f"Slow Postgres query on {name} ({elapsed * 1000:.0f} ms): {statement}")
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        # A failed statement never reaches after_cursor_execute; drop its start so the connection's stack stays even
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if context.execution_context is not None and started:
+            started.pop()
+
+    return engine
+
+
+def engine_stats() -> Dict[str, Dict[str, Any]]:
+    with _stats_lock:
+        engines = dict(_engines)
+        stats = dict(_stats)
+    return {
+        name: {
+            "pool": {
+                "size": engines[name].pool.size(),
+                "checked_out": engines[name].pool.checkedout(),
+                "overflow": engines[name].pool.overflow()
+            } if name in engines else {},
+            "checkout": engine.checkout.snapshot(),
+            "queries": engine.queries.snapshot(),
+            "slow_queries": engine.slow_queries
+        }
+        for name, engine in stats.items()
+    }
@@ -0,0 +1,94 @@
+from functools import lru_cache
+from typing import Dict, List, Protocol
+
+from neo4j import Driver
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from app.db import db_postgres
+from app.db.connections import get_shared_neo4j_driver, get_shared_async_postgres_engine
+from app.db.graph import block, epoch, transaction
+from app.models.graph import BlockDetails, Blocks, EpochDetails, Epochs, TransactionUTXOs
+
+GRAPH = "graph"
+POSTGRES = "postgres"
+
+# Endpoints whose backend can be chosen with the READ_BACKENDS setting. None of them traverses the graph.
+ROUTABLE_ENDPOINTS = ("block_details", "blocks", "epoch_details", "epochs", "transaction_utxos")
+
+
+class ChainRepository(Protocol):
+    """
+    Tabular chain lookups that both Neo4j and db-sync can answer. Both backends return the models of
+    app.models.graph, which list every field, so their responses have the same shape.
+    """
+
+    async def get_blocks_details(self, block_hashes: List[str]) -> Dict[str, BlockDetails]: ...
+
+    async def get_blocks(self, skip: int, limit: int) -> Blocks: ...
+
+    async def get_epoch_details(self, epoch_no: int) -> EpochDetails: ...
+
+    async def get_epochs(self, skip: int, limit: int) -> Epochs: ...
+
+    async def get_transaction_utxos(self, transaction_hash: str) -> TransactionUTXOs: ...
+
+
+class GraphChainRepository:
+    """The graph queries use the synchronous driver, so they run on the thread pool."""
+
+    def __init__(self, driver: Driver):
+        self.driver = driver
+
+    async def get_blocks_details(self, block_hashes: List[str]) -> Dict[str, BlockDetails]:
+        return await run_in_threadpool(block.get_blocks_details, self.driver, block_hashes)
+
+    async def get_blocks(self, skip: int, limit: int) -> Blocks:
+        return await run_in_threadpool(block.get_blocks, self.driver, skip, limit)
+
+    async def get_epoch_details(self, epoch_no: int) -> EpochDetails:
+        return await run_in_threadpool(epoch.get_epoch_details, self.driver, epoch_no)
+
+    async def get_epochs(self, skip: int, limit: int) -> Epochs:
+        return await run_in_threadpool(epoch.get_epochs, self.driver, skip, limit)
+
+    async def get_transaction_utxos(self, transaction_hash: str) -> TransactionUTXOs:
+        return await run_in_threadpool(transaction.get_transaction_utxos, self.driver, transaction_hash)
+
+
+class PostgresChainRepository:
+    """
+    Serves the lookups from db-sync, which is always up to date and indexed for them, over asyncpg.
+    The queries of app.db.db_postgres are written against a synchronous Session; run_sync drives them on the
+    event loop without a worker thread.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker):
+        self.session_factory = session_factory
+
+    async def get_blocks_details(self, block_hashes: List[str]) -> Dict[str, BlockDetails]:
+        async with self.session_factory() as session:
+            return await session.run_sync(db_postgres.get_blocks_details, block_hashes)
+
+    async def get_blocks(self, skip: int, limit: int) -> Blocks:
+        async with self.session_factory() as session:
+            return await session.run_sync(db_postgres.get_blocks, skip, limit)
+
+    async def get_epoch_details(self, epoch_no: int) -> EpochDetails:
+        async with self.session_factory() as session:
+            return await session.run_sync(db_postgres.get_epoch_details, epoch_no)
+
+    async def get_epochs(self, skip: int, limit: int) -> Epochs:
+        async with self.session_factory() as session:
+            return await session.run_sync(db_postgres.get_epochs, skip, limit)
+
+    async def get_transaction_utxos(self, transaction_hash: str) -> TransactionUTXOs:
+        async with self.session_factory() as session:
+            return await session.run_sync(db_postgres.get_transaction_utxos, transaction_hash)
+
+
+@lru_cache()
+def get_chain_repository(backend: str) -> ChainRepository:
+    if backend == POSTGRES:
+        return PostgresChainRepository(async_sessionmaker(bind=get_shared_async_postgres_engine()))
+    return GraphChainRepository(get_shared_neo4j_driver())
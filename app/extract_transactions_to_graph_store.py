@@ -4,9 +4,8 @@ import logging
 from sqlalchemy.orm import sessionmaker
 
 from app.db.connections import connect_postgres, connect_neo4j
-from app.db.db_postgres import fetch_blocks, fetch_input_utxos, fetch_output_utxos
-from app.db.graph.block import insert_blocks
-from app.db.graph.utxo import insert_utxos
+from app.db.db_postgres import fetch_blocks, fetch_input_utxos, fetch_output_utxos, fetch_output_assets
+from app.db.graph.sink import Neo4jSink
 from app.utils.utxo_processor import process_utxos
 
 
@@ -14,7 +13,7 @@ def main():
     logging.basicConfig(level=logging.INFO, format="[%(levelname)s] - %(asctime)s - %(message)s")
 
     Session = sessionmaker(bind=connect_postgres())
-    driver = connect_neo4j()
+    sink = Neo4jSink(connect_neo4j())
     # Clear existing data
     # clear_neo4j_database()
     # start = datetime.datetime(2018, 9, 23)
@@ -23,7 +22,7 @@ def main():
     # with Session() as session:
     #     try:
     #         epochs = fetch_epochs(session, start.isoformat(), end.isoformat())
-    #         insert_epochs(driver, epochs)
+    #         sink.insert_epochs(epochs)
     #     except Exception as e:
     #         logging.error(f"Error processing epochs from {start} to {end}: {e}", exc_info=True)
 
@@ -34,7 +33,7 @@ def main():
         with Session() as session:
             try:
                 blocks = fetch_blocks(session, start.isoformat(), end.isoformat())
-                insert_blocks(driver, blocks)
+                sink.insert_blocks(blocks)
             except Exception as e:
                 logging.error(f"Day {i + 1}: Error processing blocks from {start} to {end}: {e}", exc_info=True)
 
@@ -61,9 +60,14 @@ def main():
     #             logging.info(f"Day {start_string}: Processed {len(processed_utxos)} UTXOs")
     #
     #             logging.info(f"Day {start_string}: Inserting UTXOs into Neo4j")
-    #             insert_utxos(driver, processed_utxos)
+    #             sink.insert_utxos(processed_utxos)
     #             logging.info(f"Day {start_string}: Inserted {len(processed_utxos)} UTXOs into Neo4j")
     #
+    #             logging.info(f"Day {start_string}: Linking assets to UTXOs")
+    #             assets = fetch_output_assets(session, start, end)
+    #             sink.insert_assets(assets)
+    #             logging.info(f"Day {start_string}: Inserted {len(assets)} asset outputs into Neo4j")
+    #
     #             # Iterate 1 day at a time
     #             start, end = end, end + datetime.timedelta(days=1)
     #         except Exception as e:
@@ -1,17 +1,40 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.db.connections import connect_neo4j
-from app.routers import graph, dashboard, details, address, stake, transaction, block, epoch
+from app.config import get_settings
+from app.db.connections import get_shared_async_postgres_engine, get_shared_neo4j_driver
+from app.routers import graph, dashboard, details, address, stake, transaction, block, epoch, debug, entity, \
+    analytics, search, metrics, health
+from app.services.market_data import create_market_data_service
+from app.services.startup import create_startup_service
+from app.utils.metrics import instrument_routes
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    # Neo4j is connected to in the background; /health/ready reports when it is reachable
+    app.state.startup = create_startup_service(settings)
+    await app.state.startup.start()
+    app.state.market_data = create_market_data_service(settings)
+    await app.state.market_data.start()
+    yield
+    await app.state.market_data.stop()
+    await app.state.startup.stop()
+    if get_shared_neo4j_driver.cache_info().currsize:
+        get_shared_neo4j_driver().close()
+    if get_shared_async_postgres_engine.cache_info().currsize:
+        await get_shared_async_postgres_engine().dispose()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:3000",
 ]
 
-neo4_driver = connect_neo4j()
-
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -21,10 +44,18 @@ app.add_middleware(
 )
 
 app.include_router(address.router)
+app.include_router(analytics.router)
 app.include_router(block.router)
 app.include_router(dashboard.router)
+app.include_router(debug.router)
 app.include_router(details.router)
+app.include_router(entity.router)
 app.include_router(epoch.router)
 app.include_router(graph.router)
+app.include_router(health.router)
+app.include_router(metrics.router)
+app.include_router(search.router)
 app.include_router(stake.router)
 app.include_router(transaction.router)
+
+instrument_routes(app)
@@ -0,0 +1,34 @@
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class RankingMetric(str, Enum):
+    PAGERANK = "pagerank"
+    IN_DEGREE = "in_degree"
+    OUT_DEGREE = "out_degree"
+    COMPONENT_SIZE = "component_size"
+
+
+class AddressScore(BaseModel):
+    address: str
+    pagerank: float
+    component_id: int
+    component_size: int
+    in_degree: int
+    out_degree: int
+
+
+class AnalyticsRun(BaseModel):
+    start_time: str
+    end_time: str
+    computed_at: str
+    address_count: int
+    transfer_count: int
+
+
+class TopAddresses(BaseModel):
+    metric: RankingMetric
+    run: Optional[AnalyticsRun] = None
+    addresses: List[AddressScore]
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 
@@ -6,3 +8,4 @@ class CardanoData(BaseModel):
     market_cap: float
     volume_24h: float
     percent_change_24h: float
+    last_updated: Optional[str] = None
@@ -1,6 +1,10 @@
-from typing import Optional, List
+from typing import Optional, List, Dict
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from app.models.graph import BlockDetails
+
+MAX_BATCH_KEYS = 500
 
 
 class BalanceHistoryPoint(BaseModel):
@@ -19,11 +23,41 @@ class AddressDetails(BaseModel):
     reward_balance: str
     highest_balance: str
     lowest_balance: str
+    utxo_count: int = 0
+    first_activity: Optional[str] = None
+    last_activity: Optional[str] = None
     balance_history: List[BalanceHistoryPoint]
-    utxos: List[dict]
     recent_transactions: List[dict]
 
 
+class AddressTransactions(BaseModel):
+    address: str
+    transactions: List[dict]
+    next_cursor: Optional[str] = None
+
+
+class TokenHolding(BaseModel):
+    policy: str
+    name: Optional[str] = None
+    display_name: Optional[str] = None
+    fingerprint: str
+    quantity: int
+
+
+class AddressTokens(BaseModel):
+    address: str
+    tokens: List[TokenHolding]
+    page_size: int
+    next_cursor: Optional[str] = None
+
+
+class AddressUTXOs(BaseModel):
+    address: str
+    utxos: List[dict]
+    page: int
+    page_size: int
+
+
 class InputUTXOInfo(BaseModel):
     address: str
     stake_address: Optional[str] = None
@@ -59,3 +93,52 @@ class TransactionDetails(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class BatchLookupRequest(BaseModel):
+    keys: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_KEYS)
+
+
+class AddressSummary(BaseModel):
+    id: str
+    stake_address: Optional[str] = None
+    entity_id: Optional[str] = None
+    balance: str
+    transactions: int
+
+
+class StakeDetails(BaseModel):
+    stake_address: str
+    address_count: int
+    balance: str
+    utxo_count: int
+    last_activity: Optional[str] = None
+    addresses: List[str]
+    page: int
+    page_size: int
+
+
+class EntityDetails(BaseModel):
+    entity_id: str
+    address_count: int
+    balance: str
+    transaction_count: int
+    first_seen: Optional[str] = None
+    last_seen: Optional[str] = None
+    updated_at: Optional[str] = None
+    addresses: List[str]
+
+
+class TransactionBatch(BaseModel):
+    results: Dict[str, TransactionDetails]
+    missing: List[str]
+
+
+class BlockBatch(BaseModel):
+    results: Dict[str, BlockDetails]
+    missing: List[str]
+
+
+class AddressBatch(BaseModel):
+    results: Dict[str, AddressSummary]
+    missing: List[str]
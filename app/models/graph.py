@@ -1,9 +1,20 @@
-from typing import List, Any, Optional, Union
+from datetime import datetime, timezone
+from enum import Enum
+from typing import List, Any, Optional, Union, Dict, Annotated
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict, SerializeAsAny, AfterValidator
+
+
+class Direction(str, Enum):
+    IN = "in"
+    OUT = "out"
+    BOTH = "both"
 
 
 class BaseNode(BaseModel):
+    # Keep subclass fields (labels, values, ...) when a node is validated or serialised as a plain BaseNode
+    model_config = ConfigDict(extra="allow")
+
     id: str
     type: str
 
@@ -15,12 +26,25 @@ class BaseEdge(BaseModel):
 
 
 class GraphData(BaseModel):
-    nodes: List[BaseNode]
+    nodes: List[SerializeAsAny[BaseNode]]
     edges: List[BaseEdge]
 
 
+class BloomFilterSpec(BaseModel):
+    bits: str = Field(..., description="Base64-encoded filter bits")
+    num_bits: int = Field(..., gt=0)
+    num_hashes: int = Field(..., gt=0, le=32)
+
+
+class KnownNodes(BaseModel):
+    known_ids: List[str] = Field(default_factory=list, max_length=50000)
+    bloom: Optional[BloomFilterSpec] = None
+
+
 class AddressNode(BaseNode):
     label: str
+    depth: Optional[int] = None
+    truncated: Optional[bool] = None
 
 
 class TransactionNode(BaseNode):
@@ -74,14 +98,80 @@ class AssetDetails(BaseModel):
     transactions: List[Any]
 
 
+# Responses that Neo4j and db-sync both serve (see app.db.repository). Their fields are listed explicitly so that
+# both backends answer with the same ones, whatever else the nodes or rows hold.
+
+def _as_utc(value: datetime) -> datetime:
+    # db-sync and the Block nodes hold naive UTC times, the other nodes zoned ones
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+UtcDateTime = Annotated[datetime, AfterValidator(_as_utc)]
+
+# The {} answered for a block or an epoch that does not exist
+NotFound = Annotated[Dict[str, Any], Field(max_length=0)]
+
+
+class BlockSummary(BaseModel):
+    hash: str
+    block_id: int
+    epoch_no: Optional[int] = None
+    slot_no: Optional[int] = None
+    epoch_slot_no: Optional[int] = None
+    block_no: Optional[int] = None
+    previous_id: Optional[int] = None
+    slot_leader_id: int
+    size: int
+    time: UtcDateTime
+    tx_count: int
+    proto_major: int
+    proto_minor: int
+    vrf_key: Optional[str] = None
+    op_cert: Optional[str] = None
+    op_cert_counter: Optional[int] = None
+
+
+class EpochSummary(BaseModel):
+    no: int
+    out_sum: float
+    fees: float
+    start_time: UtcDateTime
+    end_time: UtcDateTime
+
+
+class EpochListEntry(EpochSummary):
+    block_count: int
+
+
+class BlockTransaction(BaseModel):
+    tx_hash: str
+    timestamp: UtcDateTime
+    fee: float
+
+
+class TransactionUTXO(BaseModel):
+    utxo_hash: str
+    index: int
+    value: float
+    asset_policy: Optional[str] = None
+    asset_name: Optional[str] = None
+    asset_quantity: Optional[int] = None
+    timestamp: UtcDateTime
+
+
+class TransactionUTXOs(BaseModel):
+    inputs: List[TransactionUTXO]
+    outputs: List[TransactionUTXO]
+
+
 class BlockDetails(BaseModel):
-    block: Any
-    transactions: List[Any]
-    epoch: Any
+    block: Union[BlockSummary, NotFound]
+    transactions: List[BlockTransaction]
+    epoch: Union[EpochSummary, NotFound]
 
 
 class EpochDetails(BaseModel):
-    epoch: Any
+    epoch: Union[EpochSummary, NotFound]
     block_count: int
     tx_count: int
     total_size: int
@@ -93,8 +183,8 @@ class PaginatedList(BaseModel):
 
 
 class Blocks(PaginatedList):
-    blocks: List[Any]
+    blocks: List[BlockSummary]
 
 
 class Epochs(PaginatedList):
-    epochs: List[Any]
+    epochs: List[EpochListEntry]
@@ -0,0 +1,28 @@
+from enum import Enum
+from typing import List
+
+from pydantic import BaseModel
+
+
+class SearchHitType(str, Enum):
+    TRANSACTION = "transaction"
+    BLOCK = "block"
+    EPOCH = "epoch"
+    ADDRESS = "address"
+    STAKE_ADDRESS = "stake_address"
+    ASSET = "asset"
+
+
+class SearchHit(BaseModel):
+    type: SearchHitType
+    id: str
+    label: str
+    score: float
+
+
+class SearchResults(BaseModel):
+    query: str
+    hits: List[SearchHit]
+    # True when some lookups did not finish within the latency budget
+    partial: bool = False
+    took_ms: float
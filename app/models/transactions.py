@@ -45,6 +45,24 @@ class OutputUTXO:
     asset_quantity: Optional[int] = None
 
 
+@dataclass
+class UTXOAsset:
+    creating_tx_hash: str
+    tx_out_index: int
+    policy: str
+    name: str
+    fingerprint: str
+    quantity: int
+    creating_timestamp: datetime
+
+
+@dataclass
+class CoSpend:
+    """Distinct addresses whose UTXOs are spent together by one transaction."""
+    tx_hash: str
+    addresses: List[str]
+
+
 @dataclass
 class Transaction:
     fee: int = 0.0
@@ -0,0 +1,21 @@
+import logging
+
+from app.db.connections import connect_neo4j
+from app.db.graph.address import rebuild_address_aggregates
+from app.db.graph.asset import rebuild_holdings
+from app.db.graph.search import create_search_indexes
+from app.db.graph.stake import rebuild_stake_aggregates
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] - %(asctime)s - %(message)s")
+    driver = connect_neo4j()
+    rebuild_address_aggregates(driver)
+    rebuild_stake_aggregates(driver)
+    rebuild_holdings(driver)
+    create_search_indexes(driver)
+    driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,22 @@
 from enum import Enum
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from neo4j import Driver
 
-from app.db.graph.address import get_address_details
+from app.db.graph.address import get_address_details, get_address_summaries, get_address_utxos, \
+    get_address_transactions
+from app.db.graph.access import fetch_all, fetch_single, read_session
+from app.db.graph.asset import get_address_holdings
 from app.db.graph.db_neo4j import serialize_value
-from app.models.details import AddressDetails
+from app.models.details import AddressDetails, BatchLookupRequest, AddressBatch, AddressUTXOs, \
+    AddressTransactions, AddressTokens
 from app.routers.dependencies import get_neo4j_driver
 
 router = APIRouter()
 
+_ADDRESS_SORT_KEYS = {"address": "a.address", "balance": "balance", "transactionCount": "transactionCount"}
+
 
 class TimePeriod(str, Enum):
     ONE_DAY = "ONE_DAY"
@@ -24,7 +30,7 @@ async def get_addresses(
         size: int = Query(50, ge=1, le=100),
         sort: str = Query("balance,desc"),
         driver: Driver = Depends(get_neo4j_driver)
-) -> Dict[str, any]:
+) -> Dict[str, Any]:
     # Parse sort parameter
     sort_field, sort_order = sort.split(',')
     if sort_field not in ['address', 'balance', 'transactionCount']:
@@ -32,12 +38,13 @@ async def get_addresses(
     if sort_order not in ['asc', 'desc']:
         sort_order = 'desc'
 
-    query = """
+    # sort_field and sort_order are validated above; ORDER BY cannot take parameters
+    query = f"""
     MATCH (a:Address)
-    WITH a, 
+    WITH a,
          sum([(a)-[:OWNS]->(u:UTXO) WHERE NOT (u)-[:INPUT]->() | u.value][0]) AS balance,
-         size((a)-[:OWNS]->(:UTXO)-[:INPUT|OUTPUT]-(:Transaction)) AS transactionCount
-    ORDER BY {sort_field} {sort_order}
+         COUNT {{ (a)-[:OWNS]->(:UTXO)-[:INPUT|OUTPUT]-(:Transaction) }} AS transactionCount
+    ORDER BY {_ADDRESS_SORT_KEYS[sort_field]} {sort_order.upper()}
     SKIP $skip
     LIMIT $limit
     RETURN a.address AS address, balance, transactionCount
@@ -48,19 +55,16 @@ async def get_addresses(
     RETURN count(a) AS total
     """
 
-    with driver.session() as session:
+    with read_session(driver) as session:
         # Fetch addresses
-        result = session.run(query, {
+        result = session.execute_read(fetch_all, query, {
             "skip": page * size,
-            "limit": size,
-            "sort_field": sort_field,
-            "sort_order": sort_order.upper()
+            "limit": size
         })
         addresses = [serialize_value(record) for record in result]
 
         # Fetch total count
-        count_result = session.run(count_query)
-        total_count = count_result.single()["total"]
+        total_count = session.execute_read(fetch_single, count_query)["total"]
 
     return {
         "addresses": addresses,
@@ -90,75 +94,67 @@ async def get_address_analytics(
         TimePeriod.ONE_YEAR: "P1Y"
     }
 
-    with driver.session() as session:
-        result = session.run(query, {"address": address, "duration": duration_map[time_period]})
+    with read_session(driver) as session:
+        result = session.execute_read(fetch_all, query, {"address": address, "duration": duration_map[time_period]})
         data = [{"timestamp": record["timestamp"], "balance": record["balance"]} for record in result]
 
     return {"analytics": data}
 
 
-@router.get("/addresses/{address}/txs")
-async def get_address_transactions(
+@router.get("/addresses/{address}/txs", response_model=AddressTransactions)
+def api_get_address_transactions(
         address: str,
-        page: int = Query(0, ge=0),
+        cursor: Optional[str] = Query(None),
         size: int = Query(50, ge=1, le=100),
         sort: str = Query("timestamp,desc"),
         driver: Driver = Depends(get_neo4j_driver)
-) -> Dict[str, List[Dict]]:
-    query = """
-    MATCH (a:Address {address: $address})-[:OWNS]->(u:UTXO)-[:INPUT|OUTPUT]-(t:Transaction)
-    WITH DISTINCT t
-    ORDER BY t.timestamp DESC
-    SKIP $skip
-    LIMIT $limit
-    RETURN t.tx_hash AS tx_hash, t.timestamp AS timestamp, t.fee AS fee,
-           [(u:UTXO)-[:INPUT]->(t) | {address: u.address, value: u.value}] AS inputs,
-           [(t)-[:OUTPUT]->(u:UTXO) | {address: u.address, value: u.value}] AS outputs
+) -> AddressTransactions:
     """
+    Transaction history of an address, one page at a time. Pass the `next_cursor` of a page to get the next one.
+    """
+    try:
+        return get_address_transactions(driver, address, cursor, size, ascending=sort == "timestamp,asc")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    with driver.session() as session:
-        result = session.run(query, {
-            "address": address,
-            "skip": page * size,
-            "limit": size
-        })
-        transactions = [serialize_value(record) for record in result]
 
-    return {"transactions": transactions}
+@router.get("/addresses/{address}/tokens", response_model=AddressTokens)
+def api_get_address_tokens(
+        address: str,
+        display_name: Optional[str] = Query(None),
+        cursor: Optional[str] = Query(None),
+        size: int = Query(50, ge=1, le=100),
+        driver: Driver = Depends(get_neo4j_driver)
+) -> AddressTokens:
+    """
+    Tokens held by an address, largest quantity first, one page at a time. Pass the `next_cursor` of a page to get
+    the next one.
+    """
+    try:
+        return get_address_holdings(driver, address, display_name, cursor, size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/addresses/{address}/tokens")
-async def get_address_tokens(
+@router.get("/addresses/{address}/utxos", response_model=AddressUTXOs)
+def api_get_address_utxos(
         address: str,
-        display_name: str = Query(None),
+        unspent_only: bool = Query(True),
         page: int = Query(0, ge=0),
-        size: int = Query(50, ge=1, le=100),
+        size: int = Query(50, ge=1, le=500),
         driver: Driver = Depends(get_neo4j_driver)
-) -> Dict[str, List[Dict]]:
-    query = """
-    MATCH (a:Address {address: $address})-[:OWNS]->(u:UTXO)
-    WHERE NOT (u)-[:INPUT]->(:Transaction)
-      AND u.asset_policy IS NOT NULL
-      AND ($display_name IS NULL OR u.asset_name CONTAINS $display_name)
-    WITH u.asset_policy AS policy, u.asset_name AS name, sum(u.asset_quantity) AS quantity
-    ORDER BY quantity DESC
-    SKIP $skip
-    LIMIT $limit
-    RETURN policy, name, quantity
-    """
+) -> AddressUTXOs:
+    return get_address_utxos(driver, address, unspent_only, page, size)
 
-    with driver.session() as session:
-        result = session.run(query, {
-            "address": address,
-            "display_name": display_name,
-            "skip": page * size,
-            "limit": size
-        })
-        tokens = [serialize_value(record) for record in result]
 
-    return {"tokens": tokens}
+@router.post("/addresses/batch", response_model=AddressBatch)
+def api_get_addresses_batch(request: BatchLookupRequest, driver: Driver = Depends(get_neo4j_driver)) -> AddressBatch:
+    keys = list(dict.fromkeys(request.keys))
+    results = get_address_summaries(driver, keys)
+    return AddressBatch(results=results, missing=[key for key in keys if key not in results])
 
 
 @router.get("/addresses/{address}", response_model=AddressDetails)
-def api_get_address_details(address: str, driver: Driver = Depends(get_neo4j_driver)) -> AddressDetails:
-    return get_address_details(driver, address)
+def api_get_address_details(address: str, recent_limit: int = Query(10, ge=0, le=100),
+                            driver: Driver = Depends(get_neo4j_driver)) -> AddressDetails:
+    return get_address_details(driver, address, recent_limit)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, Query
+from neo4j import Driver
+
+from app.db.graph.analytics import get_top_addresses
+from app.models.analytics import RankingMetric, TopAddresses
+from app.routers.dependencies import get_neo4j_driver
+
+router = APIRouter()
+
+
+@router.get("/analytics/addresses/top", response_model=TopAddresses)
+def api_get_top_addresses(metric: RankingMetric = Query(RankingMetric.PAGERANK),
+                          limit: int = Query(100, ge=1, le=1000),
+                          driver: Driver = Depends(get_neo4j_driver)) -> TopAddresses:
+    """
+    Top-K addresses by a score precomputed by app/compute_graph_analytics.py.
+    """
+    return get_top_addresses(driver, metric, limit)
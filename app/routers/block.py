@@ -1,13 +1,25 @@
 from fastapi import APIRouter, Depends
-from neo4j import Driver
 
-from app.db.graph.block import get_block_details
+from app.db.repository import ChainRepository
+from app.models.details import BatchLookupRequest, BlockBatch
 from app.models.graph import BlockDetails
-from app.routers.dependencies import get_neo4j_driver
+from app.routers.dependencies import chain_repository
 
 router = APIRouter()
 
 
+@router.post("/blocks/batch", response_model=BlockBatch)
+async def api_get_blocks_batch(request: BatchLookupRequest,
+                               repository: ChainRepository = Depends(chain_repository("block_details"))) -> BlockBatch:
+    keys = list(dict.fromkeys(request.keys))
+    results = await repository.get_blocks_details(keys)
+    return BlockBatch(results=results, missing=[key for key in keys if key not in results])
+
+
 @router.get("/blocks/{block_hash}", response_model=BlockDetails)
-def api_get_block_details(block_hash: str, driver: Driver = Depends(get_neo4j_driver)) -> BlockDetails:
-    return get_block_details(driver, block_hash)
+async def api_get_block_details(
+        block_hash: str,
+        repository: ChainRepository = Depends(chain_repository("block_details"))
+) -> BlockDetails:
+    blocks = await repository.get_blocks_details([block_hash])
+    return blocks.get(block_hash, BlockDetails(block={}, transactions=[], epoch={}))
@@ -0,0 +1,24 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter
+
+from app.db.graph.instrumentation import query_stats
+from app.db.pool import engine_stats
+from app.utils.single_flight import query_flight
+
+router = APIRouter()
+
+
+@router.get("/debug/single-flight")
+def get_single_flight_stats() -> Dict[str, Dict[str, int]]:
+    return query_flight.stats()
+
+
+@router.get("/debug/postgres-stats")
+def get_postgres_stats() -> Dict[str, Dict[str, Any]]:
+    return engine_stats()
+
+
+@router.get("/debug/query-stats")
+def get_query_stats() -> Dict[str, Dict[str, Any]]:
+    return query_stats.stats()
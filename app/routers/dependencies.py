@@ -1,9 +1,36 @@
-from app.db.connections import connect_neo4j
+from functools import lru_cache
+from typing import Callable
+
+from fastapi import Request
+
+from app.config import get_settings
+from app.db.connections import get_shared_neo4j_driver
+from app.db.repository import ChainRepository, ROUTABLE_ENDPOINTS, get_chain_repository
+from app.services.market_data import MarketDataService
+from app.services.startup import StartupService
 
 
 def get_neo4j_driver():
-    driver = connect_neo4j()
-    try:
-        yield driver
-    finally:
-        driver.close()
+    return get_shared_neo4j_driver()
+
+
+def get_market_data_service(request: Request) -> MarketDataService:
+    return request.app.state.market_data
+
+
+def get_startup_service(request: Request) -> StartupService:
+    return request.app.state.startup
+
+
+@lru_cache()
+def chain_repository(endpoint: str) -> Callable[[], ChainRepository]:
+    """
+    Dependency resolving the repository that READ_BACKENDS routes `endpoint` to. Cached so that every route of
+    an endpoint shares one dependency, which app.dependency_overrides can replace.
+    """
+    assert endpoint in ROUTABLE_ENDPOINTS, endpoint
+
+    def get_repository() -> ChainRepository:
+        return get_chain_repository(get_settings().read_backend(endpoint))
+
+    return get_repository
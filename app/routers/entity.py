@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from neo4j import Driver
+
+from app.db.graph.entity import get_entity
+from app.models.details import EntityDetails
+from app.routers.dependencies import get_neo4j_driver
+
+router = APIRouter()
+
+
+@router.get("/entities/{entity_id}", response_model=EntityDetails)
+def api_get_entity(entity_id: str, address_limit: int = Query(100, ge=0, le=1000),
+                   driver: Driver = Depends(get_neo4j_driver)) -> EntityDetails:
+    """
+    Addresses grouped by the common-input heuristic, as precomputed by app/cluster_addresses.py.
+    """
+    entity = get_entity(driver, entity_id, address_limit)
+    if entity is None:
+        raise HTTPException(status_code=404, detail=f"Entity {entity_id} not found")
+    return entity
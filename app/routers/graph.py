@@ -1,42 +1,124 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Header, HTTPException
+from fastapi.responses import StreamingResponse
 from neo4j import Driver
 
-from app.db.graph.address import get_graph_by_address
+from app.db.graph.address import get_graph_by_address, iter_graph_by_address, expand_address_graph
 from app.db.graph.asset import get_graph_by_asset
-from app.db.graph.block import get_graph_by_block_hash, get_blocks
-from app.db.graph.epoch import get_epochs
-from app.models.graph import GraphData, Blocks, Epochs
-from app.routers.dependencies import get_neo4j_driver
+from app.db.graph.block import get_graph_by_block_hash
+from app.db.repository import ChainRepository
+from app.models.graph import GraphData, Blocks, Epochs, Direction, KnownNodes
+from app.routers.dependencies import get_neo4j_driver, chain_repository
+from app.utils.graph_codec import negotiate_graph_response
+from app.utils.graph_layout import LayoutAlgorithm, layout_graph
+from app.utils.graph_stream import NDJSON_MEDIA_TYPE, iter_ndjson_chunks, wants_ndjson
+from app.utils.known_set import BloomFilter, KnownSet
 
 router = APIRouter()
 
 
 @router.get("/graph/asset/{asset_id}", response_model=GraphData)
 def api_get_graph_by_asset(asset_id: str, start_time: Optional[str] = None, end_time: Optional[str] = None,
-                           driver: Driver = Depends(get_neo4j_driver)) -> GraphData:
-    return get_graph_by_asset(driver, asset_id, start_time, end_time)
+                           limit: int = Query(1000, ge=1, le=10000),
+                           max_holders: Optional[int] = Query(None, ge=1),
+                           layout: Optional[LayoutAlgorithm] = Query(None),
+                           accept: Optional[str] = Header(None),
+                           accept_encoding: Optional[str] = Header(None),
+                           driver: Driver = Depends(get_neo4j_driver)):
+    graph = get_graph_by_asset(driver, asset_id, start_time, end_time, limit, max_holders)
+    if layout:
+        graph = layout_graph(graph, ("asset", asset_id, start_time, end_time, limit, max_holders), layout)
+    return negotiate_graph_response(graph, accept, accept_encoding)
 
 
 @router.get("/graph/addresses/{address}", response_model=GraphData)
 def api_get_graph_by_address(address: str, start_time: Optional[str] = None, end_time: Optional[str] = None,
-                             driver: Driver = Depends(get_neo4j_driver)) -> GraphData:
-    return get_graph_by_address(driver, address, start_time, end_time)
+                             depth: Optional[int] = Query(None, ge=1, le=6),
+                             max_nodes: int = Query(500, ge=1, le=5000),
+                             max_fanout_per_node: int = Query(25, ge=1, le=1000),
+                             direction: Direction = Query(Direction.BOTH),
+                             min_value: float = Query(0, ge=0),
+                             stream: bool = Query(False),
+                             chunk_size: int = Query(500, ge=1, le=10000),
+                             layout: Optional[LayoutAlgorithm] = Query(None),
+                             accept: Optional[str] = Header(None),
+                             accept_encoding: Optional[str] = Header(None),
+                             driver: Driver = Depends(get_neo4j_driver)):
+    """
+    With `layout`, nodes come with precomputed x/y coordinates. Layouts are cached per root, time window and
+    expansion parameters. Ignored when streaming.
+    """
+    return _address_graph_response(driver, address, start_time, end_time, depth, max_nodes, max_fanout_per_node,
+                                   direction, min_value, stream, chunk_size, accept, accept_encoding, layout=layout)
+
+
+@router.post("/graph/addresses/{address}/expand", response_model=GraphData)
+def api_expand_graph_by_address(address: str, known_nodes: KnownNodes,
+                                start_time: Optional[str] = None, end_time: Optional[str] = None,
+                                depth: Optional[int] = Query(None, ge=1, le=6),
+                                max_nodes: int = Query(500, ge=1, le=5000),
+                                max_fanout_per_node: int = Query(25, ge=1, le=1000),
+                                direction: Direction = Query(Direction.BOTH),
+                                min_value: float = Query(0, ge=0),
+                                stream: bool = Query(False),
+                                chunk_size: int = Query(500, ge=1, le=10000),
+                                accept: Optional[str] = Header(None),
+                                accept_encoding: Optional[str] = Header(None),
+                                driver: Driver = Depends(get_neo4j_driver)):
+    """
+    Same as GET /graph/addresses/{address}, but only returns what the client does not already have: nodes missing
+    from `known_nodes`, and edges with at least one end missing from it.
+    """
+    bloom = None
+    if known_nodes.bloom:
+        try:
+            bloom = BloomFilter.from_base64(known_nodes.bloom.bits, known_nodes.bloom.num_bits,
+                                            known_nodes.bloom.num_hashes)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid bloom filter: {e}")
+    known = KnownSet(known_nodes.known_ids, bloom)
+    return _address_graph_response(driver, address, start_time, end_time, depth, max_nodes, max_fanout_per_node,
+                                   direction, min_value, stream, chunk_size, accept, accept_encoding, known)
+
+
+def _address_graph_response(driver: Driver, address: str, start_time: Optional[str], end_time: Optional[str],
+                            depth: Optional[int], max_nodes: int, max_fanout_per_node: int, direction: Direction,
+                            min_value: float, stream: bool, chunk_size: int, accept: Optional[str],
+                            accept_encoding: Optional[str], known: Optional[KnownSet] = None,
+                            layout: Optional[LayoutAlgorithm] = None):
+    if depth is not None:
+        graph = expand_address_graph(driver, address, depth, max_nodes, max_fanout_per_node, direction, min_value,
+                                     start_time, end_time, known)
+    elif wants_ndjson(accept, stream):
+        items = iter_graph_by_address(driver, address, start_time, end_time, known)
+        return StreamingResponse(iter_ndjson_chunks(items, chunk_size), media_type=NDJSON_MEDIA_TYPE)
+    else:
+        graph = get_graph_by_address(driver, address, start_time, end_time, known)
+    if layout:
+        key = ("address", address, start_time, end_time, depth, max_nodes, max_fanout_per_node, direction, min_value)
+        graph = layout_graph(graph, key, layout)
+    return negotiate_graph_response(graph, accept, accept_encoding)
 
 
 @router.get("/graph/blocks/{block_hash}", response_model=GraphData)
-def api_get_graph_by_block_hash(block_hash: str, driver: Driver = Depends(get_neo4j_driver)) -> GraphData:
-    return get_graph_by_block_hash(driver, block_hash, 1)
+def api_get_graph_by_block_hash(block_hash: str, layout: Optional[LayoutAlgorithm] = Query(None),
+                                accept: Optional[str] = Header(None),
+                                accept_encoding: Optional[str] = Header(None),
+                                driver: Driver = Depends(get_neo4j_driver)):
+    graph = get_graph_by_block_hash(driver, block_hash, 1)
+    if layout:
+        graph = layout_graph(graph, ("block", block_hash), layout)
+    return negotiate_graph_response(graph, accept, accept_encoding)
 
 
 @router.get("/blocks", response_model=Blocks)
-def api_get_blocks(skip: int = Query(0, alias='skip'), limit: int = Query(10, alias='limit'),
-                   driver: Driver = Depends(get_neo4j_driver)) -> Blocks:
-    return get_blocks(driver, skip, limit)
+async def api_get_blocks(skip: int = Query(0, alias='skip'), limit: int = Query(10, alias='limit'),
+                         repository: ChainRepository = Depends(chain_repository("blocks"))) -> Blocks:
+    return await repository.get_blocks(skip, limit)
 
 
 @router.get("/epochs", response_model=Epochs)
-def api_get_epochs(skip: int = Query(0, alias='skip'), limit: int = Query(10, alias='limit'),
-                   driver: Driver = Depends(get_neo4j_driver)) -> Epochs:
-    return get_epochs(driver, skip, limit)
+async def api_get_epochs(skip: int = Query(0, alias='skip'), limit: int = Query(10, alias='limit'),
+                         repository: ChainRepository = Depends(chain_repository("epochs"))) -> Epochs:
+    return await repository.get_epochs(skip, limit)
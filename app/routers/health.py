@@ -0,0 +1,26 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+
+from app.routers.dependencies import get_startup_service
+from app.services.startup import StartupService
+
+router = APIRouter()
+
+
+@router.get("/health/live")
+async def get_liveness() -> Dict[str, str]:
+    """The process is up and serving; says nothing about the databases."""
+    return {"status": "ok"}
+
+
+@router.get("/health/ready")
+async def get_readiness(startup: StartupService = Depends(get_startup_service)) -> Dict[str, Any]:
+    """
+    Neo4j, and Postgres when READ_BACKENDS routes endpoints there, are reachable and the warm-up, if enabled, has
+    finished. Answers 503 until then, and again once a connection is lost.
+    """
+    if not await startup.check():
+        return JSONResponse(status_code=503, content=startup.status())
+    return startup.status()
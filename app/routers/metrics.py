@@ -0,0 +1,48 @@
+from typing import Iterable
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.db.connections import get_shared_neo4j_driver
+from app.db.graph.instrumentation import InstrumentedDriver, query_stats
+from app.db.pool import engine_stats
+from app.utils.metrics import registry, summary_lines, gauge_lines
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _postgres_metrics() -> Iterable[str]:
+    stats = engine_stats()
+    yield from gauge_lines("postgres_pool_connections", "Connections of the Postgres pool by state.",
+                           ("engine", "state"),
+                           [((engine, state), engine_stat["pool"][key])
+                            for engine, engine_stat in stats.items() if engine_stat["pool"]
+                            for state, key in (("size", "size"), ("checked_out", "checked_out"),
+                                               ("overflow", "overflow"))])
+    yield from summary_lines("postgres_pool_checkout_seconds", "Wait for a pooled Postgres connection.",
+                             ("engine",), [((engine, ), stat["checkout"]) for engine, stat in stats.items()])
+    yield from summary_lines("postgres_query_seconds", "Postgres statement execution time.",
+                             ("engine",), [((engine, ), stat["queries"]) for engine, stat in stats.items()])
+
+
+def _neo4j_metrics() -> Iterable[str]:
+    # Only report a driver that already exists; scraping must not open connections
+    if get_shared_neo4j_driver.cache_info().currsize:
+        driver = get_shared_neo4j_driver()
+        if isinstance(driver, InstrumentedDriver):
+            yield from gauge_lines("neo4j_sessions_in_use", "Open Neo4j sessions, each holding a pooled connection.",
+                                   (), [((), driver.sessions_in_use)])
+    stats = query_stats.stats()
+    yield from summary_lines("neo4j_query_seconds", "Server time until a Neo4j query's first record is available.",
+                             ("query",), [((name, ), stat["available_after"]) for name, stat in stats.items()])
+
+
+registry.register_collector(_postgres_metrics)
+registry.register_collector(_neo4j_metrics)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends, Query
+from neo4j import Driver
+
+from app.db.graph.search import search
+from app.models.search import SearchResults
+from app.routers.dependencies import get_neo4j_driver
+
+router = APIRouter()
+
+
+@router.get("/search", response_model=SearchResults)
+def search_graph(
+        q: str = Query(..., min_length=1, max_length=128),
+        limit: int = Query(10, ge=1, le=50),
+        driver: Driver = Depends(get_neo4j_driver)
+) -> SearchResults:
+    return search(driver, q, limit)
@@ -1,17 +1,21 @@
-from typing import Dict
-
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from neo4j import Driver
 
+from app.db.graph.stake import get_stake_details
+from app.models.details import StakeDetails
 from app.routers.dependencies import get_neo4j_driver
 
 router = APIRouter()
 
 
-@router.get("/api/v1/stakes/{stake_address}")
-async def get_stake_info(
+@router.get("/api/v1/stakes/{stake_address}", response_model=StakeDetails)
+def get_stake_info(
         stake_address: str,
+        page: int = Query(0, ge=0),
+        size: int = Query(50, ge=1, le=500),
         driver: Driver = Depends(get_neo4j_driver)
-) -> Dict:
-    # For now, returning an empty object as requested
-    return {}
+) -> StakeDetails:
+    stake = get_stake_details(driver, stake_address, page, size)
+    if stake is None:
+        raise HTTPException(status_code=404, detail=f"Stake address {stake_address} not found")
+    return stake
@@ -3,14 +3,28 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from neo4j import Driver
 
+from app.db.graph.access import fetch_all, fetch_single, read_session
 from app.db.graph.db_neo4j import serialize_node
-from app.db.graph.transaction import get_transaction_details
-from app.models.details import TransactionDetails
+from app.db.repository import ChainRepository
+from app.db.graph.transaction import get_transaction_details, get_transactions_details
+from app.models.details import TransactionDetails, BatchLookupRequest, TransactionBatch
+from app.models.graph import TransactionUTXOs
 from app.models.transactions import TransactionsResponse, TransactionResponse
-from app.routers.dependencies import get_neo4j_driver
+from app.routers.dependencies import get_neo4j_driver, chain_repository
 
 router = APIRouter()
 
+# Sortable columns stored on the Transaction node; sort_by is restricted to these plus total_output
+_TRANSACTION_SORT_PROPERTIES = {"fee": "t.fee", "slot_no": "t.timestamp", "timestamp": "t.timestamp"}
+
+
+@router.post("/transactions/batch", response_model=TransactionBatch)
+def api_get_transactions_batch(request: BatchLookupRequest,
+                               driver: Driver = Depends(get_neo4j_driver)) -> TransactionBatch:
+    keys = list(dict.fromkeys(request.keys))
+    results = get_transactions_details(driver, keys)
+    return TransactionBatch(results=results, missing=[key for key in keys if key not in results])
+
 
 @router.get("/transactions/{transaction_hash}", response_model=TransactionDetails)
 def api_get_transaction_details(transaction_hash: str,
@@ -21,23 +35,12 @@ def api_get_transaction_details(transaction_hash: str,
     return transaction_details
 
 
-@router.get("/transactions/{transaction_hash}/utxos")
-def get_transaction_utxos(transaction_hash: str, driver: Driver = Depends(get_neo4j_driver)):
-    query = """
-    MATCH (t:Transaction {tx_hash: $transaction_hash})
-    OPTIONAL MATCH (input:UTXO)-[:INPUT]->(t)
-    OPTIONAL MATCH (t)-[:OUTPUT]->(output:UTXO)
-    RETURN collect(DISTINCT input) AS inputs, collect(DISTINCT output) AS outputs
-    """
-    with driver.session() as session:
-        result = session.run(query, {"transaction_hash": transaction_hash})
-        record = result.single()
-        if record:
-            return {
-                "inputs": [serialize_node(utxo) for utxo in record["inputs"]],
-                "outputs": [serialize_node(utxo) for utxo in record["outputs"]]
-            }
-        return {"inputs": [], "outputs": []}
+@router.get("/transactions/{transaction_hash}/utxos", response_model=TransactionUTXOs)
+async def get_transaction_utxos(
+        transaction_hash: str,
+        repository: ChainRepository = Depends(chain_repository("transaction_utxos"))
+) -> TransactionUTXOs:
+    return await repository.get_transaction_utxos(transaction_hash)
 
 
 @router.get("/transactions/{transaction_hash}/signatories")
@@ -47,9 +50,8 @@ def get_transaction_signatories(transaction_hash: str, driver: Driver = Depends(
     OPTIONAL MATCH (t)<-[:SIGNED]-(a:Address)
     RETURN collect(DISTINCT a) AS signatories
     """
-    with driver.session() as session:
-        result = session.run(query, {"transaction_hash": transaction_hash})
-        record = result.single()
+    with read_session(driver) as session:
+        record = session.execute_read(fetch_single, query, {"transaction_hash": transaction_hash})
         if record:
             return {"signatories": [dict(address) for address in record["signatories"]]}
         return {"signatories": []}
@@ -62,26 +64,55 @@ async def get_transactions(
         page_size: int = Query(20, ge=1, le=100),
         sort_by: str = Query("timestamp", regex="^(fee|total_output|slot_no|timestamp)$"),
         sort_order: str = Query("DESC", regex="^(ASC|DESC)$"),
-        tx_hash_filter: Optional[str] = Query(None)
+        tx_hash_filter: Optional[str] = Query(None, description="Part of the transaction hash, anywhere in it"),
+        tx_hash_prefix: Optional[str] = Query(None, description="Start of the transaction hash. Unlike "
+                                                                "tx_hash_filter it seeks the hash index.")
 ):
-    query = """
+    # Sorting on a property of the transaction pages the transactions first, so that ORDER BY ... LIMIT is read
+    # from its range index and only one page is expanded. Slot order is timestamp order. total_output has to be
+    # computed for every transaction before sorting.
+    sort_key = _TRANSACTION_SORT_PROPERTIES.get(sort_by)
+    predicates = [
+        "EXISTS { (t)-[:CONTAINED_BY]->(:Block)<-[:HAS_BLOCK]-(:Epoch) }",
+        "EXISTS { (:Address)-[:OWNS]->(:UTXO)-[:INPUT]->(t) }",
+        "EXISTS { (t)-[:OUTPUT]->(:UTXO)<-[:OWNS]-(:Address) }"
+    ]
+    hash_predicates = []
+    if tx_hash_prefix:
+        hash_predicates.append("t.tx_hash STARTS WITH $tx_hash_prefix")
+    if tx_hash_filter:
+        # Served by the text index on tx_hash
+        hash_predicates.append("t.tx_hash CONTAINS $tx_hash_filter")
+    if hash_predicates:
+        predicates[:0] = hash_predicates
+    elif sort_key:
+        predicates.insert(0, f"{sort_key} IS NOT NULL")
+    if sort_key:
+        page_transactions = f"WITH t ORDER BY {sort_key} {sort_order} SKIP $skip LIMIT $limit"
+        page_rows = ""
+    else:
+        page_transactions = ""
+        page_rows = "SKIP $skip LIMIT $limit"
+
+    query = f"""
     MATCH (t:Transaction)
-    WHERE $tx_hash_filter IS NULL OR t.tx_hash CONTAINS $tx_hash_filter
-    WITH t
-    MATCH (input:UTXO)-[:INPUT]->(t)
-    MATCH (t)-[:OUTPUT]->(output:UTXO)
-    MATCH (input)<-[:OWNS]-(inputAddress:Address)
-    MATCH (output)<-[:OWNS]-(outputAddress:Address)
+    WHERE {" AND ".join(predicates)}
+    {page_transactions}
     MATCH (t)-[:CONTAINED_BY]->(b:Block)<-[:HAS_BLOCK]-(e:Epoch)
-    WITH t, b, e, 
-         collect(DISTINCT {address: inputAddress.address, utxo: input}) AS inputs,
-         collect(DISTINCT {address: outputAddress.address, utxo: output}) AS outputs
-    ORDER BY
-        CASE WHEN $sort_order = "ASC" THEN t[$sort_by] ELSE null END ASC,
-        CASE WHEN $sort_order = "DESC" THEN t[$sort_by] ELSE null END DESC
-    SKIP $skip
-    LIMIT $limit
-    RETURN 
+    CALL {{
+        WITH t
+        MATCH (inputAddress:Address)-[:OWNS]->(:UTXO)-[:INPUT]->(t)
+        RETURN collect(DISTINCT inputAddress.address) AS input_addresses
+    }}
+    CALL {{
+        WITH t
+        MATCH (t)-[:OUTPUT]->(output:UTXO)<-[:OWNS]-(outputAddress:Address)
+        RETURN collect(DISTINCT outputAddress.address) AS output_addresses, sum(output.value) AS total_output
+    }}
+    WITH t, b, e, input_addresses, output_addresses, total_output
+    ORDER BY {sort_key or "total_output"} {sort_order}
+    {page_rows}
+    RETURN
         t.tx_hash AS tx_hash,
         t.timestamp AS timestamp,
         b.block_no AS block_no,
@@ -90,23 +121,22 @@ async def get_transactions(
         b.slot_no AS slot_no,
         b.epoch_slot_no AS absolute_slot_no,
         t.fee AS fees,
-        reduce(s = 0, output IN outputs | s + output.utxo.value) AS total_output,
-        [input IN inputs | input.address] AS input_addresses,
-        [output IN outputs | output.address] AS output_addresses
+        total_output,
+        input_addresses,
+        output_addresses
     """
 
     params = {
         "tx_hash_filter": tx_hash_filter,
+        "tx_hash_prefix": tx_hash_prefix,
         "skip": (page - 1) * page_size,
-        "limit": page_size,
-        "sort_by": sort_by,
-        "sort_order": sort_order
+        "limit": page_size
     }
 
     query_count = "MATCH (t:Transaction) RETURN COUNT(t) AS total_count"
 
-    with driver.session() as session:
-        result = session.run(query, params)
+    with read_session(driver) as session:
+        result = session.execute_read(fetch_all, query, params)
 
         transactions = []
         for record in result:
@@ -126,7 +156,6 @@ async def get_transactions(
                 status="SUCCESS",
             ))
 
-        total_count_result = session.run(query_count)
-        total_count = total_count_result.single()["total_count"]
+        total_count = session.execute_read(fetch_single, query_count)["total_count"]
 
     return TransactionsResponse(transactions=transactions, total_count=total_count)
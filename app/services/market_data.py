@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from typing import Optional, Protocol
+
+import httpx
+
+from app.config import Settings
+from app.models.dashboard import CardanoData
+
+
+class MarketDataUnavailable(Exception):
+    pass
+
+
+class MarketDataProvider(Protocol):
+    async def fetch_quote(self) -> CardanoData:
+        ...
+
+    async def aclose(self) -> None:
+        ...
+
+
+class CoinMarketCapProvider:
+    def __init__(self, api_key: str, base_url: str = "https://pro-api.coinmarketcap.com/v1", timeout: float = 10.0):
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"X-CMC_PRO_API_KEY": api_key},
+            timeout=timeout
+        )
+
+    async def fetch_quote(self) -> CardanoData:
+        response = await self._client.get("/cryptocurrency/quotes/latest", params={"symbol": "ADA"})
+        response.raise_for_status()
+        try:
+            quote = response.json()["data"]["ADA"]["quote"]["USD"]
+            return CardanoData(
+                price=quote["price"],
+                market_cap=quote["market_cap"],
+                volume_24h=quote["volume_24h"],
+                percent_change_24h=quote["percent_change_24h"],
+                last_updated=quote.get("last_updated")
+            )
+        except KeyError as e:
+            raise MarketDataUnavailable(f"Unexpected response format from CoinMarketCap: missing {e}")
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class StaticMarketDataProvider:
+    """Serves a fixed quote; for tests and offline development."""
+
+    def __init__(self, quote: Optional[CardanoData] = None):
+        self.quote = quote or CardanoData(price=0.0, market_cap=0.0, volume_24h=0.0, percent_change_24h=0.0)
+        self.calls = 0
+
+    async def fetch_quote(self) -> CardanoData:
+        self.calls += 1
+        return self.quote
+
+    async def aclose(self) -> None:
+        pass
+
+
+class MarketDataService:
+    """
+    Keeps the latest ADA quote in memory and refreshes it in the background every `refresh_interval` seconds,
+    +/- `jitter` (a fraction of the interval). Failed refreshes back off exponentially up to `max_backoff` seconds
+    while the last good quote keeps being served. Requests never wait on the provider once a quote is cached:
+    a quote older than the refresh interval is returned as-is and revalidated in the background.
+    """
+
+    def __init__(self, provider: MarketDataProvider, refresh_interval: float = 60.0, jitter: float = 0.1,
+                 max_backoff: float = 600.0):
+        self.provider = provider
+        self.refresh_interval = refresh_interval
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self._quote: Optional[CardanoData] = None
+        self._fetched_at: Optional[float] = None
+        self._failures = 0
+        self._next_attempt_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._revalidation: Optional[asyncio.Task] = None
+
+    @property
+    def age(self) -> Optional[float]:
+        return None if self._fetched_at is None else time.monotonic() - self._fetched_at
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        for task in (self._task, self._revalidation):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._revalidation = None
+        await self.provider.aclose()
+
+    async def get_quote(self) -> CardanoData:
+        if self._quote is None:
+            # Cold start: the first caller fetches, concurrent callers wait for the same refresh. While a failed
+            # fetch backs off, callers are turned away instead of hitting the provider again
+            if time.monotonic() < self._next_attempt_at:
+                raise MarketDataUnavailable("No market data available yet, retrying later")
+            await self.refresh(force=False)
+            if self._quote is None:
+                raise MarketDataUnavailable("No market data available yet")
+        elif self.age > self.refresh_interval and time.monotonic() >= self._next_attempt_at \
+                and (self._revalidation is None or self._revalidation.done()):
+            self._revalidation = asyncio.create_task(self.refresh())
+        return self._quote
+
+    async def refresh(self, force: bool = True) -> bool:
+        async with self._lock:
+            if not force and (self._quote is not None or time.monotonic() < self._next_attempt_at):
+                # Another caller refreshed, or failed to, while we were waiting for the lock
+                return self._quote is not None
+            try:
+                quote = await self.provider.fetch_quote()
+            except Exception as e:
+                self._failures += 1
+                self._next_attempt_at = time.monotonic() + self._backoff()
+                logging.warning(f"Market data refresh failed ({self._failures} in a row): {e}")
+                return False
+            if quote.last_updated is None:
+                quote.last_updated = datetime.now(timezone.utc).isoformat()
+            self._quote = quote
+            self._fetched_at = time.monotonic()
+            self._failures = 0
+            self._next_attempt_at = 0.0
+            return True
+
+    def _backoff(self) -> float:
+        delay = min(self.max_backoff, self.refresh_interval * 2 ** (self._failures - 1))
+        return self._jittered(delay)
+
+    def _jittered(self, delay: float) -> float:
+        return max(0.0, delay * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    async def _run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self._backoff() if self._failures else self._jittered(self.refresh_interval))
+
+
+def create_market_data_service(settings: Settings) -> MarketDataService:
+    if settings.market_data_provider == "static":
+        provider = StaticMarketDataProvider()
+    elif settings.market_data_provider == "coinmarketcap":
+        provider = CoinMarketCapProvider(settings.cmc_api_key)
+    else:
+        raise ValueError(f"Unknown market data provider: {settings.market_data_provider}")
+
+    return MarketDataService(
+        provider,
+        refresh_interval=settings.market_data_refresh_seconds,
+        jitter=settings.market_data_refresh_jitter,
+        max_backoff=settings.market_data_max_backoff_seconds
+    )
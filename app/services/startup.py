@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from neo4j import Driver
+from neo4j.exceptions import AuthError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.concurrency import run_in_threadpool
+
+from app.config import Settings
+from app.db.connections import get_shared_async_postgres_engine, get_shared_neo4j_driver, neo4j_retry_delays
+from app.db.graph.db_neo4j import get_pending_indexes
+from app.db.repository import ROUTABLE_ENDPOINTS, get_chain_repository
+
+
+class StartupService:
+    """
+    Connects to Neo4j, and to Postgres when `postgres_engine_factory` is given, in the background once the app is
+    serving, so that neither importing nor starting it waits on the databases. Unavailable databases are retried
+    with `retry_delays`; after the last attempt the next readiness check starts a new round. Once connected, the
+    optional `warm_up` runs before the app first reports ready. A ready app re-verifies its connections at most every
+    `recheck_seconds` when asked, and reports not ready and reconnects when one has been lost.
+    """
+
+    def __init__(self, driver_factory: Callable[[], Driver], retry_delays: List[float],
+                 warm_up: Optional[Callable[[Driver], Any]] = None,
+                 postgres_engine_factory: Optional[Callable[[], AsyncEngine]] = None, recheck_seconds: float = 5.0):
+        self.driver_factory = driver_factory
+        self.retry_delays = retry_delays
+        self.warm_up = warm_up
+        self.postgres_engine_factory = postgres_engine_factory
+        self.recheck_seconds = recheck_seconds
+        self.ready = False
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+        self.warm_up_seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._verified_at = 0.0
+
+    async def start(self):
+        if self.ready or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def check(self) -> bool:
+        """
+        Whether the app is ready. A ready app re-verifies its connections if they were last verified more than
+        `recheck_seconds` ago; an app that is not ready starts a new round of connection attempts.
+        """
+        if self.ready and time.monotonic() - self._verified_at >= self.recheck_seconds:
+            # Set first, so that concurrent checks do not verify again
+            self._verified_at = time.monotonic()
+            try:
+                await self._verify(self.driver_factory())
+            except Exception as e:
+                self.ready = False
+                self.last_error = str(e)
+                logging.warning(f"Lost the database connection, reconnecting: {e}")
+        if not self.ready:
+            await self.start()
+        return self.ready
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "connecting": self._task is not None and not self._task.done(),
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "warm_up_seconds": self.warm_up_seconds
+        }
+
+    async def _verify(self, driver: Driver):
+        await run_in_threadpool(driver.verify_connectivity)
+        if self.postgres_engine_factory is not None:
+            async with self.postgres_engine_factory().connect() as connection:
+                await connection.execute(text("SELECT 1"))
+
+    async def _run(self):
+        driver = self.driver_factory()
+        for attempt in range(len(self.retry_delays) + 1):
+            self.attempts += 1
+            try:
+                await self._verify(driver)
+                break
+            except AuthError as e:
+                # Retrying does not fix credentials; readiness checks keep starting new rounds
+                self.last_error = str(e)
+                logging.error(f"Neo4j authentication failed: {e}")
+                return
+            except Exception as e:
+                self.last_error = str(e)
+                if attempt == len(self.retry_delays):
+                    logging.error(f"Databases unavailable after {attempt + 1} attempts: {e}")
+                    return
+                logging.warning(f"Databases unavailable (attempt {attempt + 1}/{len(self.retry_delays) + 1}), "
+                                f"retrying in {self.retry_delays[attempt]}s: {e}")
+                await asyncio.sleep(self.retry_delays[attempt])
+        self.last_error = None
+        self._verified_at = time.monotonic()
+        logging.info("Connected to the databases")
+
+        # Caches that were warm before a lost connection are still warm
+        if self.warm_up is not None and self.warm_up_seconds is None:
+            started = time.monotonic()
+            try:
+                await self.warm_up(driver)
+            except Exception as e:
+                # A cold cache is slower, not broken
+                logging.warning(f"Warm-up failed: {e}")
+            self.warm_up_seconds = round(time.monotonic() - started, 3)
+            logging.info(f"Warm-up finished in {self.warm_up_seconds}s")
+        self.ready = True
+
+
+def create_warm_up(settings: Settings) -> Callable[[Driver], Any]:
+    """
+    Warm-up running the first page of the latest blocks and epochs on whichever backend serves them, which fills
+    the connection pools, query plan caches and page caches those reads hit, and reporting indexes that are not
+    online yet.
+    """
+
+    async def warm_up(driver: Driver):
+        await get_chain_repository(settings.read_backend("blocks")).get_blocks(0, 10)
+        await get_chain_repository(settings.read_backend("epochs")).get_epochs(0, 10)
+        pending = await run_in_threadpool(get_pending_indexes, driver)
+        if pending:
+            logging.warning(f"Indexes not online yet: {', '.join(pending)}")
+
+    return warm_up
+
+
+def create_startup_service(settings: Settings) -> StartupService:
+    uses_postgres = any(settings.read_backend(endpoint) == "postgres" for endpoint in ROUTABLE_ENDPOINTS)
+    return StartupService(
+        get_shared_neo4j_driver,
+        neo4j_retry_delays(),
+        warm_up=create_warm_up(settings) if settings.startup_warm_up else None,
+        postgres_engine_factory=get_shared_async_postgres_engine if uses_postgres else None,
+        recheck_seconds=settings.readiness_recheck_seconds
+    )
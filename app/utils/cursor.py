@@ -0,0 +1,53 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """Opaque, URL-safe page cursor for a keyset position such as {"timestamp": ..., "tx_hash": ...}."""
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def iso_datetime(value: Any) -> str:
+    """Cursor field holding an ISO 8601 datetime, kept as the string so that no precision is lost."""
+    if not isinstance(value, str):
+        raise TypeError("not a string")
+    datetime.fromisoformat(value)
+    return value
+
+
+def integer(value: Any) -> int:
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise TypeError("not an integer")
+    return value
+
+
+def string(value: Any) -> str:
+    if not isinstance(value, str):
+        raise TypeError("not a string")
+    return value
+
+
+def decode_cursor(cursor: str, fields: Dict[str, Callable[[Any], Any]]) -> Dict[str, Any]:
+    """
+    :param fields: The fields of the position with the function checking each, e.g. {"timestamp": iso_datetime}.
+                   Those raise ValueError or TypeError on a value they do not accept.
+    :return: The position, with these fields only.
+    :raise ValueError: if `cursor` was not produced by encode_cursor from a position with these fields.
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Malformed cursor: {e}")
+    if not isinstance(position, dict):
+        raise ValueError("Malformed cursor")
+    decoded = {}
+    for name, check in fields.items():
+        if name not in position:
+            raise ValueError(f"Malformed cursor: no {name}")
+        try:
+            decoded[name] = check(position[name])
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Malformed cursor: invalid {name}: {e}")
+    return decoded
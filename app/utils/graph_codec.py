@@ -0,0 +1,91 @@
+import gzip
+from typing import Any, Dict, List, Optional, Union
+
+import msgpack
+from fastapi import Response
+
+from app.models.graph import GraphData
+
+GRAPH_MSGPACK_MEDIA_TYPE = "application/vnd.cardano-graph+msgpack"
+# Payloads smaller than this are not worth the CPU of compressing
+COMPRESSION_THRESHOLD = 32 * 1024
+
+
+class StringTable:
+    def __init__(self):
+        self.strings: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def intern(self, value: str) -> int:
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+
+def encode_compact_graph(graph: GraphData) -> Dict[str, Any]:
+    """
+    Columnar form of a graph. Every string (ids, labels, hashes, edge types) is stored once in `strings` and
+    referenced by index. Nodes are grouped by type into column arrays; the columns listed in `string_columns`
+    hold string-table indexes, the others hold raw values. Edges are three parallel arrays of indexes:
+
+    {"version": 1, "strings": [...],
+     "nodes": {"Address": {"count": n, "columns": {"id": [...], "label": [...]}, "string_columns": ["id", "label"]}},
+     "edges": {"from": [...], "to": [...], "type": [...]}}
+    """
+    strings = StringTable()
+    groups: Dict[str, Dict[str, Any]] = {}
+
+    for node in graph.nodes:
+        fields = node.model_dump(by_alias=True)
+        node_type = fields.pop("type")
+        group = groups.get(node_type)
+        if group is None:
+            group = groups[node_type] = {"count": 0, "columns": {}, "string_columns": set()}
+
+        for name, value in fields.items():
+            column = group["columns"].get(name)
+            if column is None:
+                # Backfill rows that did not have this field
+                column = group["columns"][name] = [None] * group["count"]
+            if isinstance(value, str):
+                value = strings.intern(value)
+                group["string_columns"].add(name)
+            column.append(value)
+        group["count"] += 1
+        for column in group["columns"].values():
+            if len(column) < group["count"]:
+                column.append(None)
+
+    for group in groups.values():
+        group["string_columns"] = sorted(group["string_columns"])
+
+    edges = {"from": [], "to": [], "type": []}
+    for edge in graph.edges:
+        edges["from"].append(strings.intern(edge.from_address))
+        edges["to"].append(strings.intern(edge.to_address))
+        edges["type"].append(strings.intern(edge.type))
+
+    return {"version": 1, "strings": strings.strings, "nodes": groups, "edges": edges}
+
+
+def wants_compact_graph(accept: Optional[str]) -> bool:
+    return accept is not None and GRAPH_MSGPACK_MEDIA_TYPE in accept
+
+
+def negotiate_graph_response(graph: GraphData, accept: Optional[str],
+                             accept_encoding: Optional[str]) -> Union[GraphData, Response]:
+    """
+    Return the MessagePack-encoded compact graph when the client asks for it via Accept, gzip-compressed when large
+    enough and accepted by the client. Otherwise return the graph unchanged for the regular JSON response.
+    """
+    if not wants_compact_graph(accept):
+        return graph
+
+    body = msgpack.packb(encode_compact_graph(graph), use_bin_type=True)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if len(body) >= COMPRESSION_THRESHOLD and accept_encoding and "gzip" in accept_encoding:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type=GRAPH_MSGPACK_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,215 @@
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from enum import Enum
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from app.models.graph import GraphData
+
+Positions = Dict[str, Tuple[float, float]]
+
+
+class LayoutAlgorithm(str, Enum):
+    FORCE = "force"
+    TIMELINE = "timeline"
+
+
+def _edge_index(graph: GraphData, index: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+    pairs = [(index[edge.from_address], index[edge.to_address]) for edge in graph.edges
+             if edge.from_address in index and edge.to_address in index and edge.from_address != edge.to_address]
+    if not pairs:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    edges = np.asarray(pairs, dtype=np.int64)
+    return edges[:, 0], edges[:, 1]
+
+
+def _scatter_add(target: np.ndarray, indices: np.ndarray, values: np.ndarray):
+    # np.bincount is several times faster than np.add.at for large index arrays
+    for axis in range(target.shape[1]):
+        target[:, axis] += np.bincount(indices, weights=values[:, axis], minlength=target.shape[0])
+
+
+def force_layout(graph: GraphData, iterations: Optional[int] = None, seed: int = 0) -> np.ndarray:
+    """
+    Fruchterman-Reingold spring layout, vectorised with NumPy.
+    Repulsion uses a Barnes-Hut style grid approximation: nodes are binned into a grid, occupied cells repel each
+    other through their centres of mass, and nodes inside a cell are pushed away from their own cell's centre.
+    This costs O(n + cells^2) per iteration instead of O(n^2). Attraction runs along edges only.
+    :return: (n, 2) float array of positions, in node order.
+    """
+    n = len(graph.nodes)
+    if n == 0:
+        return np.empty((0, 2))
+    if iterations is None:
+        iterations = 100 if n <= 1000 else 50 if n <= 10000 else 30
+
+    index = {node.id: i for i, node in enumerate(graph.nodes)}
+    sources, targets = _edge_index(graph, index)
+
+    rng = np.random.default_rng(seed)
+    radius = np.sqrt(n)
+    positions = rng.uniform(-radius, radius, size=(n, 2))
+    k = 1.0  # ideal edge length
+    temperature = radius / 4
+    cooling = temperature / (iterations + 1)
+    grid_size = int(np.clip(np.sqrt(n) / 2, 4, 32))
+
+    for _ in range(iterations):
+        # Bin nodes into the grid and compute each occupied cell's centre of mass
+        low = positions.min(axis=0)
+        span = np.maximum(positions.max(axis=0) - low, 1e-9)
+        cell = np.minimum((positions - low) / span * grid_size, grid_size - 1).astype(np.int64)
+        cell_id = cell[:, 0] * grid_size + cell[:, 1]
+        occupied, node_cell, mass = np.unique(cell_id, return_inverse=True, return_counts=True)
+        mass = mass.astype(np.float64)
+        centres = np.stack([np.bincount(node_cell, weights=positions[:, axis]) / mass for axis in range(2)], axis=1)
+
+        # Far field: cell-to-cell repulsion, shared by every node in the cell
+        delta = centres[:, None, :] - centres[None, :, :]
+        distance_sq = (delta ** 2).sum(axis=2) + (span.max() / grid_size) ** 2 / 4
+        cell_force = (delta * (k ** 2 * mass / distance_sq)[:, :, None]).sum(axis=1)
+        displacement = cell_force[node_cell]
+
+        # Near field: spread nodes out around the centre of their own cell
+        delta = positions - centres[node_cell]
+        distance_sq = (delta ** 2).sum(axis=1) + 0.01 * k ** 2
+        displacement += delta * (k ** 2 * (mass[node_cell] - 1) / distance_sq)[:, None]
+
+        # Spring attraction along edges
+        if sources.size:
+            delta = positions[sources] - positions[targets]
+            distance = np.sqrt((delta ** 2).sum(axis=1))[:, None]
+            force = delta * distance / k
+            _scatter_add(displacement, sources, -force)
+            _scatter_add(displacement, targets, force)
+
+        # Weak gravity keeps disconnected components on screen
+        displacement -= positions * 0.01
+
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 1e-9)[:, None]
+        positions += displacement / length * np.minimum(length, temperature)
+        temperature = max(temperature - cooling, 0.01)
+
+    return positions
+
+
+def timeline_layout(graph: GraphData, iterations: int = 20) -> np.ndarray:
+    """
+    Left-to-right layout by time: transactions are placed on x by timestamp, every other node at the mean x of its
+    neighbours. Nodes are stacked in columns of x, ordered so that connected nodes line up; every node gets a
+    distinct position.
+    :return: (n, 2) float array of positions, in node order.
+    """
+    n = len(graph.nodes)
+    if n == 0:
+        return np.empty((0, 2))
+
+    index = {node.id: i for i, node in enumerate(graph.nodes)}
+    sources, targets = _edge_index(graph, index)
+
+    timestamps = np.full(n, np.nan)
+    for i, node in enumerate(graph.nodes):
+        value = getattr(node, "timestamp", None) or getattr(node, "time", None)
+        if value:
+            try:
+                timestamps[i] = datetime.fromisoformat(value).timestamp()
+            except ValueError:
+                pass
+
+    width = np.sqrt(n) * 4
+    anchored = ~np.isnan(timestamps)
+    x = np.zeros(n)
+    if anchored.any():
+        low, high = np.nanmin(timestamps), np.nanmax(timestamps)
+        x[anchored] = (timestamps[anchored] - low) / max(high - low, 1e-9) * width
+
+    both_ends = np.concatenate([sources, targets])
+    other_ends = np.concatenate([targets, sources])
+    degree = np.maximum(np.bincount(both_ends, minlength=n), 1)
+
+    def neighbour_mean(values: np.ndarray) -> np.ndarray:
+        return np.bincount(both_ends, weights=values[other_ends], minlength=n) / degree
+
+    for _ in range(3):
+        x = np.where(anchored, x, neighbour_mean(x))
+    # Columns are derived from x as reported, so that nodes in different columns never share a reported x
+    x = np.round(x, 3)
+
+    # Spread nodes vertically within columns, then reorder each column by the mean height of their neighbours.
+    # Only the order is smoothed: y stays the rank within the column, so no two nodes share a position.
+    column = np.round(x / max(width / np.sqrt(n), 1e-9)).astype(np.int64)
+
+    def column_ranks(order: np.ndarray) -> np.ndarray:
+        sorted_columns = column[order]
+        ranks = np.empty(n)
+        ranks[order] = np.arange(n) - np.searchsorted(sorted_columns, sorted_columns, side="left")
+        return ranks
+
+    y = column_ranks(np.argsort(column, kind="stable")) * 2.0
+    if sources.size:
+        smoothed = y.copy()
+        for _ in range(iterations):
+            smoothed = 0.5 * smoothed + 0.5 * neighbour_mean(smoothed)
+        y = column_ranks(np.lexsort((y, smoothed, column))) * 2.0
+
+    return np.stack([x, y], axis=1)
+
+
+def compute_layout(graph: GraphData, algorithm: LayoutAlgorithm = LayoutAlgorithm.FORCE) -> Positions:
+    if algorithm == LayoutAlgorithm.TIMELINE:
+        positions = timeline_layout(graph)
+    else:
+        seed = zlib.crc32(graph.nodes[0].id.encode()) if graph.nodes else 0
+        positions = force_layout(graph, seed=seed)
+    return {node.id: (round(float(x), 3), round(float(y), 3)) for node, (x, y) in zip(graph.nodes, positions)}
+
+
+def with_positions(graph: GraphData, positions: Positions) -> GraphData:
+    """Copy of `graph` with x/y set on every node that has a position; the input graph is left untouched."""
+    nodes = []
+    for node in graph.nodes:
+        position = positions.get(node.id)
+        nodes.append(node.model_copy(update={"x": position[0], "y": position[1]}) if position else node)
+    return GraphData(nodes=nodes, edges=graph.edges)
+
+
+class LayoutCache:
+    """LRU cache of computed positions, keyed by whatever identifies the graph (root, window, depth, ...)."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, Positions] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Positions]:
+        with self._lock:
+            positions = self._entries.get(key)
+            if positions is not None:
+                self._entries.move_to_end(key)
+            return positions
+
+    def put(self, key: Hashable, positions: Positions):
+        with self._lock:
+            self._entries[key] = positions
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+layout_cache = LayoutCache()
+
+
+def layout_graph(graph: GraphData, key: Hashable, algorithm: LayoutAlgorithm = LayoutAlgorithm.FORCE) -> GraphData:
+    """
+    Add x/y positions to `graph`, reusing the cached layout for `key` when there is one. Nodes that are missing from
+    a cached layout (the graph grew since) trigger a fresh layout.
+    """
+    cache_key = (key, algorithm)
+    positions = layout_cache.get(cache_key)
+    if positions is None or any(node.id not in positions for node in graph.nodes):
+        positions = compute_layout(graph, algorithm)
+        layout_cache.put(cache_key, positions)
+    return with_positions(graph, positions)
@@ -0,0 +1,26 @@
+from typing import Iterable, Iterator, Optional, Union
+
+from app.models.graph import BaseNode, BaseEdge
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(accept: Optional[str], stream: bool = False) -> bool:
+    return stream or (accept is not None and NDJSON_MEDIA_TYPE in accept)
+
+
+def iter_ndjson_chunks(items: Iterable[Union[BaseNode, BaseEdge]], chunk_size: int = 500) -> Iterator[bytes]:
+    """
+    Encode graph items as newline-delimited JSON, one item per line:
+    {"kind": "node", "data": {...}} or {"kind": "edge", "data": {...}}.
+    Lines are flushed in chunks of `chunk_size` items, so memory is bounded by the chunk rather than the graph.
+    """
+    chunk = []
+    for item in items:
+        kind = "edge" if isinstance(item, BaseEdge) else "node"
+        chunk.append(f'{{"kind":"{kind}","data":{item.model_dump_json(by_alias=True)}}}\n')
+        if len(chunk) >= chunk_size:
+            yield "".join(chunk).encode()
+            chunk = []
+    if chunk:
+        yield "".join(chunk).encode()
@@ -0,0 +1,73 @@
+import base64
+import hashlib
+import math
+from typing import Iterable, Iterator, List, Optional
+
+
+class BloomFilter:
+    """
+    Bloom filter over node ids, as sent by clients that do not want to list every id they hold.
+    Bit positions use double hashing over SHA-256 of the UTF-8 id: with h1 and h2 the first two big-endian
+    64-bit words of the digest, hash i maps to (h1 + i * h2) mod num_bits. Bit j lives in byte j // 8 under
+    mask 1 << (j % 8).
+    """
+
+    def __init__(self, num_bits: int, num_hashes: int, bits: Optional[bytearray] = None):
+        if num_bits <= 0 or num_hashes <= 0:
+            raise ValueError("num_bits and num_hashes must be positive")
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+        if len(self.bits) * 8 < num_bits:
+            raise ValueError(f"Expected at least {num_bits} bits, got {len(self.bits) * 8}")
+
+    @classmethod
+    def for_capacity(cls, capacity: int, false_positive_rate: float = 0.01) -> "BloomFilter":
+        num_bits = max(8, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        num_hashes = max(1, round(num_bits / max(capacity, 1) * math.log(2)))
+        return cls(num_bits, num_hashes)
+
+    @classmethod
+    def from_base64(cls, bits: str, num_bits: int, num_hashes: int) -> "BloomFilter":
+        return cls(num_bits, num_hashes, bytearray(base64.b64decode(bits)))
+
+    def to_base64(self) -> str:
+        return base64.b64encode(bytes(self.bits)).decode("ascii")
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.sha256(item.encode("utf-8")).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big")
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class KnownSet:
+    """
+    Ids of the nodes a client already holds, given as an exact list, a Bloom filter, or both.
+    A Bloom filter false positive only means a node is left out of a delta; the client can re-request it by id.
+    """
+
+    def __init__(self, ids: Iterable[str] = (), bloom: Optional[BloomFilter] = None):
+        self.ids = set(ids)
+        self.bloom = bloom
+
+    def __contains__(self, node_id: Optional[str]) -> bool:
+        if node_id is None:
+            return False
+        return node_id in self.ids or (self.bloom is not None and node_id in self.bloom)
+
+    def __bool__(self) -> bool:
+        return bool(self.ids) or self.bloom is not None
+
+    @property
+    def exact_ids(self) -> List[str]:
+        """Ids that queries can test inside Cypher to skip fetching properties of known nodes."""
+        return list(self.ids)
@@ -0,0 +1,40 @@
+import threading
+from collections import deque
+from typing import Dict
+
+import numpy as np
+
+
+class LatencyWindow:
+    """
+    Running count, total and maximum of a latency, plus percentiles over the most recent `window` samples so that
+    they follow the current load instead of the whole process lifetime. Thread-safe.
+    """
+
+    def __init__(self, window: int = 1024):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+        self._count = 0
+        self._total = 0.0
+        self._max = 0.0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self._count += 1
+            self._total += seconds
+            self._max = max(self._max, seconds)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            samples = np.fromiter(self._samples, dtype=np.float64, count=len(self._samples))
+            count, total, maximum = self._count, self._total, self._max
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99]) if len(samples) else (0.0, 0.0, 0.0)
+        return {
+            "count": count,
+            "mean_ms": round(total / count * 1000, 3) if count else 0.0,
+            "p50_ms": round(float(p50) * 1000, 3),
+            "p95_ms": round(float(p95) * 1000, 3),
+            "p99_ms": round(float(p99) * 1000, 3),
+            "max_ms": round(maximum * 1000, 3)
+        }
@@ -0,0 +1,184 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name, self.help_text, self.label_names = name, help_text, tuple(label_names)
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} {self.type_name}"
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_label_text(self.label_names, labels)} {_number(value)}"
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram:
+    """Fixed buckets per label set: one bisect and one lock per observation."""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help_text, self.label_names = name, help_text, tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # Per label set: non-cumulative bucket counts (last one is +Inf), then sum
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, labels: Labels = ()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            values = [(labels, list(counts), total[0]) for labels, (counts, total) in self._values.items()]
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket_label = f'le="{le}"'
+                yield f"{self.name}_bucket{_label_text(self.label_names, labels, bucket_label)} {cumulative}"
+            yield f"{self.name}_sum{_label_text(self.label_names, labels)} {_number(total)}"
+            yield f"{self.name}_count{_label_text(self.label_names, labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]):
+        """`collector` yields exposition lines at scrape time, for values owned by other components."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+requests_total = registry.register(Counter(
+    "http_requests_total", "Requests per route template, method and status code.", ("method", "route", "status")))
+requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Requests being handled per route template.", ("method", "route")))
+request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Time until the last byte of the response was sent.", ("method", "route")))
+response_size = registry.register(Histogram(
+    "http_response_size_bytes", "Response body size.", ("method", "route"), SIZE_BUCKETS))
+
+
+def _instrument(app, route: str):
+    async def instrumented(scope, receive, send):
+        method = scope["method"]
+        labels = (method, route)
+        status = "500"
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        requests_in_flight.inc(labels)
+        started = time.perf_counter()
+        try:
+            await app(scope, receive, send_wrapper)
+        finally:
+            request_duration.observe(time.perf_counter() - started, labels)
+            response_size.observe(size, labels)
+            requests_total.inc((method, route, status))
+            requests_in_flight.dec(labels)
+
+    return instrumented
+
+
+def instrument_routes(app: FastAPI):
+    """
+    Wrap the ASGI app of every API route so that requests are labelled with the route template, e.g.
+    /addresses/{address}, which keeps the number of series bounded. Call after all routers are included.
+    """
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            route.app = _instrument(route.app, route.path)
+
+
+def summary_lines(name: str, help_text: str, label_names: Sequence[str],
+                  series: Iterable[Tuple[Labels, Dict[str, float]]]) -> Iterable[str]:
+    """Render LatencyWindow snapshots as a Prometheus summary (quantiles in seconds)."""
+    yield f"# HELP {name} {help_text}"
+    yield f"# TYPE {name} summary"
+    for labels, snapshot in series:
+        for quantile, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+            quantile_label = f'quantile="{quantile}"'
+            yield f"{name}{_label_text(label_names, labels, quantile_label)} {snapshot[key] / 1000}"
+        yield f"{name}_sum{_label_text(label_names, labels)} {snapshot['mean_ms'] * snapshot['count'] / 1000}"
+        yield f"{name}_count{_label_text(label_names, labels)} {snapshot['count']}"
+
+
+def gauge_lines(name: str, help_text: str, label_names: Sequence[str],
+                series: Iterable[Tuple[Labels, float]]) -> Iterable[str]:
+    yield f"# HELP {name} {help_text}"
+    yield f"# TYPE {name} gauge"
+    for labels, value in series:
+        yield f"{name}{_label_text(label_names, labels)} {_number(value)}"
@@ -0,0 +1,89 @@
+import functools
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for a key is in flight, further calls for the same key wait
+    for it and share its result (or exception) instead of running again. Nothing is cached once the call returns.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0})
+
+    def do(self, name: str, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            stats = self._stats[name]
+            stats["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                stats["executions"] += 1
+            else:
+                stats["coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                name: {**stats, "in_flight": sum(1 for key in self._calls if key[0] == name)}
+                for name, stats in self._stats.items()
+            }
+
+
+query_flight = SingleFlight()
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def single_flight(func: Callable) -> Callable:
+    """
+    Decorate a graph query function `func(driver, *args, **kwargs)` so that concurrent calls with the same
+    arguments share one query. The driver is not part of the key. Callers receive the same result object and
+    must treat it as read-only.
+    """
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(driver, *args, **kwargs):
+        key = (name, _freeze(args), _freeze(kwargs))
+        return query_flight.do(name, key, func, driver, *args, **kwargs)
+
+    return wrapper
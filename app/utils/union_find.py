@@ -0,0 +1,83 @@
+from array import array
+from typing import Dict, Hashable, Iterable, List
+
+import numpy as np
+
+
+class UnionFind:
+    """
+    Disjoint sets over arbitrary hashable keys, backed by flat integer arrays (8 bytes per element for the parent
+    and size each) so that tens of millions of addresses fit in memory. Union by size with path halving keeps
+    every operation close to constant time.
+    """
+
+    def __init__(self):
+        self._index: Dict[Hashable, int] = {}
+        self._keys: List[Hashable] = []
+        self._parent = array("q")
+        self._size = array("q")
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._index
+
+    def keys(self) -> List[Hashable]:
+        return self._keys
+
+    def add(self, key: Hashable) -> int:
+        i = self._index.get(key)
+        if i is None:
+            i = len(self._keys)
+            self._index[key] = i
+            self._keys.append(key)
+            self._parent.append(i)
+            self._size.append(1)
+        return i
+
+    def _find(self, i: int) -> int:
+        parent = self._parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def find(self, key: Hashable) -> Hashable:
+        return self._keys[self._find(self._index[key])]
+
+    def union(self, a: Hashable, b: Hashable):
+        root_a, root_b = self._find(self.add(a)), self._find(self.add(b))
+        if root_a == root_b:
+            return
+        if self._size[root_a] < self._size[root_b]:
+            root_a, root_b = root_b, root_a
+        self._parent[root_b] = root_a
+        self._size[root_a] += self._size[root_b]
+
+    def union_all(self, keys: Iterable[Hashable]):
+        """Put all `keys` in the same set."""
+        iterator = iter(keys)
+        first = next(iterator, None)
+        if first is None:
+            return
+        self.add(first)
+        for key in iterator:
+            self.union(first, key)
+
+    def groups(self) -> Dict[Hashable, List[Hashable]]:
+        """
+        All sets, keyed by their root key. Roots are resolved for every element at once by pointer jumping over
+        the parent array instead of one find() per key.
+        """
+        roots = np.frombuffer(self._parent, dtype=np.int64).copy()
+        while True:
+            grandparents = roots[roots]
+            if np.array_equal(grandparents, roots):
+                break
+            roots = grandparents
+
+        groups: Dict[Hashable, List[Hashable]] = {}
+        for key, root in zip(self._keys, roots.tolist()):
+            groups.setdefault(self._keys[root], []).append(key)
+        return groups
@@ -0,0 +1,388 @@
+"""
+Load benchmark of the API routers against an in-memory stand-in of Neo4j, so it runs on an offline machine.
+
+    python -m benchmarks.api_benchmark --blocks 500 --rps 200 --duration 30 --output baseline.json
+    python -m benchmarks.api_benchmark --blocks 500 --rps 200 --duration 30 --compare baseline.json
+
+A synthetic chain (see benchmarks/synthetic_chain.py) is generated from the seed, and the API is served from a
+separate process with the stand-in driver (see benchmarks/standin.py) so that the load generator does not compete
+with it for the GIL. Requests are sent open-loop at a fixed rate, cycling through every endpoint with ids sampled
+from the chain (addresses weighted by activity, so hubs come up often), and latency is measured from the time a
+request was due rather than sent, so a slow server cannot hide queueing by slowing the generator down.
+
+With --base-url the load goes to a running server instead, which must serve a graph ingested from the same chain.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import socket
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from benchmarks.synthetic_chain import ChainConfig, SyntheticChain, generate_chain
+
+@dataclass
+class Endpoint:
+    name: str
+    method: str
+    # Returns the path and JSON body of one request
+    request: Callable[["Samples"], Tuple[str, Optional[dict]]]
+
+
+class Samples:
+    """Ids to put in requests, drawn from the chain with a shared generator."""
+
+    def __init__(self, chain: SyntheticChain, seed: int):
+        self.rng = np.random.default_rng(seed)
+        # One entry per output: active addresses, stake keys and tokens are proportionally more likely
+        self.addresses = [row["address"] for row in chain.tx_out]
+        stake_views = {row["id"]: row["view"] for row in chain.stake_address}
+        self.stake_addresses = [stake_views[row["stake_address_id"]] for row in chain.tx_out
+                                if row["stake_address_id"]]
+        fingerprints = {row["id"]: row["fingerprint"] for row in chain.multi_asset}
+        self.assets = [fingerprints[row["ident"]] for row in chain.ma_tx_out] or list(fingerprints.values())
+        spending = {row["tx_in_id"] for row in chain.tx_in}
+        self.transactions = [row["hash"].hex() for row in chain.tx if row["id"] in spending]
+        self.blocks = [row["hash"].hex() for row in chain.block]
+        self.epochs = [row["no"] for row in chain.epoch]
+
+    def pick(self, values: List):
+        return values[int(self.rng.integers(len(values)))]
+
+    def address(self) -> str:
+        return self.pick(self.addresses)
+
+    def stake_address(self) -> str:
+        return self.pick(self.stake_addresses)
+
+    def entity(self) -> str:
+        # The stand-in groups addresses into entities by stake key
+        return "entity_" + self.stake_address()[-20:]
+
+    def asset(self) -> str:
+        return self.pick(self.assets)
+
+    def transaction(self) -> str:
+        return self.pick(self.transactions)
+
+    def block(self) -> str:
+        return self.pick(self.blocks)
+
+    def epoch(self) -> int:
+        return self.pick(self.epochs)
+
+    def keys(self, sample: Callable[[], str], count: int = 10) -> dict:
+        return {"keys": [sample() for _ in range(count)]}
+
+
+ENDPOINTS = [
+    Endpoint("addresses", "GET", lambda s: ("/addresses?page=0&size=50", None)),
+    Endpoint("address_analytics", "GET", lambda s: (f"/addresses/analytics/{s.address()}/ONE_MONTH", None)),
+    Endpoint("address_txs", "GET", lambda s: (f"/addresses/{s.address()}/txs?size=50", None)),
+    Endpoint("address_tokens", "GET", lambda s: (f"/addresses/{s.address()}/tokens", None)),
+    Endpoint("address_utxos", "GET", lambda s: (f"/addresses/{s.address()}/utxos", None)),
+    Endpoint("address_batch", "POST", lambda s: ("/addresses/batch", s.keys(s.address))),
+    Endpoint("address_details", "GET", lambda s: (f"/addresses/{s.address()}", None)),
+    Endpoint("top_addresses", "GET", lambda s: ("/analytics/addresses/top?metric=pagerank&limit=100", None)),
+    Endpoint("block_batch", "POST", lambda s: ("/blocks/batch", s.keys(s.block))),
+    Endpoint("block_details", "GET", lambda s: (f"/blocks/{s.block()}", None)),
+    Endpoint("cardano_data", "GET", lambda s: ("/cardano/data", None)),
+    Endpoint("debug_single_flight", "GET", lambda s: ("/debug/single-flight", None)),
+    Endpoint("debug_query_stats", "GET", lambda s: ("/debug/query-stats", None)),
+    Endpoint("asset_details", "GET", lambda s: (f"/asset/{s.asset()}", None)),
+    Endpoint("entity", "GET", lambda s: (f"/entities/{s.entity()}", None)),
+    Endpoint("epoch_details", "GET", lambda s: (f"/epochs/{s.epoch()}", None)),
+    Endpoint("asset_graph", "GET", lambda s: (f"/graph/asset/{s.asset()}?limit=200", None)),
+    Endpoint("address_graph", "GET", lambda s: (f"/graph/addresses/{s.address()}", None)),
+    Endpoint("address_graph_stream", "GET", lambda s: (f"/graph/addresses/{s.address()}?stream=true", None)),
+    Endpoint("address_graph_expand", "GET", lambda s: (f"/graph/addresses/{s.address()}?depth=2&max_nodes=200",
+                                                       None)),
+    Endpoint("address_graph_known", "POST", lambda s: (f"/graph/addresses/{s.address()}/expand",
+                                                       {"known_ids": [s.transaction() for _ in range(20)]})),
+    Endpoint("block_graph", "GET", lambda s: (f"/graph/blocks/{s.block()}", None)),
+    Endpoint("blocks", "GET", lambda s: ("/blocks?skip=0&limit=10", None)),
+    Endpoint("epochs", "GET", lambda s: ("/epochs?skip=0&limit=10", None)),
+    Endpoint("metrics", "GET", lambda s: ("/metrics", None)),
+    Endpoint("search_transaction", "GET", lambda s: (f"/search?q={s.transaction()[:12]}", None)),
+    Endpoint("search_address", "GET", lambda s: (f"/search?q={s.address()[:16]}", None)),
+    Endpoint("stake_details", "GET", lambda s: (f"/api/v1/stakes/{s.stake_address()}", None)),
+    Endpoint("transaction_batch", "POST", lambda s: ("/transactions/batch", s.keys(s.transaction))),
+    Endpoint("transaction_details", "GET", lambda s: (f"/transactions/{s.transaction()}", None)),
+    Endpoint("transaction_utxos", "GET", lambda s: (f"/transactions/{s.transaction()}/utxos", None)),
+    Endpoint("transaction_signatories", "GET", lambda s: (f"/transactions/{s.transaction()}/signatories", None)),
+    Endpoint("transactions", "GET", lambda s: ("/transactions?page=1&page_size=20", None)),
+]
+
+
+def create_standin_app(chain: SyntheticChain, query_latency_ms: float, row_latency_us: float):
+    """The application of app.main with every Neo4j dependency pointing at a stand-in driver over `chain`."""
+    os.environ.setdefault("MARKET_DATA_PROVIDER", "static")
+
+    from contextlib import asynccontextmanager
+
+    from fastapi import FastAPI
+
+    from app.config import get_settings
+    from app.db.repository import ROUTABLE_ENDPOINTS, GraphChainRepository
+    from app.routers import graph, dashboard, details, address, stake, transaction, block, epoch, debug, entity, \
+        analytics, search, metrics, health
+    from app.routers.dependencies import get_neo4j_driver, chain_repository
+    from app.services.market_data import create_market_data_service
+    from app.services.startup import StartupService
+    from app.utils.metrics import instrument_routes
+    from benchmarks.standin import StandInDriver, StandInGraph
+
+    driver = StandInDriver(StandInGraph(chain), query_latency_ms, row_latency_us)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.state.startup = StartupService(lambda: driver, [])
+        await app.state.startup.start()
+        app.state.market_data = create_market_data_service(get_settings())
+        await app.state.market_data.start()
+        yield
+        await app.state.market_data.stop()
+        await app.state.startup.stop()
+
+    app = FastAPI(lifespan=lifespan)
+    for module in (address, analytics, block, dashboard, debug, details, entity, epoch, graph, health, metrics,
+                   search, stake, transaction):
+        app.include_router(module.router)
+    app.dependency_overrides[get_neo4j_driver] = lambda: driver
+    for endpoint in ROUTABLE_ENDPOINTS:
+        app.dependency_overrides[chain_repository(endpoint)] = lambda: GraphChainRepository(driver)
+    instrument_routes(app)
+    return app
+
+
+def _serve(config: ChainConfig, port: int, query_latency_ms: float, row_latency_us: float):
+    import uvicorn
+
+    app = create_standin_app(generate_chain(config), query_latency_ms, row_latency_us)
+    # Failing requests show up in the status counts of the report; their tracebacks would drown the output
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="critical")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_until_up(base_url: str, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while True:
+            try:
+                if (await client.get("/health/ready")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Server at {base_url} did not come up within {timeout}s")
+            await asyncio.sleep(0.2)
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    latency: float
+    status: int
+    size: int
+
+
+@dataclass
+class LoadResult:
+    samples: List[Sample] = field(default_factory=list)
+    elapsed: float = 0.0
+
+
+async def _send(client: httpx.AsyncClient, endpoint: Endpoint, path: str, body: Optional[dict],
+                due: float, result: LoadResult):
+    try:
+        response = await client.request(endpoint.method, path, json=body)
+        status, size = response.status_code, len(response.content)
+    except httpx.HTTPError as e:
+        logging.debug(f"{endpoint.name} {path} failed: {e!r}")
+        status, size = 0, 0
+    result.samples.append(Sample(endpoint.name, time.perf_counter() - due, status, size))
+
+
+async def run_load(base_url: str, endpoints: List[Endpoint], samples: Samples, rps: float, duration: float,
+                   connections: int, timeout: float) -> LoadResult:
+    """
+    Open-loop load: request i is due at start + i / rps whatever happened to the previous ones, and endpoints take
+    turns so that each gets rps / len(endpoints).
+    """
+    result = LoadResult()
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        tasks = []
+        start = time.perf_counter()
+        for i in range(int(rps * duration)):
+            due = start + i / rps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            endpoint = endpoints[i % len(endpoints)]
+            path, body = endpoint.request(samples)
+            tasks.append(asyncio.create_task(_send(client, endpoint, path, body, due, result)))
+        await asyncio.gather(*tasks)
+        result.elapsed = time.perf_counter() - start
+    return result
+
+
+def summarize(result: LoadResult) -> Dict[str, Dict[str, Any]]:
+    by_endpoint: Dict[str, List[Sample]] = {}
+    for sample in result.samples:
+        by_endpoint.setdefault(sample.endpoint, []).append(sample)
+    by_endpoint["all"] = result.samples
+
+    summary = {}
+    for name, samples in by_endpoint.items():
+        latencies = np.array([sample.latency for sample in samples]) * 1000
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        statuses: Dict[str, int] = {}
+        for sample in samples:
+            # Status 0 is a request that got no response, e.g. on a connection the server dropped after a 500
+            status = str(sample.status) if sample.status else "transport_error"
+            statuses[status] = statuses.get(status, 0) + 1
+        summary[name] = {
+            "requests": len(samples),
+            "errors": sum(1 for sample in samples if not 200 <= sample.status < 400),
+            "statuses": statuses,
+            "throughput_rps": round(len(samples) / result.elapsed, 2),
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(latencies.max()), 2),
+            "mean_bytes": int(np.mean([sample.size for sample in samples]))
+        }
+    return summary
+
+
+def compare(summary: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], max_regression: float,
+            min_delta_ms: float) -> List[str]:
+    """
+    Endpoints whose p99 grew by more than `max_regression` (relative) and `min_delta_ms` (absolute) over the
+    baseline; the absolute floor keeps sub-millisecond jitter from failing a run.
+    """
+    regressions = []
+    for name, stats in summary.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        delta = stats["p99_ms"] - before["p99_ms"]
+        if delta > min_delta_ms and stats["p99_ms"] > before["p99_ms"] * (1 + max_regression):
+            regressions.append(f"{name}: p99 {before['p99_ms']} -> {stats['p99_ms']} ms")
+        if stats["errors"] > before["errors"]:
+            regressions.append(f"{name}: {before['errors']} -> {stats['errors']} errors")
+    return regressions
+
+
+def print_summary(summary: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]] = None):
+    print(f"{'endpoint':<26} {'reqs':>6} {'err':>5} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'base p99':>9}")
+    for name, stats in sorted(summary.items(), key=lambda item: (item[0] == "all", item[0])):
+        base = (baseline or {}).get(name, {}).get("p99_ms", "")
+        print(f"{name:<26} {stats['requests']:>6} {stats['errors']:>5} {stats['throughput_rps']:>8} "
+              f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9} {base:>9}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] - %(asctime)s - %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blocks", type=int, default=500)
+    parser.add_argument("--txs-per-block", type=int, default=20)
+    parser.add_argument("--addresses", type=int, default=20000)
+    parser.add_argument("--hubs", type=int, default=10)
+    parser.add_argument("--hub-share", type=float, default=0.2, help="Share of transactions sent by a hub")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rps", type=float, default=100, help="Target request rate over all endpoints")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load")
+    parser.add_argument("--warmup", type=float, default=3, help="Seconds of load before measuring")
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--endpoints", nargs="+", help="Only these endpoints (default: all)")
+    parser.add_argument("--query-latency-ms", type=float, default=1.0,
+                        help="Round trip the stand-in adds to every query")
+    parser.add_argument("--row-latency-us", type=float, default=2.0,
+                        help="Time the stand-in adds per record returned")
+    parser.add_argument("--base-url", help="Load a running server instead of starting one on the stand-in")
+    parser.add_argument("--output", help="Write the results to this JSON file, e.g. as a new baseline")
+    parser.add_argument("--compare", help="Baseline JSON to compare against; exits with 1 on regressions")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Tolerated relative p99 increase")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Tolerated absolute p99 increase")
+    args = parser.parse_args()
+
+    config = ChainConfig(blocks=args.blocks, txs_per_block=args.txs_per_block, addresses=args.addresses,
+                         hubs=args.hubs, hub_share=args.hub_share, seed=args.seed)
+    endpoints = [endpoint for endpoint in ENDPOINTS if not args.endpoints or endpoint.name in args.endpoints]
+    chain = generate_chain(config)
+    logging.info(f"Generated {len(chain.block)} blocks, {len(chain.tx)} transactions, {len(chain.tx_out)} outputs")
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = multiprocessing.get_context("spawn").Process(
+            target=_serve, args=(config, port, args.query_latency_ms, args.row_latency_us), daemon=True)
+        server.start()
+
+    try:
+        asyncio.run(_wait_until_up(base_url))
+        if args.warmup:
+            logging.info(f"Warming up for {args.warmup}s")
+            asyncio.run(run_load(base_url, endpoints, Samples(chain, args.seed + 1), args.rps, args.warmup,
+                                 args.connections, args.timeout))
+        logging.info(f"Sending {args.rps} requests/s to {len(endpoints)} endpoints for {args.duration}s")
+        result = asyncio.run(run_load(base_url, endpoints, Samples(chain, args.seed), args.rps, args.duration,
+                                      args.connections, args.timeout))
+    finally:
+        if server:
+            server.terminate()
+            server.join()
+
+    summary = summarize(result)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["endpoints"]
+    print_summary(summary, baseline)
+
+    if args.output:
+        report = {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "chain": asdict(config),
+            "load": {"rps": args.rps, "duration": args.duration, "connections": args.connections,
+                     "query_latency_ms": None if args.base_url else args.query_latency_ms,
+                     "row_latency_us": None if args.base_url else args.row_latency_us},
+            "endpoints": summary
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logging.info(f"Wrote results to {args.output}")
+
+    if baseline is not None:
+        regressions = compare(summary, baseline, args.max_regression, args.min_delta_ms)
+        for regression in regressions:
+            logging.error(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Runs the db-sync to graph ingestion pipeline of app/extract_transactions_to_graph_store.py over a database and
+reports rows/sec and peak RSS separately for extraction (fetch_*), transformation (process_utxos) and loading
+(insert_* through a graph sink).
+
+    python -m benchmarks.ingest_benchmark --blocks 2000 --sink memory
+    python -m benchmarks.ingest_benchmark --url sqlite:///dbsync.db --window-minutes 60 --sink null
+
+Without --url a synthetic chain is seeded into a temporary SQLite file first (see benchmarks/dbsync_seed.py).
+`--sink neo4j` writes to the Neo4j configured in the environment, so point it at a scratch instance.
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import resource
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.db_postgres import fetch_blocks, fetch_epochs, fetch_input_utxos, fetch_output_utxos, \
+    fetch_output_assets
+from app.db.graph.sink import GraphSink, InMemorySink, Neo4jSink, NullSink
+from app.db.models.base import Block, Epoch
+from app.utils.utxo_processor import process_utxos
+from benchmarks.dbsync_seed import create_seed_engine, seed_database
+from benchmarks.synthetic_chain import ChainConfig, generate_chain
+
+STAGES = ("extract", "transform", "load")
+RSS_SAMPLE_SECONDS = 0.005
+
+
+def _current_rss() -> int:
+    """Resident set size in bytes, or the process peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if os.uname().sysname == "Darwin" else maxrss * 1024
+
+
+class _RSSSampler:
+    """Samples the RSS on a background thread, so short allocation spikes inside a stage are caught too."""
+
+    def __init__(self):
+        self.start = self.peak = _current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(RSS_SAMPLE_SECONDS):
+            self.peak = max(self.peak, _current_rss())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _current_rss())
+
+
+@dataclass
+class StageStats:
+    rows: int = 0
+    seconds: float = 0.0
+    peak_rss_bytes: int = 0
+    # Freed memory is rarely returned to the OS, so the peak alone mostly reflects earlier stages
+    rss_growth_bytes: int = 0
+
+    @contextmanager
+    def measure(self):
+        start = time.perf_counter()
+        with _RSSSampler() as sampler:
+            yield self
+        self.seconds += time.perf_counter() - start
+        self.peak_rss_bytes = max(self.peak_rss_bytes, sampler.peak)
+        self.rss_growth_bytes = max(self.rss_growth_bytes, sampler.peak - sampler.start)
+
+    def summary(self) -> dict:
+        return {
+            "rows": self.rows,
+            "seconds": round(self.seconds, 3),
+            "rows_per_sec": round(self.rows / self.seconds, 1) if self.seconds else None,
+            "peak_rss_mb": round(self.peak_rss_bytes / 2 ** 20, 1),
+            "rss_growth_mb": round(self.rss_growth_bytes / 2 ** 20, 1)
+        }
+
+
+def run_pipeline(Session: sessionmaker, sink: GraphSink, window: datetime.timedelta) -> Dict[str, StageStats]:
+    """
+    Ingest every block in the database, `window` of chain time at a time, in the order of
+    app/extract_transactions_to_graph_store.py: epochs once, then blocks, UTXOs and assets per window.
+    """
+    stats = {stage: StageStats() for stage in STAGES}
+    with Session() as session:
+        first_block, last_block = session.execute(select(func.min(Block.time), func.max(Block.time))).one()
+        first_epoch, last_epoch = session.execute(select(func.min(Epoch.start_time), func.max(Epoch.end_time))).one()
+        if first_block is None:
+            raise ValueError("The database has no blocks")
+
+        if first_epoch is not None:
+            with stats["extract"].measure() as stage:
+                epochs = fetch_epochs(session, first_epoch, last_epoch)
+                stage.rows += len(epochs)
+            with stats["load"].measure() as stage:
+                sink.insert_epochs(epochs)
+                stage.rows += len(epochs)
+
+    start = first_block
+    while start <= last_block:
+        # The fetch_* bounds are inclusive on both ends
+        end = start + window - datetime.timedelta(microseconds=1)
+        with Session() as session:
+            with stats["extract"].measure() as stage:
+                blocks = fetch_blocks(session, start, end)
+                inputs = fetch_input_utxos(session, start, end)
+                outputs = fetch_output_utxos(session, start, end)
+                assets = fetch_output_assets(session, start, end)
+                stage.rows += len(blocks) + len(inputs) + len(outputs) + len(assets)
+
+        with stats["transform"].measure() as stage:
+            transactions = process_utxos(inputs, outputs)
+            stage.rows += len(inputs) + len(outputs)
+
+        with stats["load"].measure() as stage:
+            sink.insert_blocks(blocks)
+            sink.insert_utxos(transactions)
+            sink.insert_assets(assets)
+            stage.rows += len(blocks) + len(inputs) + len(outputs) + len(assets)
+
+        start += window
+    return stats
+
+
+def _create_sink(name: str) -> GraphSink:
+    if name == "neo4j":
+        from app.db.connections import connect_neo4j
+        return Neo4jSink(connect_neo4j())
+    if name == "memory":
+        return InMemorySink()
+    return NullSink()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="SQLAlchemy URL of a db-sync copy or seeded database (default: seed SQLite)")
+    parser.add_argument("--blocks", type=int, default=1000)
+    parser.add_argument("--txs-per-block", type=int, default=20)
+    parser.add_argument("--addresses", type=int, default=20000)
+    parser.add_argument("--hubs", type=int, default=10)
+    parser.add_argument("--hub-share", type=float, default=0.2, help="Share of transactions sent by a hub")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--window-minutes", type=float, default=60, help="Chain time fetched per iteration")
+    parser.add_argument("--sink", choices=["null", "memory", "neo4j"], default="memory")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="[%(levelname)s] - %(asctime)s - %(message)s")
+
+    results = {"sink": args.sink, "window_minutes": args.window_minutes}
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.url
+        if not url:
+            chain = generate_chain(ChainConfig(blocks=args.blocks, txs_per_block=args.txs_per_block,
+                                               addresses=args.addresses, hubs=args.hubs, hub_share=args.hub_share,
+                                               seed=args.seed))
+            url = f"sqlite:///{os.path.join(directory, 'dbsync.db')}"
+            start = time.perf_counter()
+            seed_engine = create_seed_engine(url)
+            seed_database(seed_engine, chain)
+            seed_engine.dispose()
+            results["seed"] = {"rows": chain.row_count(), "seconds": round(time.perf_counter() - start, 3)}
+            del chain
+
+        engine = create_seed_engine(url)
+        sink = _create_sink(args.sink)
+        start = time.perf_counter()
+        stats = run_pipeline(sessionmaker(bind=engine), sink, datetime.timedelta(minutes=args.window_minutes))
+        results["seconds"] = round(time.perf_counter() - start, 3)
+        results["stages"] = {stage: stats[stage].summary() for stage in STAGES}
+        if isinstance(sink, InMemorySink):
+            results["graph"] = sink.counts()
+        engine.dispose()
+
+    for stage in STAGES:
+        print(json.dumps({"stage": stage, **results["stages"][stage]}))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Times the server-side graph layouts on synthetic address graphs.
+
+    python -m benchmarks.layout_benchmark --sizes 1000 10000 50000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.models.graph import GraphData, AddressNode, TransactionNode, BaseEdge
+from app.utils.graph_layout import LayoutAlgorithm, compute_layout
+
+
+def synthetic_graph(num_nodes: int, seed: int = 0) -> GraphData:
+    """Alternating address/transaction graph with a heavy-tailed degree distribution (a few hub addresses)."""
+    rng = np.random.default_rng(seed)
+    num_addresses = num_nodes // 2
+    num_transactions = num_nodes - num_addresses
+    nodes = [AddressNode(id=f"addr{i}", type="Address", label=f"addr{i}") for i in range(num_addresses)]
+    nodes += [TransactionNode(id=f"tx{i}", type="Transaction", tx_hash=f"tx{i}",
+                              timestamp=f"2024-01-01T00:00:00+00:00", value=1) for i in range(num_transactions)]
+    for i, node in enumerate(nodes[num_addresses:]):
+        node.timestamp = f"2024-01-{1 + i * 28 // num_transactions:02d}T00:00:00+00:00"
+
+    # Zipf-distributed endpoints: most addresses appear once or twice, hubs appear thousands of times
+    senders = np.minimum(rng.zipf(1.6, num_transactions) - 1, num_addresses - 1)
+    receivers = rng.integers(0, num_addresses, num_transactions)
+    edges = []
+    for i in range(num_transactions):
+        edges.append(BaseEdge(from_address=f"addr{senders[i]}", to_address=f"tx{i}", type="INPUT_TRANSACTION"))
+        edges.append(BaseEdge(from_address=f"tx{i}", to_address=f"addr{receivers[i]}", type="OUTPUT_TRANSACTION"))
+    return GraphData(nodes=nodes, edges=edges)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--algorithms", nargs="+", default=[algorithm.value for algorithm in LayoutAlgorithm])
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        graph = synthetic_graph(size)
+        for algorithm in args.algorithms:
+            start = time.perf_counter()
+            compute_layout(graph, LayoutAlgorithm(algorithm))
+            elapsed = time.perf_counter() - start
+            results.append({"nodes": size, "edges": len(graph.edges), "algorithm": algorithm,
+                            "seconds": round(elapsed, 3)})
+            print(json.dumps(results[-1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,803 @@
+"""
+In-memory stand-in for the Neo4j driver, serving the read queries of the API from a SyntheticChain.
+
+Cypher is not interpreted: every `session.run` is answered by the handler registered for the function issuing it
+(e.g. `app.db.graph.address.get_address_details`), which computes the records the real query would return from
+indexes built once over the chain. Each query costs `query_latency_ms` plus `row_latency_us` per record returned,
+so endpoints that fan out over hub addresses stay proportionally expensive. A statement without a handler, or
+one its handler does not recognise, raises UnhandledQuery instead of returning nothing, so the endpoint fails with a
+500 rather than answering quickly with an empty page.
+
+The latency it reports is the cost of the Python around the queries (routers, serialisation, single-flight, the
+number of statements per request) plus the synthetic per-query and per-row delays. It does not execute Cypher, so a
+change to a statement alone does not move its p99 here; check those with app/check_query_plans.py against a real
+database.
+"""
+import bisect
+import re
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from neo4j.time import DateTime
+
+from app.db.graph.instrumentation import query_caller
+from app.utils.graph_analytics import TransferGraphBuilder, compute_address_scores
+from benchmarks.synthetic_chain import LOVELACE_PER_ADA, SyntheticChain
+
+UTXOKey = Tuple[str, int]
+
+
+class UnhandledQuery(Exception):
+    """A statement the stand-in cannot answer: no handler is registered for its function, or the handler does not
+    recognise it."""
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _neo4j_datetime(value: Optional[datetime]) -> Optional[DateTime]:
+    return DateTime.from_native(_utc(value)) if value else None
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    return _utc(datetime.fromisoformat(value)) if value else None
+
+
+def _in_window(timestamp: datetime, start: Optional[datetime], end: Optional[datetime]) -> bool:
+    return (start is None or timestamp >= start) and (end is None or timestamp <= end)
+
+
+class StandInGraph:
+    """The graph extract_transactions_to_graph_store.py builds from the chain, as plain dicts and adjacency lists."""
+
+    def __init__(self, chain: SyntheticChain):
+        self.now = _utc(chain.end_time)
+        self.blocks: Dict[str, dict] = {}
+        self.block_hashes: List[str] = []
+        self.block_txs: Dict[str, List[str]] = defaultdict(list)
+        self.epochs: Dict[int, dict] = {}
+        self.epoch_blocks: Dict[int, List[str]] = defaultdict(list)
+        self.txs: Dict[str, dict] = {}
+        self.tx_time: Dict[str, datetime] = {}
+        self.tx_block: Dict[str, str] = {}
+        self.tx_inputs: Dict[str, List[UTXOKey]] = defaultdict(list)
+        self.tx_outputs: Dict[str, List[UTXOKey]] = defaultdict(list)
+        self.utxos: Dict[UTXOKey, dict] = {}
+        self.utxo_owner: Dict[UTXOKey, str] = {}
+        self.utxo_spent_by: Dict[UTXOKey, str] = {}
+        self.utxo_assets: Dict[UTXOKey, List[Tuple[str, int]]] = defaultdict(list)
+        self.addresses: Dict[str, dict] = {}
+        self.address_utxos: Dict[str, List[UTXOKey]] = defaultdict(list)
+        # (timestamp, tx hash, net value) per address, oldest first
+        self.participations: Dict[str, List[Tuple[datetime, str, float]]] = defaultdict(list)
+        self.address_stake: Dict[str, str] = {}
+        self.stakes: Dict[str, dict] = {}
+        self.stake_members: Dict[str, List[str]] = defaultdict(list)
+        self.assets: Dict[str, dict] = {}
+        self.asset_txs: Dict[str, List[str]] = defaultdict(list)
+        self.holdings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.entities: Dict[str, dict] = {}
+        self.entity_members: Dict[str, List[str]] = defaultdict(list)
+        self.scores: Dict[str, List[dict]] = {}
+        self.analytics_run: Optional[dict] = None
+        self._sorted_cache: Dict[Tuple, List] = {}
+
+        self._load_blocks(chain)
+        self._load_transactions(chain)
+        self._load_assets(chain)
+        self._aggregate()
+        self._analytics()
+
+    def _load_blocks(self, chain: SyntheticChain):
+        block_hashes = {}
+        for row in chain.block:
+            block_hash = row["hash"].hex()
+            block_hashes[row["id"]] = block_hash
+            self.blocks[block_hash] = {
+                **{key: value for key, value in row.items() if key not in ("id", "hash", "time")},
+                "hash": block_hash, "block_id": row["id"], "time": row["time"].isoformat()
+            }
+            self.block_hashes.append(block_hash)
+            self.epoch_blocks[row["epoch_no"]].append(block_hash)
+        self._block_hash_by_id = block_hashes
+        for row in chain.epoch:
+            self.epochs[row["no"]] = {
+                "no": row["no"],
+                "out_sum": row["out_sum"] / LOVELACE_PER_ADA,
+                "fees": row["fees"] / LOVELACE_PER_ADA,
+                "start_time": _neo4j_datetime(row["start_time"]),
+                "end_time": _neo4j_datetime(row["end_time"])
+            }
+
+    def _load_transactions(self, chain: SyntheticChain):
+        tx_hashes = {}
+        for row in chain.tx:
+            tx_hash = row["hash"].hex()
+            tx_hashes[row["id"]] = tx_hash
+            block_hash = self._block_hash_by_id[row["block_id"]]
+            timestamp = _utc(chain.block[row["block_id"] - 1]["time"])
+            self.txs[tx_hash] = {"tx_hash": tx_hash, "timestamp": _neo4j_datetime(timestamp),
+                                 "fee": row["fee"] / LOVELACE_PER_ADA}
+            self.tx_time[tx_hash] = timestamp
+            self.tx_block[tx_hash] = block_hash
+            self.block_txs[block_hash].append(tx_hash)
+
+        stake_views = {row["id"]: row["view"] for row in chain.stake_address}
+        self._utxo_by_tx_out_id = {}
+        for row in chain.tx_out:
+            tx_hash = tx_hashes[row["tx_id"]]
+            key = (tx_hash, row["index"])
+            self._utxo_by_tx_out_id[row["id"]] = key
+            self.utxos[key] = {"utxo_hash": tx_hash, "index": row["index"], "value": row["value"] / LOVELACE_PER_ADA,
+                               "asset_policy": None, "asset_name": None, "asset_quantity": None,
+                               "timestamp": self.txs[tx_hash]["timestamp"]}
+            self.utxo_owner[key] = row["address"]
+            self.tx_outputs[tx_hash].append(key)
+            self.address_utxos[row["address"]].append(key)
+            if row["stake_address_id"]:
+                self.address_stake[row["address"]] = stake_views[row["stake_address_id"]]
+        for row in chain.tx_in:
+            key = (tx_hashes[row["tx_out_id"]], row["tx_out_index"])
+            spender = tx_hashes[row["tx_in_id"]]
+            self.tx_inputs[spender].append(key)
+            self.utxo_spent_by[key] = spender
+
+    def _load_assets(self, chain: SyntheticChain):
+        fingerprints = {}
+        for row in chain.multi_asset:
+            name = row["name"].hex()
+            fingerprints[row["id"]] = row["fingerprint"]
+            self.assets[row["fingerprint"]] = {"fingerprint": row["fingerprint"], "policy": row["policy"].hex(),
+                                               "name": name, "display_name": row["name"].decode()}
+        for row in chain.ma_tx_out:
+            key = self._utxo_by_tx_out_id[row["tx_out_id"]]
+            fingerprint = fingerprints[row["ident"]]
+            self.utxo_assets[key].append((fingerprint, row["quantity"]))
+            if not self.asset_txs[fingerprint] or self.asset_txs[fingerprint][-1] != key[0]:
+                self.asset_txs[fingerprint].append(key[0])
+            if key not in self.utxo_spent_by:
+                owner = self.holdings[self.utxo_owner[key]]
+                owner[fingerprint] = owner.get(fingerprint, 0) + row["quantity"]
+
+    def _aggregate(self):
+        """The counters update_address_aggregates, update_stake_aggregates and the clustering maintain."""
+        for tx_hash in self.txs:
+            deltas: Dict[str, List[float]] = {}
+            for key in self.tx_outputs[tx_hash]:
+                delta = deltas.setdefault(self.utxo_owner[key], [0.0, 0])
+                delta[0] += self.utxos[key]["value"]
+                delta[1] += 1
+            for key in self.tx_inputs[tx_hash]:
+                delta = deltas.setdefault(self.utxo_owner[key], [0.0, 0])
+                delta[0] -= self.utxos[key]["value"]
+                delta[1] -= 1
+            timestamp = self.tx_time[tx_hash]
+            for address, (value, utxos) in deltas.items():
+                self.participations[address].append((timestamp, tx_hash, value))
+                node = self.addresses.setdefault(address, {
+                    "address": address, "balance": 0.0, "utxo_count": 0, "transaction_count": 0,
+                    "highest_balance": None, "lowest_balance": None, "first_activity": None, "last_activity": None
+                })
+                node["balance"] += value
+                node["utxo_count"] += utxos
+                node["transaction_count"] += 1
+                if node["highest_balance"] is None or node["balance"] > node["highest_balance"]:
+                    node["highest_balance"] = node["balance"]
+                if node["lowest_balance"] is None or node["balance"] < node["lowest_balance"]:
+                    node["lowest_balance"] = node["balance"]
+                node["first_activity"] = node["first_activity"] or _neo4j_datetime(timestamp)
+                node["last_activity"] = _neo4j_datetime(timestamp)
+
+        for history in self.participations.values():
+            history.sort(key=lambda entry: entry[:2])
+
+        # Stake keys double as entities: the synthetic chain has one sender per transaction, so the common-input
+        # heuristic would only find singletons
+        for address, stake in sorted(self.address_stake.items()):
+            self.stake_members[stake].append(address)
+            entity_id = "entity_" + stake[-20:]
+            self.addresses[address]["entity_id"] = entity_id
+            self.entity_members[entity_id].append(address)
+        for stake, members in self.stake_members.items():
+            nodes = [self.addresses[address] for address in members]
+            self.stakes[stake] = {
+                "address": stake,
+                "balance": sum(node["balance"] for node in nodes),
+                "utxo_count": sum(node["utxo_count"] for node in nodes),
+                "address_count": len(members),
+                "last_activity": max(node["last_activity"] for node in nodes)
+            }
+            entity_id = "entity_" + stake[-20:]
+            self.entities[entity_id] = {
+                "entity_id": entity_id,
+                "address_count": len(members),
+                "balance": self.stakes[stake]["balance"],
+                "transaction_count": sum(node["transaction_count"] for node in nodes),
+                "first_seen": min(node["first_activity"] for node in nodes),
+                "last_seen": self.stakes[stake]["last_activity"],
+                "updated_at": _neo4j_datetime(self.now)
+            }
+
+    def _analytics(self):
+        """Scores app/compute_graph_analytics.py would have written, computed with the same code."""
+        builder = TransferGraphBuilder()
+        for tx_hash, inputs in self.tx_inputs.items():
+            senders = {self.utxo_owner[key] for key in inputs}
+            for key in self.tx_outputs[tx_hash]:
+                receiver = self.utxo_owner[key]
+                for sender in senders:
+                    if sender != receiver:
+                        builder.add(sender, receiver, self.utxos[key]["value"])
+        graph = builder.build()
+        scores = compute_address_scores(graph)
+        for score in scores:
+            self.addresses[score["address"]].update(score)
+        for metric in ("pagerank", "in_degree", "out_degree", "component_size"):
+            self.scores[metric] = sorted(scores, key=lambda score: -score[metric])
+        self.analytics_run = {
+            "start_time": _neo4j_datetime(_utc(min(self.tx_time.values()))),
+            "end_time": _neo4j_datetime(self.now),
+            "computed_at": _neo4j_datetime(self.now),
+            "address_count": graph.num_nodes,
+            "transfer_count": graph.num_edges
+        }
+
+    def sorted_once(self, key: Tuple, compute: Callable[[], List]) -> List:
+        """Orderings the database would keep an index for are computed on first use only."""
+        if key not in self._sorted_cache:
+            self._sorted_cache[key] = compute()
+        return self._sorted_cache[key]
+
+    def address_node(self, address: str) -> dict:
+        return {"address": address}
+
+    def stake_node(self, address: str) -> Optional[dict]:
+        stake = self.address_stake.get(address)
+        return {"address": stake} if stake else None
+
+
+Handler = Callable[[StandInGraph, str, Dict[str, Any]], List[Dict[str, Any]]]
+HANDLERS: Dict[str, Handler] = {}
+
+
+def _match(pattern: str, query: str) -> re.Match:
+    """The part of a statement a handler dispatches on; a statement without it is one the handler does not know."""
+    match = re.search(pattern, query)
+    if match is None:
+        raise UnhandledQuery(f"Statement does not match {pattern!r}:\n{query}")
+    return match
+
+
+def handles(*functions: str):
+    """Register a handler for the queries issued by the given functions."""
+    def register(handler: Handler) -> Handler:
+        for function in functions:
+            HANDLERS[function] = handler
+        return handler
+    return register
+
+
+# Blocks and epochs
+
+@handles("app.db.graph.block.get_blocks")
+def _blocks(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    if "total_count" in query:
+        return [{"total_count": len(graph.blocks)}]
+    _match(r"ORDER BY b\.block_no DESC", query)
+    hashes = graph.block_hashes[::-1][params["skip"]:params["skip"] + params["limit"]]
+    return [{"block": graph.blocks[block_hash]} for block_hash in hashes]
+
+
+@handles("app.db.graph.block.get_blocks_details")
+def _blocks_details(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    records = []
+    for block_hash in params["block_hashes"]:
+        block = graph.blocks.get(block_hash)
+        if block:
+            records.append({"block_hash": block_hash, "b": block,
+                            "transactions": [graph.txs[tx] for tx in graph.block_txs[block_hash]],
+                            "e": graph.epochs.get(block["epoch_no"])})
+    return records
+
+
+@handles("app.db.graph.block.get_graph_by_block_hash")
+def _block_graph(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    block = graph.blocks.get(params["block_hash"])
+    if not block:
+        return []
+    paths, path = [], [block]
+    for _ in range(params["depth"]):
+        if not path[-1]["previous_id"]:
+            break
+        path = path + [graph.blocks[graph.block_hashes[path[-1]["previous_id"] - 1]]]
+        paths.append(path)
+    return [{"b": block, "transactions": [graph.txs[tx] for tx in graph.block_txs[block["hash"]]],
+             "e": graph.epochs[block["epoch_no"]], "prev_blocks": paths}]
+
+
+@handles("app.db.graph.epoch.get_epoch_details")
+def _epoch_details(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    epoch = graph.epochs.get(params["epoch_no"])
+    if not epoch:
+        return []
+    blocks = [graph.blocks[block_hash] for block_hash in graph.epoch_blocks[epoch["no"]]]
+    return [{"e": epoch, "block_count": len(blocks), "tx_count": sum(block["tx_count"] for block in blocks),
+             "total_size": sum(block["size"] for block in blocks)}]
+
+
+@handles("app.db.graph.epoch.get_epochs")
+def _epochs(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    if "total_count" in query:
+        return [{"total_count": len(graph.epochs)}]
+    _match(r"ORDER BY e\.no DESC", query)
+    numbers = sorted(graph.epochs, reverse=True)[params["skip"]:params["skip"] + params["limit"]]
+    return [{"epoch": {"no": no, "out_sum": graph.epochs[no]["out_sum"], "fees": graph.epochs[no]["fees"],
+                       "start_time": str(graph.epochs[no]["start_time"]),
+                       "end_time": str(graph.epochs[no]["end_time"]),
+                       "block_count": len(graph.epoch_blocks[no])}} for no in numbers]
+
+
+# Transactions
+
+def _utxo_side(graph: StandInGraph, keys: List[UTXOKey]) -> List[Dict]:
+    return [{"utxo": graph.utxos[key], "address": graph.address_node(graph.utxo_owner[key]),
+             "stake": graph.stake_node(graph.utxo_owner[key])} for key in keys]
+
+
+@handles("app.db.graph.transaction.get_transactions_details")
+def _transactions_details(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    records = []
+    for tx_hash in params["transaction_hashes"]:
+        if tx_hash in graph.txs and graph.tx_inputs[tx_hash] and graph.tx_outputs[tx_hash]:
+            records.append({"transaction_hash": tx_hash, "t": graph.txs[tx_hash],
+                            "inputs": _utxo_side(graph, graph.tx_inputs[tx_hash]),
+                            "outputs": _utxo_side(graph, graph.tx_outputs[tx_hash]),
+                            "b": graph.blocks[graph.tx_block[tx_hash]]})
+    return records
+
+
+@handles("app.db.graph.transaction.get_transaction_utxos")
+def _transaction_utxos(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    tx_hash = params["transaction_hash"]
+    if tx_hash not in graph.txs:
+        return []
+    return [{"inputs": [graph.utxos[key] for key in graph.tx_inputs[tx_hash]],
+             "outputs": [graph.utxos[key] for key in graph.tx_outputs[tx_hash]]}]
+
+
+@handles("app.routers.transaction.get_transaction_signatories")
+def _signatories(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    return [{"signatories": []}] if params["transaction_hash"] in graph.txs else []
+
+
+@handles("app.routers.transaction.get_transactions")
+def _transactions(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    if "total_count" in query:
+        return [{"total_count": len(graph.txs)}]
+    # The sort column and order are part of the statement
+    sort_by, sort_order = _match(r"ORDER BY (t\.fee|t\.timestamp|total_output) (ASC|DESC)", query).groups()
+    prefix, fragment = params["tx_hash_prefix"], params["tx_hash_filter"]
+
+    def total_output(tx_hash: str) -> float:
+        return sum(graph.utxos[key]["value"] for key in graph.tx_outputs[tx_hash])
+
+    def sort_key(tx_hash: str):
+        if sort_by == "t.fee":
+            return graph.txs[tx_hash]["fee"]
+        return graph.tx_time[tx_hash] if sort_by == "t.timestamp" else total_output(tx_hash)
+
+    ordered = graph.sorted_once(("transactions", sort_by, sort_order), lambda: sorted(
+        (tx for tx in graph.txs if graph.tx_inputs[tx] and graph.tx_outputs[tx]),
+        key=sort_key, reverse=sort_order == "DESC"))
+    if prefix:
+        ordered = [tx_hash for tx_hash in ordered if tx_hash.startswith(prefix)]
+    if fragment:
+        ordered = [tx_hash for tx_hash in ordered if fragment in tx_hash]
+    records = []
+    for tx_hash in ordered[params["skip"]:params["skip"] + params["limit"]]:
+        block = graph.blocks[graph.tx_block[tx_hash]]
+        records.append({
+            "tx_hash": tx_hash, "timestamp": graph.txs[tx_hash]["timestamp"], "block_no": block["block_no"],
+            "block_hash": block["hash"], "epoch_no": block["epoch_no"], "slot_no": block["slot_no"],
+            "absolute_slot_no": block["epoch_slot_no"], "fees": graph.txs[tx_hash]["fee"],
+            "total_output": total_output(tx_hash),
+            "input_addresses": list(dict.fromkeys(graph.utxo_owner[key] for key in graph.tx_inputs[tx_hash])),
+            "output_addresses": list(dict.fromkeys(graph.utxo_owner[key] for key in graph.tx_outputs[tx_hash]))
+        })
+    return records
+
+
+# Addresses
+
+def _spendable(graph: StandInGraph, key: UTXOKey) -> bool:
+    return key not in graph.utxo_spent_by
+
+
+@handles("app.routers.address.get_addresses")
+def _addresses(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    if "total" in query and "SKIP" not in query:
+        return [{"total": len(graph.addresses)}]
+    sort_key, sort_order = _match(r"ORDER BY (a\.address|balance|transactionCount) (ASC|DESC)", query).groups()
+    field = {"a.address": "address", "balance": "balance", "transactionCount": "transaction_count"}[sort_key]
+    ordered = graph.sorted_once(("addresses", field, sort_order), lambda: sorted(
+        graph.addresses.values(), key=lambda node: node[field], reverse=sort_order == "DESC"))
+    return [{"address": node["address"], "balance": node["balance"], "transactionCount": node["transaction_count"]}
+            for node in ordered[params["skip"]:params["skip"] + params["limit"]]]
+
+
+@handles("app.routers.address.get_address_analytics")
+def _address_analytics(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    # datetime() is the end of the synthetic chain, so that the windows are not empty
+    window = {"P1D": 1, "P1M": 30, "P1Y": 365}[params["duration"]] * 86400
+    balances: Dict[DateTime, float] = defaultdict(float)
+    for key in graph.address_utxos.get(params["address"], []):
+        utxo = graph.utxos[key]
+        if (graph.now - utxo["timestamp"].to_native()).total_seconds() <= window:
+            balances[utxo["timestamp"]] += utxo["value"]
+    return [{"timestamp": timestamp, "balance": balance} for timestamp, balance in sorted(balances.items())]
+
+
+def _utxo_projection(utxo: dict) -> dict:
+    return {key: utxo[key] for key in ("value", "asset_policy", "asset_name", "asset_quantity")}
+
+
+@handles("app.db.graph.address.iter_graph_by_address")
+def _address_graph(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    address = params["address"]
+    if "UNION" not in query:
+        _match(r"-\[:STAKE\]->\(s:StakeAddress\)", query)
+        stake = graph.address_stake.get(address)
+        return [{"stake_address": stake}] if stake else []
+    if address not in graph.addresses:
+        return []
+    start, end, known = _parse_time(params["start_time"]), _parse_time(params["end_time"]), params["known_ids"]
+    records = []
+    for input_key in graph.address_utxos[address]:
+        tx_hash = graph.utxo_spent_by.get(input_key)
+        if not tx_hash or not _in_window(graph.tx_time[tx_hash], start, end):
+            continue
+        for output_key in graph.tx_outputs[tx_hash]:
+            records.append({
+                "address": address, "tx_hash": tx_hash, "other_address": graph.utxo_owner[output_key],
+                "input_utxo_hash": input_key[0], "input_utxo_index": input_key[1],
+                "input_utxo": None if f"{input_key[0]}_{input_key[1]}" in known
+                else _utxo_projection(graph.utxos[input_key]),
+                "output_utxo_hash": output_key[0], "output_utxo_index": output_key[1],
+                "output_utxo": None if f"{output_key[0]}_{output_key[1]}" in known
+                else _utxo_projection(graph.utxos[output_key]),
+                "tx": None if tx_hash in known else {"timestamp": graph.txs[tx_hash]["timestamp"],
+                                                     "fee": graph.txs[tx_hash]["fee"],
+                                                     "value": graph.utxos[output_key]["value"]}
+            })
+    if not records:
+        records.append({"address": address, "tx_hash": None, "other_address": None, "input_utxo_hash": None,
+                        "input_utxo_index": None, "input_utxo": None, "output_utxo_hash": None,
+                        "output_utxo_index": None, "output_utxo": None, "tx": None})
+    return records
+
+
+def _transfers(graph: StandInGraph, source: str, outgoing: bool, start: Optional[datetime],
+               end: Optional[datetime]) -> List[Tuple[str, str, float]]:
+    """(tx hash, counterparty, value) of one expansion hop, as _EXPANSION_HOPS defines it."""
+    transfers = []
+    if outgoing:
+        spending = {graph.utxo_spent_by[key] for key in graph.address_utxos[source] if key in graph.utxo_spent_by}
+        for tx_hash in spending:
+            if not _in_window(graph.tx_time[tx_hash], start, end):
+                continue
+            values: Dict[str, float] = defaultdict(float)
+            for key in graph.tx_outputs[tx_hash]:
+                if graph.utxo_owner[key] != source:
+                    values[graph.utxo_owner[key]] += graph.utxos[key]["value"]
+            transfers += [(tx_hash, counterparty, value) for counterparty, value in values.items()]
+    else:
+        received: Dict[str, float] = defaultdict(float)
+        for key in graph.address_utxos[source]:
+            if _in_window(graph.tx_time[key[0]], start, end):
+                received[key[0]] += graph.utxos[key]["value"]
+        for tx_hash, value in received.items():
+            senders = {graph.utxo_owner[key] for key in graph.tx_inputs[tx_hash]} - {source}
+            transfers += [(tx_hash, counterparty, value) for counterparty in senders]
+    return transfers
+
+
+@handles("app.db.graph.address.expand_address_graph")
+def _expand(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    hop = _match(r"\(a\)-\[:OWNS\]->\(u?:UTXO\)(-\[:INPUT\]->|<-\[:OUTPUT\]-)\(t:Transaction\)", query)
+    outgoing = hop.group(1) == "-[:INPUT]->"
+    start, end, known = _parse_time(params["start_time"]), _parse_time(params["end_time"]), params["known_ids"]
+    records = []
+    for source in params["frontier"]:
+        if source not in graph.addresses:
+            continue
+        transfers = [transfer for transfer in _transfers(graph, source, outgoing, start, end)
+                     if transfer[2] >= params["min_value"]]
+        if not transfers:
+            continue
+        transfers.sort(key=lambda transfer: -transfer[2])
+        records.append({
+            "address": source,
+            "transfers": [{"tx_hash": tx_hash, "counterparty": counterparty, "value": value,
+                           "tx": None if tx_hash in known else {"timestamp": graph.txs[tx_hash]["timestamp"],
+                                                                "fee": graph.txs[tx_hash]["fee"]}}
+                          for tx_hash, counterparty, value in transfers[:params["max_fanout"]]],
+            "truncated": len(transfers) > params["max_fanout"]
+        })
+    return records
+
+
+@handles("app.db.graph.address.get_address_details")
+def _address_details(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    address = graph.addresses.get(params["address_hash"])
+    if not address:
+        return []
+    stake = graph.stakes.get(graph.address_stake.get(address["address"]))
+    recent = graph.participations[address["address"]][::-1][:params["recent_limit"]]
+    return [{"a": address, "stake_address": stake["address"] if stake else None,
+             "stake_balance": stake["balance"] if stake else None,
+             "recent_transactions": [{"tx_hash": tx_hash, "timestamp": graph.txs[tx_hash]["timestamp"],
+                                      "fee": graph.txs[tx_hash]["fee"], "net_value": net_value}
+                                     for _, tx_hash, net_value in recent]}]
+
+
+@handles("app.db.graph.address.get_address_transactions")
+def _address_transactions(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    history = graph.participations.get(params["address_hash"], [])
+    descending = _match(r"ORDER BY p\.timestamp (ASC|DESC)", query).group(1) == "DESC"
+    if "after_timestamp" in params:
+        after = (_parse_time(params["after_timestamp"]), params["after_tx_hash"])
+        position = bisect.bisect_left(history, after, key=lambda entry: entry[:2]) if descending \
+            else bisect.bisect_right(history, after, key=lambda entry: entry[:2])
+        page = history[:position][::-1] if descending else history[position:]
+    else:
+        page = history[::-1] if descending else history
+    records = []
+    for _, tx_hash, net_value in page[:params["limit"]]:
+        records.append({
+            "tx_hash": tx_hash, "timestamp": graph.txs[tx_hash]["timestamp"], "fee": graph.txs[tx_hash]["fee"],
+            "net_value": net_value,
+            "inputs": [{"address": graph.utxo_owner[key], "value": graph.utxos[key]["value"]}
+                       for key in graph.tx_inputs[tx_hash]],
+            "outputs": [{"address": graph.utxo_owner[key], "value": graph.utxos[key]["value"]}
+                        for key in graph.tx_outputs[tx_hash]]
+        })
+    return records
+
+
+@handles("app.db.graph.address.get_address_utxos")
+def _address_utxos(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    keys = [key for key in graph.address_utxos.get(params["address_hash"], [])
+            if not params["unspent_only"] or _spendable(graph, key)][::-1]
+    return [{"u": graph.utxos[key], "spent_by": graph.utxo_spent_by.get(key)}
+            for key in keys[params["skip"]:params["skip"] + params["limit"]]]
+
+
+@handles("app.db.graph.address.get_address_summaries")
+def _address_summaries(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    records = []
+    for address in params["addresses"]:
+        node = graph.addresses.get(address)
+        if node:
+            keys = graph.address_utxos[address]
+            records.append({
+                "address": address, "stake_address": graph.address_stake.get(address),
+                "entity_id": node.get("entity_id"),
+                "balance": sum(graph.utxos[key]["value"] for key in keys if _spendable(graph, key)),
+                "transaction_count": len({graph.utxo_spent_by[key] for key in keys if key in graph.utxo_spent_by})
+            })
+    return records
+
+
+# Assets, stake keys, entities, analytics and search
+
+@handles("app.db.graph.asset.get_address_holdings")
+def _holdings(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    _match(r"ORDER BY h\.quantity DESC, h\.fingerprint DESC", query)
+    text = params["display_name"]
+    holdings = [(quantity, fingerprint) for fingerprint, quantity in graph.holdings.get(params["address"], {}).items()
+                if text is None or text in graph.assets[fingerprint]["display_name"] or fingerprint.startswith(text)]
+    if "after_quantity" in params:
+        after = (params["after_quantity"], params["after_fingerprint"])
+        holdings = [holding for holding in holdings if holding < after]
+    holdings.sort(reverse=True)
+    return [{**{key: graph.assets[fingerprint][key] for key in ("policy", "name", "display_name", "fingerprint")},
+             "quantity": quantity} for quantity, fingerprint in holdings[:params["limit"]]]
+
+
+@handles("app.db.graph.asset.get_graph_by_asset")
+def _asset_graph(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    if "$addresses" in query:
+        _match(r"-\[:STAKE\]->\(s:StakeAddress\)", query)
+        return [{"address": address, "stake_address": graph.address_stake[address]}
+                for address in params["addresses"] if address in graph.address_stake]
+    _match(r"ORDER BY t\.timestamp DESC", query)
+    asset = graph.assets.get(params["asset_id"])
+    if not asset:
+        return []
+    start, end = _parse_time(params["start_time"]), _parse_time(params["end_time"])
+    txs = [tx_hash for tx_hash in graph.asset_txs[asset["fingerprint"]] if _in_window(graph.tx_time[tx_hash], start, end)]
+    records = []
+    for tx_hash in txs[::-1][:params["limit"]]:
+        received: Dict[str, List[float]] = {}
+        for key in graph.tx_outputs[tx_hash]:
+            for fingerprint, quantity in graph.utxo_assets.get(key, []):
+                if fingerprint == asset["fingerprint"]:
+                    totals = received.setdefault(graph.utxo_owner[key], [0.0, 0])
+                    totals[0] += graph.utxos[key]["value"]
+                    totals[1] += quantity
+        senders = sorted({graph.utxo_owner[key] for key in graph.tx_inputs[tx_hash]})
+        for receiver, (value, quantity) in received.items():
+            records.append({"from": senders, "to": receiver, "tx_hash": tx_hash, "value": value,
+                            "timestamp": graph.txs[tx_hash]["timestamp"], "fee": graph.txs[tx_hash]["fee"],
+                            "asset_policy": asset["policy"], "asset_name": asset["name"],
+                            "asset_quantity": quantity})
+    return records
+
+
+@handles("app.db.graph.asset.get_asset_details")
+def _asset_details(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    asset = graph.assets.get(params["asset_id"])
+    if not asset or not graph.asset_txs[asset["fingerprint"]]:
+        return []
+    return [{"a": asset, "transactions": [graph.txs[tx_hash] for tx_hash in graph.asset_txs[asset["fingerprint"]]]}]
+
+
+@handles("app.db.graph.stake.get_stake_details")
+def _stake_details(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    stake = graph.stakes.get(params["stake_address"])
+    if not stake:
+        return []
+    members = graph.stake_members[stake["address"]]
+    return [{"s": stake, "addresses": members[params["skip"]:params["skip"] + params["limit"]]}]
+
+
+@handles("app.db.graph.entity.get_entity")
+def _entity(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    entity = graph.entities.get(params["entity_id"])
+    if not entity:
+        return []
+    return [{"e": entity, "addresses": graph.entity_members[entity["entity_id"]][:params["address_limit"]]}]
+
+
+@handles("app.db.graph.analytics.get_top_addresses")
+def _top_addresses(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    metric = _match(r"ORDER BY a\.(\w+) DESC", query).group(1)
+    if metric not in graph.scores:
+        raise UnhandledQuery(f"No scores for the metric {metric}")
+    return [dict(score) for score in graph.scores[metric][:params["limit"]]]
+
+
+@handles("app.db.graph.analytics.get_analytics_run")
+def _analytics_run(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    return [{"r": graph.analytics_run}]
+
+
+def _prefix_matches(keys: List[str], prefix: str, limit: int) -> List[str]:
+    start = bisect.bisect_left(keys, prefix)
+    matches = []
+    for key in keys[start:start + limit]:
+        if not key.startswith(prefix):
+            break
+        matches.append(key)
+    return matches
+
+
+@handles("app.db.graph.search._run_lookup")
+def _search(graph: StandInGraph, query: str, params: Dict) -> List[Dict]:
+    limit = params.get("limit", 10)
+    if "db.index.fulltext" in query:
+        terms = [term.rstrip("*").lower() for term in params["text"].split()]
+        return [{"id": fingerprint, "label": asset["display_name"], "exact": False, "score": 1.0}
+                for fingerprint, asset in graph.assets.items()
+                if any(asset["display_name"].lower().startswith(term) for term in terms)][:limit]
+    if "Epoch" in query:
+        return [{"id": str(params["number"]), "label": f"Epoch {params['number']}", "exact": True}] \
+            if params["number"] in graph.epochs else []
+    if "block_no: $number" in query:
+        if params["number"] >= len(graph.block_hashes):
+            return []
+        block_hash = graph.block_hashes[params["number"]]
+        return [{"id": block_hash, "label": f"Block {params['number']}", "exact": True}]
+
+    prefix = params["q"]
+    if "(t:Transaction)" in query:
+        keys, label = graph.sorted_once(("search", "tx"), lambda: sorted(graph.txs)), lambda key: key
+    elif "(b:Block)" in query:
+        keys = graph.sorted_once(("search", "block"), lambda: sorted(graph.blocks))
+        label = lambda key: f"Block {graph.blocks[key]['block_no']}"
+    elif "(s:StakeAddress)" in query:
+        keys, label = graph.sorted_once(("search", "stake"), lambda: sorted(graph.stakes)), lambda key: key
+    elif "(a:Asset)" in query:
+        keys = graph.sorted_once(("search", "asset"), lambda: sorted(graph.assets))
+        label = lambda key: graph.assets[key]["display_name"]
+    else:
+        _match(r"\(a:Address\)", query)
+        keys, label = graph.sorted_once(("search", "address"), lambda: sorted(graph.addresses)), lambda key: key
+    return [{"id": key, "label": label(key), "exact": key == prefix} for key in _prefix_matches(keys, prefix, limit)]
+
+
+class StandInRecord(dict):
+    def data(self) -> Dict[str, Any]:
+        return dict(self)
+
+    def values(self) -> List[Any]:
+        return list(super().values())
+
+
+class StandInResult:
+    def __init__(self, records: List[Dict[str, Any]]):
+        self._records = [StandInRecord(record) for record in records]
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def single(self) -> Optional[StandInRecord]:
+        return self._records[0] if self._records else None
+
+    def data(self) -> List[Dict[str, Any]]:
+        return [record.data() for record in self._records]
+
+    def values(self) -> List[List[Any]]:
+        return [record.values() for record in self._records]
+
+    def consume(self):
+        return None
+
+
+class StandInSession:
+    def __init__(self, driver: "StandInDriver"):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        pass
+
+    def execute_read(self, transaction_function, *args, **kwargs):
+        # The session runs the statements of the unit of work itself; there is nothing to retry
+        return transaction_function(self, *args, **kwargs)
+
+    execute_write = execute_read
+
+    def run(self, query, parameters: Optional[Dict[str, Any]] = None, **kwargs) -> StandInResult:
+        caller = query_caller(__name__)
+        function = f"{caller.f_globals.get('__name__')}.{caller.f_code.co_name}"
+        text = getattr(query, "text", query)
+        handler = HANDLERS.get(function)
+        if handler is None:
+            raise UnhandledQuery(f"No stand-in handler for the statements of {function}:\n{text}")
+        records = handler(self.driver.graph, text, {**(parameters or {}), **kwargs})
+        self.driver.record_query(function, len(records))
+        return StandInResult(records)
+
+
+class StandInDriver:
+    """Drop-in for neo4j.Driver as far as the read path of the API is concerned."""
+
+    def __init__(self, graph: StandInGraph, query_latency_ms: float = 1.0, row_latency_us: float = 2.0):
+        self.graph = graph
+        self.query_latency = query_latency_ms / 1000
+        self.row_latency = row_latency_us / 1_000_000
+        self.queries: Dict[str, int] = defaultdict(int)
+
+    def session(self, **kwargs) -> StandInSession:
+        return StandInSession(self)
+
+    def record_query(self, function: str, rows: int):
+        self.queries[function] += 1
+        delay = self.query_latency + rows * self.row_latency
+        if delay > 0:
+            time.sleep(delay)
+
+    def verify_connectivity(self):
+        pass
+
+    def close(self):
+        pass
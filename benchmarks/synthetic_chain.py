@@ -0,0 +1,249 @@
+"""
+Synthetic chain in db-sync's relational shape, for benchmarks that must run without a node or db-sync.
+
+Address reuse is heavy-tailed: senders and receivers are drawn from a Zipf distribution over all addresses, and a
+configurable share of transactions is sent by one of a few hub addresses (exchanges, popular dApps). That is what
+makes address histories and graphs expensive in production, so uniform data would flatter every query.
+"""
+import datetime
+import hashlib
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Tuple
+
+import numpy as np
+
+CHAIN_START = datetime.datetime(2024, 1, 1)
+SLOT_SECONDS = 20
+LOVELACE_PER_ADA = 1_000_000
+MAX_OUTPUT_ASSETS = 4
+
+
+@dataclass
+class ChainConfig:
+    blocks: int = 1000
+    txs_per_block: int = 20
+    addresses: int = 20000
+    hubs: int = 10
+    hub_share: float = 0.2
+    zipf_exponent: float = 1.2
+    assets: int = 200
+    # Share of payments that also move native tokens
+    asset_share: float = 0.1
+    blocks_per_epoch: int = 200
+    seed: int = 0
+
+
+@dataclass
+class SyntheticChain:
+    """
+    One list of rows per db-sync table, keyed by the column names of app.db.models.base. Hashes are bytes and
+    amounts lovelace, as db-sync stores them.
+    """
+    config: ChainConfig
+    epoch: List[dict] = field(default_factory=list)
+    block: List[dict] = field(default_factory=list)
+    tx: List[dict] = field(default_factory=list)
+    tx_in: List[dict] = field(default_factory=list)
+    tx_out: List[dict] = field(default_factory=list)
+    stake_address: List[dict] = field(default_factory=list)
+    multi_asset: List[dict] = field(default_factory=list)
+    ma_tx_out: List[dict] = field(default_factory=list)
+    hubs: List[str] = field(default_factory=list)
+
+    @property
+    def start_time(self) -> datetime.datetime:
+        return CHAIN_START
+
+    @property
+    def end_time(self) -> datetime.datetime:
+        return CHAIN_START + datetime.timedelta(seconds=len(self.block) * SLOT_SECONDS)
+
+    def row_count(self) -> int:
+        return sum(len(rows) for rows in (self.epoch, self.block, self.tx, self.tx_in, self.tx_out,
+                                          self.stake_address, self.multi_asset, self.ma_tx_out))
+
+
+def _digest(*parts, size: int = 32) -> bytes:
+    return hashlib.blake2b("/".join(map(str, parts)).encode(), digest_size=size).digest()
+
+
+def address(i: int) -> str:
+    return "addr1q" + _digest("address", i, size=26).hex()
+
+
+def stake_address(i: int) -> str:
+    return "stake1u" + _digest("stake", i, size=25).hex()
+
+
+class _AddressSampler:
+    def __init__(self, config: ChainConfig, rng: np.random.Generator):
+        self.config = config
+        self.rng = rng
+        # Zipf ranks go through a permutation so that popular addresses are spread over the id space
+        self.permutation = rng.permutation(config.addresses)
+        self.hubs = self.permutation[:config.hubs]
+
+    def sender(self) -> int:
+        if len(self.hubs) and self.rng.random() < self.config.hub_share:
+            return int(self.rng.choice(self.hubs))
+        return self.receiver()
+
+    def receiver(self) -> int:
+        rank = min(int(self.rng.zipf(self.config.zipf_exponent)) - 1, self.config.addresses - 1)
+        return int(self.permutation[rank])
+
+
+class _ChainBuilder:
+    def __init__(self, config: ChainConfig):
+        self.config = config
+        self.rng = np.random.default_rng(config.seed)
+        self.sampler = _AddressSampler(config, self.rng)
+        self.chain = SyntheticChain(config=config, hubs=[address(int(i)) for i in self.sampler.hubs])
+        # Unspent outputs per address: (creating tx id, index, value, tx_out id)
+        self.unspent: Dict[int, Deque[Tuple[int, int, int, int]]] = defaultdict(deque)
+        # Tokens held by each unspent output, forwarded when it is spent
+        self.output_assets: Dict[int, List[Tuple[int, int]]] = {}
+        self.stake_ids: Dict[int, int] = {}
+        self.faucet_tx_id = 0
+        self.faucet_outputs = 0
+
+    def build(self) -> SyntheticChain:
+        self._stake_addresses()
+        self._multi_assets()
+        epochs: Dict[int, Dict[str, int]] = defaultdict(lambda: {"out_sum": 0, "fees": 0, "tx_count": 0,
+                                                                  "blk_count": 0})
+        for block_no in range(self.config.blocks):
+            block = self._block(block_no)
+            totals = epochs[block["epoch_no"]]
+            totals["blk_count"] += 1
+            if block_no == 0:
+                # Genesis-like transaction that funds every address spending before it has received anything
+                self.faucet_tx_id = self._tx(block, 0, fee=0, size=200)["id"]
+            for block_index in range(block["tx_count"], self.config.txs_per_block):
+                tx = self._transfer(block, block_index)
+                totals["out_sum"] += tx["out_sum"]
+                totals["fees"] += tx["fee"]
+                totals["tx_count"] += 1
+
+        epoch_seconds = self.config.blocks_per_epoch * SLOT_SECONDS
+        for epoch_no, totals in sorted(epochs.items()):
+            start = CHAIN_START + datetime.timedelta(seconds=epoch_no * epoch_seconds)
+            self.chain.epoch.append({"id": epoch_no + 1, "no": epoch_no, **totals, "start_time": start,
+                                     "end_time": start + datetime.timedelta(seconds=epoch_seconds)})
+        return self.chain
+
+    def _stake_addresses(self):
+        # Two out of three addresses are delegated, and neighbouring addresses share a stake key
+        for i in range(self.config.addresses):
+            if i % 3 != 2:
+                self.stake_ids[i] = i // 3 + 1
+        for stake_id in sorted(set(self.stake_ids.values())):
+            self.chain.stake_address.append({"id": stake_id, "hash_raw": _digest("stake_raw", stake_id, size=29),
+                                             "view": stake_address(stake_id), "script_hash": None})
+
+    def _multi_assets(self):
+        for i in range(self.config.assets):
+            self.chain.multi_asset.append({"id": i + 1, "policy": _digest("policy", i % 20, size=28),
+                                           "name": f"Token{i}".encode(),
+                                           "fingerprint": "asset1" + _digest("fingerprint", i, size=19).hex()})
+
+    def _block(self, block_no: int) -> dict:
+        blocks_per_epoch = self.config.blocks_per_epoch
+        self.chain.block.append({
+            "id": block_no + 1,
+            "hash": _digest("block", block_no),
+            "epoch_no": block_no // blocks_per_epoch,
+            "slot_no": block_no * SLOT_SECONDS,
+            "epoch_slot_no": block_no % blocks_per_epoch * SLOT_SECONDS,
+            "block_no": block_no,
+            "previous_id": block_no or None,
+            "slot_leader_id": int(self.rng.integers(1, 400)),
+            "size": 0,
+            "time": CHAIN_START + datetime.timedelta(seconds=block_no * SLOT_SECONDS),
+            "tx_count": 0,
+            "proto_major": 8,
+            "proto_minor": 0,
+            "vrf_key": None,
+            "op_cert": None,
+            "op_cert_counter": None
+        })
+        return self.chain.block[-1]
+
+    def _tx(self, block: dict, block_index: int, fee: int, size: int) -> dict:
+        tx_id = len(self.chain.tx) + 1
+        self.chain.tx.append({
+            "id": tx_id, "hash": _digest("tx", tx_id), "block_id": block["id"], "block_index": block_index,
+            "out_sum": 0, "fee": fee, "deposit": 0, "size": size, "invalid_before": None,
+            "invalid_hereafter": None, "valid_contract": True, "script_size": 0
+        })
+        block["tx_count"] += 1
+        block["size"] += size
+        return self.chain.tx[-1]
+
+    def _output(self, tx_id: int, index: int, owner: int, value: int) -> int:
+        tx_out_id = len(self.chain.tx_out) + 1
+        self.chain.tx_out.append({
+            "id": tx_out_id, "tx_id": tx_id, "index": index, "address": address(owner),
+            "address_has_script": False, "payment_cred": None, "stake_address_id": self.stake_ids.get(owner),
+            "value": value, "data_hash": None, "inline_datum_id": None, "reference_script_id": None
+        })
+        return tx_out_id
+
+    def _assets(self, tx_out_id: int, assets: List[Tuple[int, int]]):
+        for ident, quantity in assets:
+            self.chain.ma_tx_out.append({"id": len(self.chain.ma_tx_out) + 1, "quantity": quantity,
+                                         "tx_out_id": tx_out_id, "ident": ident})
+        if assets:
+            self.output_assets[tx_out_id] = assets
+
+    def _transfer(self, block: dict, block_index: int) -> dict:
+        """
+        The sender spends up to three of its oldest unspent outputs (or a new faucet output when it has none),
+        pays a receiver and takes the change back. Tokens of the spent outputs stay with the change, and some
+        payments carry tokens of their own.
+        """
+        sender, receiver = self.sampler.sender(), self.sampler.receiver()
+        fee = int(self.rng.integers(170_000, 400_000))
+        spent = []
+        while self.unspent[sender] and len(spent) < 3:
+            spent.append(self.unspent[sender].popleft())
+        if not spent:
+            value = int(self.rng.integers(10, 10_000)) * LOVELACE_PER_ADA
+            tx_out_id = self._output(self.faucet_tx_id, self.faucet_outputs, sender, value)
+            spent.append((self.faucet_tx_id, self.faucet_outputs, value, tx_out_id))
+            self.faucet_outputs += 1
+
+        tx = self._tx(block, block_index, fee=fee, size=300 + 150 * len(spent))
+        total_in = sum(value for _, _, value, _ in spent)
+        if total_in <= fee + LOVELACE_PER_ADA:
+            # Dust; the fee is covered by the faucet as if the sender had topped up
+            total_in = fee + 2 * LOVELACE_PER_ADA
+        payment = int((total_in - fee) * self.rng.uniform(0.05, 0.95))
+        change = total_in - fee - payment
+
+        carried: Dict[int, int] = defaultdict(int)
+        for creating_tx_id, index, _, tx_out_id in spent:
+            self.chain.tx_in.append({"id": len(self.chain.tx_in) + 1, "tx_in_id": tx["id"],
+                                     "tx_out_id": creating_tx_id, "tx_out_index": index, "transaction_id": tx["id"]})
+            for ident, quantity in self.output_assets.pop(tx_out_id, []):
+                carried[ident] += quantity
+
+        # Outputs keep at most MAX_OUTPUT_ASSETS distinct tokens; the rest count as burned
+        kept = sorted(carried.items(), key=lambda item: -item[1])[:MAX_OUTPUT_ASSETS]
+        payment_assets = []
+        if self.config.assets and self.rng.random() < self.config.asset_share:
+            ident = min(int(self.rng.zipf(self.config.zipf_exponent)), self.config.assets)
+            payment_assets.append((ident, int(self.rng.integers(1, 1_000_000))))
+
+        for index, (owner, value, assets) in enumerate(((receiver, payment, payment_assets),
+                                                         (sender, change, kept))):
+            tx_out_id = self._output(tx["id"], index, owner, value)
+            self._assets(tx_out_id, assets)
+            self.unspent[owner].append((tx["id"], index, value, tx_out_id))
+        tx["out_sum"] = payment + change
+        return tx
+
+
+def generate_chain(config: ChainConfig) -> SyntheticChain:
+    return _ChainBuilder(config).build()
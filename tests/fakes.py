@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Responder = Callable[[str, Dict[str, Any]], List[Dict[str, Any]]]
+
+
+class FakeResult:
+    def __init__(self, records: List[Dict[str, Any]]):
+        self._records = records
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def single(self, strict: bool = False) -> Optional[Dict[str, Any]]:
+        return self._records[0] if self._records else None
+
+    def data(self) -> List[Dict[str, Any]]:
+        return list(self._records)
+
+    def consume(self):
+        return SimpleNamespace(counters=SimpleNamespace(nodes_created=0, nodes_deleted=0, relationships_created=0),
+                               result_available_after=0, result_consumed_after=0, profile=None, plan=None)
+
+
+class FakeTransaction:
+    """Explicit or managed transaction; `kind` tells them apart in FakeDriver.statements."""
+
+    def __init__(self, driver: "FakeDriver", kind: str):
+        self._driver = driver
+        self._kind = kind
+
+    def run(self, query: str, parameters: Optional[Dict[str, Any]] = None, **kwargs) -> FakeResult:
+        return self._driver._run(self._kind, query, parameters or {})
+
+    def commit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class FakeSession:
+    def __init__(self, driver: "FakeDriver", config: Dict[str, Any]):
+        self._driver = driver
+        self.config = config
+
+    def run(self, query: str, parameters: Optional[Dict[str, Any]] = None, **kwargs) -> FakeResult:
+        return self._driver._run("auto", query, parameters or {})
+
+    def begin_transaction(self, *args, **kwargs) -> FakeTransaction:
+        return FakeTransaction(self._driver, "explicit")
+
+    def execute_read(self, transaction_function, *args, **kwargs):
+        return transaction_function(FakeTransaction(self._driver, "read"), *args, **kwargs)
+
+    def execute_write(self, transaction_function, *args, **kwargs):
+        return transaction_function(FakeTransaction(self._driver, "write"), *args, **kwargs)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class FakeDriver:
+    """
+    Records every statement as (kind, query, parameters), where kind is "auto", "explicit", "read" or "write".
+    Records are answered by `responder`, none by default.
+    """
+
+    def __init__(self, responder: Optional[Responder] = None):
+        self.responder = responder or (lambda query, parameters: [])
+        self.statements: List[Tuple[str, str, Dict[str, Any]]] = []
+        self.sessions: List[FakeSession] = []
+
+    def session(self, **config) -> FakeSession:
+        session = FakeSession(self, config)
+        self.sessions.append(session)
+        return session
+
+    def _run(self, kind: str, query: str, parameters: Dict[str, Any]) -> FakeResult:
+        self.statements.append((kind, query, parameters))
+        return FakeResult(self.responder(query, parameters))
+
+    def matching(self, fragment: str) -> List[Tuple[str, str, Dict[str, Any]]]:
+        return [statement for statement in self.statements if fragment in statement[1]]
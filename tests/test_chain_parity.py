@@ -0,0 +1,93 @@
+"""
+The routable lookups of app.db.repository answered by both backends from the same synthetic chain: db-sync seeded
+into SQLite, and the graph served by the stand-in driver of the API benchmark. The stand-in computes the records
+the Cypher would return rather than running it, so this checks the shaping of the responses, not the queries.
+"""
+import pytest
+from sqlalchemy.orm import Session
+
+from app.db import db_postgres
+from app.db.graph import block, epoch, transaction
+from app.db.models.base import Block
+from benchmarks.dbsync_seed import create_seed_engine, seed_database
+from benchmarks.standin import StandInDriver, StandInGraph
+from benchmarks.synthetic_chain import ChainConfig, generate_chain
+
+
+@pytest.fixture(scope="module")
+def chain():
+    return generate_chain(ChainConfig(blocks=12, txs_per_block=4, addresses=60, assets=3, blocks_per_epoch=5))
+
+
+@pytest.fixture(scope="module")
+def driver(chain):
+    return StandInDriver(StandInGraph(chain), query_latency_ms=0, row_latency_us=0)
+
+
+@pytest.fixture(scope="module")
+def session(chain):
+    engine = create_seed_engine("sqlite://")
+    seed_database(engine, chain)
+    with Session(engine) as session:
+        yield session
+
+
+def as_json(model) -> dict:
+    return model.model_dump(mode="json")
+
+
+def test_block_details(chain, driver, session):
+    hashes = [row["hash"].hex() for row in chain.block[::3]] + ["00" * 32]
+    graph = block.get_blocks_details(driver, hashes)
+    postgres = db_postgres.get_blocks_details(session, hashes)
+    assert sorted(graph) == sorted(postgres) == sorted(hashes[:-1])
+    for block_hash in graph:
+        assert as_json(graph[block_hash]) == as_json(postgres[block_hash])
+        assert graph[block_hash].transactions
+
+
+def test_blocks(driver, session):
+    for skip in (0, 5):
+        assert as_json(block.get_blocks(driver, skip, 4)) == as_json(db_postgres.get_blocks(session, skip, 4))
+
+
+def test_epochs(chain, driver, session):
+    assert as_json(epoch.get_epochs(driver, 0, 10)) == as_json(db_postgres.get_epochs(session, 0, 10))
+    for row in chain.epoch:
+        assert as_json(epoch.get_epoch_details(driver, row["no"])) == \
+               as_json(db_postgres.get_epoch_details(session, row["no"]))
+    assert as_json(epoch.get_epoch_details(driver, 999)) == as_json(db_postgres.get_epoch_details(session, 999))
+
+
+def test_transaction_utxos(chain, driver, session):
+    spending = {row["tx_in_id"] for row in chain.tx_in}
+    hashes = [row["hash"].hex() for row in chain.tx if row["id"] in spending][:10]
+    for tx_hash in hashes + ["00" * 32]:
+        graph = as_json(transaction.get_transaction_utxos(driver, tx_hash))
+        postgres = as_json(db_postgres.get_transaction_utxos(session, tx_hash))
+        assert graph == postgres
+
+
+def test_timestamps_are_utc(chain, driver, session):
+    block_hash = chain.block[0]["hash"].hex()
+    graph = as_json(block.get_blocks_details(driver, [block_hash])[block_hash])
+    assert graph["block"]["time"].endswith("Z")
+    assert graph["epoch"]["start_time"].endswith("Z")
+    assert all(tx["timestamp"].endswith("Z") for tx in graph["transactions"])
+
+
+def test_blocks_total_counts_unnumbered_blocks(chain):
+    # The Postgres total is read from idx_block_block_no: the highest block number + 1 plus the blocks without one.
+    # It equals the graph's count of Block nodes on db-sync, whose block numbers are dense from 0; a gap in the
+    # numbers would show up as a difference, which is accepted rather than counting the block table.
+    engine = create_seed_engine("sqlite://")
+    seed_database(engine, chain)
+    with Session(engine) as session:
+        first = session.get(Block, chain.block[0]["id"])
+        session.add(Block(id=10 ** 6, hash=b"\x01" * 32, epoch_no=first.epoch_no, slot_no=first.slot_no,
+                          slot_leader_id=first.slot_leader_id, size=0, time=first.time, tx_count=0,
+                          proto_major=first.proto_major, proto_minor=first.proto_minor))
+        session.commit()
+        blocks = db_postgres.get_blocks(session, 0, 4)
+    assert blocks.total_count == len(chain.block) + 1
+    assert all(block.block_no is not None for block in blocks.blocks)
@@ -0,0 +1,57 @@
+import datetime
+
+from app.cluster_addresses import cluster, new_entity_id, reconcile, run
+from app.models.transactions import CoSpend
+from tests.fakes import FakeDriver
+
+# a and b belong to different entities until a transaction spends from both of them together with c
+EXISTING = {"a": "entity_1", "b": "entity_2", "x": "entity_3"}
+CO_SPENDS = [
+    CoSpend(tx_hash="t1", addresses=["a", "b", "c"]),
+    CoSpend(tx_hash="t2", addresses=["d", "e"]),
+    CoSpend(tx_hash="t3", addresses=["x", "y"]),
+]
+
+
+def test_reconcile():
+    assignments, merged, touched = reconcile(cluster(CO_SPENDS), EXISTING)
+    new_id = new_entity_id(["d", "e"])
+    assert assignments == {"b": "entity_1", "c": "entity_1", "d": new_id, "e": new_id, "y": "entity_3"}
+    assert merged == {"entity_2": "entity_1"}
+    assert touched == {"entity_1", "entity_3", new_id}
+
+
+def test_reconcile_merges_into_the_smallest_id():
+    assignments, merged, _ = reconcile(cluster([CoSpend(tx_hash="t", addresses=["a", "b", "x"])]), EXISTING)
+    assert merged == {"entity_2": "entity_1", "entity_3": "entity_1"}
+    assert assignments == {"b": "entity_1", "x": "entity_1"}
+
+
+def test_reconcile_leaves_unchanged_entities_alone():
+    assignments, merged, touched = reconcile(cluster([CoSpend(tx_hash="t", addresses=["a", "c"])]),
+                                             {"a": "entity_1", "c": "entity_1"})
+    assert (assignments, merged, touched) == ({}, {}, {"entity_1"})
+
+
+def test_run_writes_ids_and_deletes_merged_entities():
+    def responder(query, params):
+        if "RETURN a.address AS address, a.entity_id AS entity_id" in query:
+            return [{"address": address, "entity_id": EXISTING[address]}
+                    for address in params["addresses"] if address in EXISTING]
+        return []
+
+    driver = FakeDriver(responder)
+    run(driver, CO_SPENDS, datetime.datetime(2024, 1, 1))
+
+    [(_, _, assigned)] = driver.matching("MATCH (a:Address {address: row.address})")
+    new_id = new_entity_id(["d", "e"])
+    assert {row["address"]: row["entity_id"] for row in assigned["rows"]} == \
+           {"b": "entity_1", "c": "entity_1", "d": new_id, "e": new_id, "y": "entity_3"}
+    [(_, _, relabelled)] = driver.matching("MATCH (a:Address {entity_id: row.old_id})")
+    assert relabelled["rows"] == [{"old_id": "entity_2", "entity_id": "entity_1"}]
+    [(_, _, deleted)] = driver.matching("DETACH DELETE e")
+    assert deleted["old_ids"] == ["entity_2"]
+    [(_, _, updated)] = driver.matching("MERGE (e:Entity {entity_id: entity_id})")
+    assert updated["entity_ids"] == sorted(["entity_1", "entity_3", new_id])
+    [(_, _, checkpoint)] = driver.matching("MERGE (c:Checkpoint {name: $name})")
+    assert checkpoint["end"] == "2024-01-01T00:00:00"
@@ -0,0 +1,39 @@
+import pytest
+from pydantic import ValidationError
+
+from app.config import Settings
+
+
+def _settings(**values) -> Settings:
+    return Settings(_env_file=None, **values)
+
+
+def test_static_provider_needs_no_credentials(monkeypatch):
+    for name in ("CMC_API_KEY", "POSTGRES_PASSWORD", "READ_BACKENDS"):
+        monkeypatch.delenv(name, raising=False)
+    settings = _settings(market_data_provider="static")
+    assert settings.cmc_api_key is None
+    assert settings.read_backend("blocks") == "graph"
+
+
+def test_coinmarketcap_requires_an_api_key(monkeypatch):
+    monkeypatch.delenv("CMC_API_KEY", raising=False)
+    with pytest.raises(ValidationError, match="CMC_API_KEY"):
+        _settings(market_data_provider="coinmarketcap")
+    assert _settings(market_data_provider="coinmarketcap", cmc_api_key="key").cmc_api_key == "key"
+
+
+def test_postgres_routes_require_a_password(monkeypatch):
+    monkeypatch.delenv("POSTGRES_PASSWORD", raising=False)
+    with pytest.raises(ValidationError, match="POSTGRES_PASSWORD"):
+        _settings(market_data_provider="static", read_backends="blocks=postgres")
+    settings = _settings(market_data_provider="static", read_backends="blocks=postgres", postgres_password="pw")
+    assert settings.read_backend("blocks") == "postgres"
+    assert settings.read_backend("epochs") == "graph"
+
+
+def test_unknown_backends_and_providers_are_rejected():
+    with pytest.raises(ValidationError):
+        _settings(market_data_provider="static", read_backends="blocks=mysql")
+    with pytest.raises(ValidationError):
+        _settings(market_data_provider="yahoo")
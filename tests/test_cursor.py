@@ -0,0 +1,52 @@
+import pytest
+from fastapi import HTTPException
+
+from app.db.graph.address import get_address_transactions
+from app.routers.address import api_get_address_transactions
+from app.utils.cursor import decode_cursor, encode_cursor, iso_datetime, string
+from tests.fakes import FakeDriver
+
+FIELDS = {"timestamp": iso_datetime, "tx_hash": string}
+POSITION = {"timestamp": "2024-01-01T00:00:00.000000000+00:00", "tx_hash": "aa"}
+
+
+def test_round_trip():
+    cursor = encode_cursor(POSITION)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, FIELDS) == POSITION
+
+
+def test_only_the_expected_fields_are_returned():
+    assert decode_cursor(encode_cursor({**POSITION, "other": 1}), FIELDS) == POSITION
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    encode_cursor(["2024-01-01T00:00:00Z", "aa"]),
+    encode_cursor({"tx_hash": "aa"}),
+    encode_cursor({"timestamp": "yesterday", "tx_hash": "aa"}),
+    encode_cursor({"timestamp": 1704067200, "tx_hash": "aa"}),
+    encode_cursor({"timestamp": "2024-01-01T00:00:00Z", "tx_hash": 7}),
+])
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError, match="Malformed cursor"):
+        decode_cursor(cursor, FIELDS)
+
+
+def test_keyset_predicate_only_with_a_cursor():
+    driver = FakeDriver()
+    get_address_transactions(driver, "addr1")
+    get_address_transactions(driver, "addr1", encode_cursor(POSITION))
+    get_address_transactions(driver, "addr1", encode_cursor(POSITION), ascending=True)
+    (_, first, first_params), (_, after, after_params), (_, ascending, _) = driver.statements
+    assert "$after_timestamp" not in first and "after_timestamp" not in first_params
+    assert "p.timestamp <= datetime($after_timestamp)" in after
+    assert after_params["after_timestamp"] == POSITION["timestamp"]
+    assert "p.timestamp >= datetime($after_timestamp)" in ascending
+
+
+def test_bad_cursor_is_a_bad_request():
+    with pytest.raises(HTTPException) as raised:
+        api_get_address_transactions("addr1", encode_cursor({"timestamp": "soon", "tx_hash": "aa"}), 50,
+                                     "timestamp,desc", FakeDriver())
+    assert raised.value.status_code == 400
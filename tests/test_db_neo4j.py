@@ -0,0 +1,53 @@
+from neo4j.time import DateTime
+
+from app.db.graph.address import get_address_utxos
+from app.db.graph.asset import get_asset_details
+from app.db.graph.db_neo4j import serialize_node
+from tests.fakes import FakeDriver
+
+UTXO = {"utxo_hash": "aa", "index": 0, "value": 1.5, "timestamp": DateTime(2024, 1, 1),
+        "stake_counted": True, "stake_spent_counted": True}
+
+
+def test_serialize_node_leaves_out_bookkeeping_markers():
+    assert serialize_node(UTXO) == {"utxo_hash": "aa", "index": 0, "value": 1.5,
+                                    "timestamp": "2024-01-01T00:00:00.000000000"}
+
+
+class Node:
+    """Like neo4j.graph.Node as far as serialize_node is concerned: property items, but not a dict."""
+
+    def __init__(self, properties):
+        self._properties = properties
+
+    def items(self):
+        return self._properties.items()
+
+
+def test_serialize_node_leaves_out_markers_of_nested_nodes():
+    # e.g. the {utxo: input, address: inputAddress} maps of get_transactions_details
+    serialized = serialize_node({"utxo": Node(UTXO), "address": Node({"address": "addr1"})})
+    assert serialized == {"utxo": {"utxo_hash": "aa", "index": 0, "value": 1.5,
+                                   "timestamp": "2024-01-01T00:00:00.000000000"},
+                          "address": {"address": "addr1"}}
+
+
+def test_serialize_node_still_honours_exclude_keys():
+    assert serialize_node({"id": 3, "address": "addr1", "stake_counted": True}, exclude_keys=["id"]) == \
+           {"address": "addr1"}
+
+
+def test_address_utxos_do_not_expose_bookkeeping_markers():
+    driver = FakeDriver(lambda query, parameters: [{"u": UTXO, "spent_by": "bb"}])
+    utxos = get_address_utxos(driver, "addr1").utxos
+    assert utxos == [{"utxo_hash": "aa", "index": 0, "value": 1.5, "timestamp": "2024-01-01T00:00:00.000000000",
+                      "spent_by": "bb"}]
+
+
+def test_transactions_do_not_expose_the_address_counters_marker():
+    transaction = {"tx_hash": "cc", "timestamp": DateTime(2024, 1, 1), "fee": 0.17, "address_counters_applied": True}
+    assert "address_counters_applied" not in serialize_node(Node(transaction))
+
+    driver = FakeDriver(lambda query, parameters: [{"a": {"fingerprint": "asset1"}, "transactions": [transaction]}])
+    assert get_asset_details(driver, "asset1")["transactions"] == [
+        {"tx_hash": "cc", "timestamp": "2024-01-01T00:00:00.000000000", "fee": 0.17}]
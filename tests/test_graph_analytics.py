@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from app.utils.graph_analytics import TransferGraphBuilder, compute_address_scores, degrees, pagerank, \
+    weakly_connected_components
+
+
+def build(*edges):
+    builder = TransferGraphBuilder()
+    for edge in edges:
+        builder.add(*edge)
+    return builder.build()
+
+
+def test_builder_indexes_addresses_in_order_of_appearance():
+    graph = build(("a", "b", 1.0), ("b", "c", None), ("a", "c", 2.0))
+    assert graph.addresses == ["a", "b", "c"]
+    assert graph.sources.tolist() == [0, 1, 0]
+    assert graph.targets.tolist() == [1, 2, 2]
+    assert graph.weights.tolist() == [1.0, 0.0, 2.0]
+
+
+def test_pagerank_of_a_cycle_is_uniform():
+    ranks = pagerank(build(("a", "b", 1.0), ("b", "c", 1.0), ("c", "a", 1.0)))
+    assert ranks == pytest.approx([1 / 3] * 3)
+
+
+def test_pagerank_follows_the_value():
+    # a sends almost everything to b, and both send all back to a
+    ranks = pagerank(build(("a", "b", 9.0), ("a", "c", 1.0), ("b", "a", 1.0), ("c", "a", 1.0)))
+    assert ranks.sum() == pytest.approx(1.0)
+    assert ranks[1] > ranks[2]
+
+
+def test_pagerank_spreads_dangling_mass():
+    ranks = pagerank(build(("a", "b", 1.0)))
+    assert ranks.sum() == pytest.approx(1.0)
+    assert ranks[1] > ranks[0]
+
+
+def test_pagerank_of_an_empty_graph():
+    assert len(pagerank(build())) == 0
+
+
+def test_components_are_numbered_from_largest():
+    graph = build(("a", "b", 1.0), ("c", "d", 1.0), ("d", "e", 1.0), ("f", "e", 1.0), ("g", "g", 1.0))
+    component_ids, sizes = weakly_connected_components(graph)
+    assert component_ids.tolist() == [1, 1, 0, 0, 0, 0, 2]
+    assert sizes.tolist() == [2, 2, 4, 4, 4, 4, 1]
+
+
+def test_components_of_a_long_chain():
+    graph = build(*((str(i + 1), str(i), 1.0) for i in range(1000)))
+    component_ids, sizes = weakly_connected_components(graph)
+    assert np.all(component_ids == 0)
+    assert np.all(sizes == 1001)
+
+
+def test_degrees_and_scores():
+    graph = build(("a", "b", 1.0), ("a", "c", 1.0), ("b", "c", 1.0))
+    in_degree, out_degree = degrees(graph)
+    assert in_degree.tolist() == [0, 1, 2]
+    assert out_degree.tolist() == [2, 1, 0]
+
+    scores = compute_address_scores(graph)
+    assert [score["address"] for score in scores] == ["a", "b", "c"]
+    assert scores[2]["in_degree"] == 2 and scores[2]["component_size"] == 3
@@ -0,0 +1,72 @@
+import gzip
+
+import msgpack
+
+from app.models.graph import AddressNode, BaseEdge, GraphData, TransactionNode
+from app.utils.graph_codec import COMPRESSION_THRESHOLD, GRAPH_MSGPACK_MEDIA_TYPE, encode_compact_graph, \
+    negotiate_graph_response
+
+
+def decode_nodes(compact):
+    """Rows of every node type, with the string-table indexes resolved."""
+    strings = compact["strings"]
+    rows = []
+    for node_type, group in compact["nodes"].items():
+        for i in range(group["count"]):
+            row = {"type": node_type}
+            for name, column in group["columns"].items():
+                value = column[i]
+                row[name] = strings[value] if name in group["string_columns"] and value is not None else value
+            rows.append(row)
+    return rows
+
+
+def graph(addresses: int = 2) -> GraphData:
+    nodes = [AddressNode(id=f"addr{i}", type="Address", label=f"addr{i}") for i in range(addresses)]
+    nodes.append(AddressNode(id="hub", type="Address", label="hub", depth=1))
+    nodes.append(TransactionNode(id="tx", type="Transaction", tx_hash="tx", timestamp="2024-01-01", value=5))
+    edges = [BaseEdge(from_address=f"addr{i}", to_address="tx", type="INPUT") for i in range(addresses)]
+    return GraphData(nodes=nodes, edges=edges)
+
+
+def test_round_trip():
+    original = graph()
+    compact = encode_compact_graph(original)
+    expected = [node.model_dump(by_alias=True) for node in original.nodes]
+    assert sorted(decode_nodes(compact), key=lambda row: row["id"]) == sorted(expected, key=lambda row: row["id"])
+
+    strings = compact["strings"]
+    edges = list(zip(*(map(strings.__getitem__, compact["edges"][key]) for key in ("from", "to", "type"))))
+    assert edges == [(edge.from_address, edge.to_address, edge.type) for edge in original.edges]
+
+
+def test_strings_are_stored_once():
+    compact = encode_compact_graph(graph())
+    assert len(compact["strings"]) == len(set(compact["strings"]))
+    assert compact["strings"].count("Address") == 0
+    assert compact["nodes"]["Address"]["string_columns"] == ["id", "label"]
+
+
+def test_json_unless_asked_for():
+    original = graph()
+    assert negotiate_graph_response(original, "application/json", "gzip") is original
+    assert negotiate_graph_response(original, None, None) is original
+
+
+def test_small_graphs_are_not_compressed():
+    response = negotiate_graph_response(graph(), GRAPH_MSGPACK_MEDIA_TYPE, "gzip")
+    assert response.media_type == GRAPH_MSGPACK_MEDIA_TYPE
+    assert "content-encoding" not in response.headers
+    assert msgpack.unpackb(response.body)["version"] == 1
+
+
+def test_large_graphs_are_compressed_when_accepted():
+    large = graph(addresses=2000)
+    response = negotiate_graph_response(large, GRAPH_MSGPACK_MEDIA_TYPE, "gzip, br")
+    assert response.headers["content-encoding"] == "gzip"
+    body = gzip.decompress(response.body)
+    assert len(body) >= COMPRESSION_THRESHOLD
+    assert msgpack.unpackb(body) == msgpack.unpackb(msgpack.packb(encode_compact_graph(large), use_bin_type=True))
+
+    uncompressed = negotiate_graph_response(large, GRAPH_MSGPACK_MEDIA_TYPE, None)
+    assert "content-encoding" not in uncompressed.headers
@@ -0,0 +1,31 @@
+import pytest
+
+from app.models.graph import AddressNode, BaseEdge, GraphData, TransactionNode
+from app.utils.graph_layout import LayoutAlgorithm, compute_layout
+from benchmarks.layout_benchmark import synthetic_graph
+
+
+def assert_distinct(graph: GraphData):
+    positions = compute_layout(graph, LayoutAlgorithm.TIMELINE)
+    assert len(positions) == len(graph.nodes)
+    assert len(set(positions.values())) == len(graph.nodes)
+
+
+def test_timeline_separates_an_address_from_its_transaction():
+    assert_distinct(GraphData(
+        nodes=[AddressNode(id="addr", type="Address", label="addr"),
+               TransactionNode(id="tx", type="Transaction", tx_hash="tx", timestamp="2024-01-01T00:00:00", value=1)],
+        edges=[BaseEdge(from_address="addr", to_address="tx", type="INPUT_TRANSACTION")]))
+
+
+@pytest.mark.parametrize("size", [1000, 10000])
+def test_timeline_positions_are_distinct(size):
+    assert_distinct(synthetic_graph(size))
+
+
+def test_timeline_orders_transactions_by_time():
+    graph = synthetic_graph(1000)
+    positions = compute_layout(graph, LayoutAlgorithm.TIMELINE)
+    transactions = sorted((node for node in graph.nodes if node.type == "Transaction"), key=lambda node: node.timestamp)
+    xs = [positions[node.id][0] for node in transactions]
+    assert xs == sorted(xs)
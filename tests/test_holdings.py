@@ -0,0 +1,47 @@
+import pytest
+from fastapi import HTTPException
+
+from app.db.graph.asset import get_address_holdings
+from app.routers.address import api_get_address_tokens
+from app.utils.cursor import encode_cursor
+from benchmarks.standin import StandInDriver, StandInGraph
+from benchmarks.synthetic_chain import ChainConfig, generate_chain
+from tests.fakes import FakeDriver
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return StandInGraph(generate_chain(ChainConfig(blocks=30, txs_per_block=5, addresses=20, assets=12)))
+
+
+def test_pages_follow_the_index_order(graph):
+    driver = StandInDriver(graph, query_latency_ms=0, row_latency_us=0)
+    address = max(graph.holdings, key=lambda key: len(graph.holdings[key]))
+    expected = sorted(((quantity, fingerprint) for fingerprint, quantity in graph.holdings[address].items()),
+                      reverse=True)
+    assert len(expected) >= 2
+
+    pages, cursor = [], None
+    while True:
+        page = get_address_holdings(driver, address, cursor=cursor, size=1)
+        pages += [(token.quantity, token.fingerprint) for token in page.tokens]
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert pages == expected
+
+
+def test_sorts_on_relationship_properties_without_skip():
+    driver = FakeDriver()
+    get_address_holdings(driver, "addr1", cursor=encode_cursor({"quantity": 1, "fingerprint": "asset1"}))
+    _, query, params = driver.statements[-1]
+    assert "ORDER BY h.quantity DESC, h.fingerprint DESC" in query
+    assert "SKIP" not in query
+    assert params["after_quantity"] == 1 and params["after_fingerprint"] == "asset1"
+
+
+def test_bad_cursor_is_a_bad_request():
+    with pytest.raises(HTTPException) as error:
+        api_get_address_tokens("addr1", display_name=None, cursor=encode_cursor({"quantity": "1", "fingerprint": "a"}),
+                               size=10, driver=FakeDriver())
+    assert error.value.status_code == 400
@@ -0,0 +1,79 @@
+import hashlib
+
+import pytest
+
+from app.db.graph.address import get_graph_by_address
+from app.utils.known_set import BloomFilter, KnownSet
+from benchmarks.standin import StandInDriver, StandInGraph
+from benchmarks.synthetic_chain import ChainConfig, generate_chain
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter.for_capacity(1000)
+    ids = [f"addr{i}" for i in range(1000)]
+    for node_id in ids:
+        bloom.add(node_id)
+    assert all(node_id in bloom for node_id in ids)
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom = BloomFilter.for_capacity(1000, false_positive_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"addr{i}")
+    false_positives = sum(f"other{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_bloom_filter_base64_round_trip():
+    bloom = BloomFilter(64, 3)
+    bloom.add("addr1")
+    copy = BloomFilter.from_base64(bloom.to_base64(), 64, 3)
+    assert copy.bits == bloom.bits
+    assert "addr1" in copy
+
+
+def test_bloom_filter_bit_layout():
+    # Clients build the filter themselves, so the positions are part of the API
+    digest = hashlib.sha256(b"addr1").digest()
+    h1, h2 = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:16], "big")
+    positions = [(h1 + i * h2) % 1024 for i in range(2)]
+    bloom = BloomFilter(1024, 2)
+    bloom.add("addr1")
+    for position in positions:
+        assert bloom.bits[position // 8] & (1 << (position % 8))
+    assert sum(bin(byte).count("1") for byte in bloom.bits) == len(set(positions))
+
+
+@pytest.mark.parametrize("num_bits, num_hashes, bits", [(0, 1, None), (8, 0, None), (64, 1, bytearray(4))])
+def test_bloom_filter_rejects_invalid_parameters(num_bits, num_hashes, bits):
+    with pytest.raises(ValueError):
+        BloomFilter(num_bits, num_hashes, bits)
+
+
+def test_known_set():
+    bloom = BloomFilter(256, 2)
+    bloom.add("bloomed")
+    known = KnownSet(["listed"], bloom)
+    assert "listed" in known and "bloomed" in known
+    assert None not in known
+    assert known.exact_ids == ["listed"]
+
+    assert not KnownSet()
+    assert KnownSet(bloom=bloom)
+    assert "listed" not in KnownSet()
+
+
+def test_transaction_value_does_not_depend_on_known_utxos():
+    chain = generate_chain(ChainConfig(blocks=5, txs_per_block=3, addresses=20, assets=2))
+    graph = StandInGraph(chain)
+    driver = StandInDriver(graph, query_latency_ms=0, row_latency_us=0)
+    address = max(graph.address_utxos, key=lambda key: len(graph.address_utxos[key]))
+
+    def transactions(known: KnownSet):
+        return {node.id: node.value for node in get_graph_by_address(driver, address, known=known).nodes
+                if node.type == "Transaction"}
+
+    everything = transactions(KnownSet())
+    utxos = [f"{utxo_hash}_{index}" for utxo_hash, index in graph.utxos]
+    assert any(everything.values())
+    assert transactions(KnownSet(utxos)) == everything
@@ -0,0 +1,31 @@
+import pytest
+
+from app.utils.latency import LatencyWindow
+
+
+def test_empty_snapshot():
+    assert LatencyWindow().snapshot() == {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0,
+                                          "max_ms": 0.0}
+
+
+def test_snapshot():
+    window = LatencyWindow()
+    for ms in range(1, 101):
+        window.record(ms / 1000)
+    snapshot = window.snapshot()
+    assert snapshot["count"] == 100
+    assert snapshot["mean_ms"] == pytest.approx(50.5)
+    assert snapshot["p50_ms"] == pytest.approx(50.5)
+    assert snapshot["p99_ms"] == pytest.approx(99.01)
+    assert snapshot["max_ms"] == 100.0
+
+
+def test_percentiles_follow_the_window_and_totals_do_not():
+    window = LatencyWindow(window=10)
+    window.record(1.0)
+    for _ in range(10):
+        window.record(0.001)
+    snapshot = window.snapshot()
+    assert snapshot["p99_ms"] == 1.0
+    assert snapshot["count"] == 11
+    assert snapshot["max_ms"] == 1000.0
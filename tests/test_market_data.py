@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from app.models.dashboard import CardanoData
+from app.services.market_data import MarketDataService, MarketDataUnavailable, StaticMarketDataProvider
+
+
+class FailingProvider:
+    def __init__(self):
+        self.calls = 0
+
+    async def fetch_quote(self) -> CardanoData:
+        self.calls += 1
+        raise MarketDataUnavailable("provider down")
+
+    async def aclose(self) -> None:
+        pass
+
+
+def test_cold_start_fetches_once_for_concurrent_callers():
+    provider = StaticMarketDataProvider()
+    service = MarketDataService(provider, jitter=0)
+
+    async def run():
+        return await asyncio.gather(*(service.get_quote() for _ in range(5)))
+
+    quotes = asyncio.run(run())
+    assert provider.calls == 1
+    assert all(quote is provider.quote for quote in quotes)
+
+
+def test_cold_start_failures_back_off_instead_of_refetching():
+    provider = FailingProvider()
+    service = MarketDataService(provider, refresh_interval=60, jitter=0)
+
+    async def run():
+        results = await asyncio.gather(*(service.get_quote() for _ in range(3)), return_exceptions=True)
+        with pytest.raises(MarketDataUnavailable):
+            await service.get_quote()
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, MarketDataUnavailable) for result in results)
+    assert provider.calls == 1
+
+
+def test_backoff_doubles_up_to_the_maximum():
+    service = MarketDataService(FailingProvider(), refresh_interval=10, jitter=0, max_backoff=35)
+    delays = []
+    for failures in range(1, 5):
+        service._failures = failures
+        delays.append(service._backoff())
+    assert delays == [10, 20, 35, 35]
+
+
+def test_stale_quote_is_served_while_revalidating():
+    provider = StaticMarketDataProvider()
+    service = MarketDataService(provider, refresh_interval=0, jitter=0)
+
+    async def run():
+        first = await service.get_quote()
+        second = await service.get_quote()
+        await service._revalidation
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first is second is provider.quote
+    assert provider.calls == 2
@@ -0,0 +1,70 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils.metrics import Counter, Gauge, Histogram, Registry, gauge_lines, instrument_routes, requests_total, \
+    summary_lines
+
+
+def test_counter_and_gauge():
+    counter = Counter("events_total", "Events.", ("kind",))
+    counter.inc(("a",))
+    counter.inc(("a",), 2)
+    counter.inc(('quo"te\n',), 0.5)
+    assert list(counter.render()) == [
+        "# HELP events_total Events.",
+        "# TYPE events_total counter",
+        'events_total{kind="a"} 3',
+        'events_total{kind="quo\\"te\\n"} 0.5'
+    ]
+
+    gauge = Gauge("in_flight", "In flight.")
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+    assert list(gauge.render())[1:] == ["# TYPE in_flight gauge", "in_flight 1"]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("duration_seconds", "Duration.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, ("/a",))
+    assert list(histogram.render())[2:] == [
+        'duration_seconds_bucket{route="/a",le="0.1"} 2',
+        'duration_seconds_bucket{route="/a",le="1"} 3',
+        'duration_seconds_bucket{route="/a",le="+Inf"} 4',
+        'duration_seconds_sum{route="/a"} 2.65',
+        'duration_seconds_count{route="/a"} 4'
+    ]
+
+
+def test_summary_and_gauge_lines():
+    snapshot = {"count": 4, "mean_ms": 250.0, "p50_ms": 100.0, "p95_ms": 500.0, "p99_ms": 900.0, "max_ms": 900.0}
+    assert list(summary_lines("query_seconds", "Queries.", ("query",), [(("q",), snapshot)]))[2:] == [
+        'query_seconds{query="q",quantile="0.5"} 0.1',
+        'query_seconds{query="q",quantile="0.95"} 0.5',
+        'query_seconds{query="q",quantile="0.99"} 0.9',
+        'query_seconds_sum{query="q"} 1.0',
+        'query_seconds_count{query="q"} 4'
+    ]
+    assert list(gauge_lines("pool", "Pool.", (), [((), 3.0)]))[2:] == ["pool 3"]
+
+
+def test_registry_renders_metrics_and_collectors():
+    registry = Registry()
+    registry.register(Counter("a_total", "A.")).inc()
+    registry.register_collector(lambda: ["b 1"])
+    assert registry.render() == "# HELP a_total A.\n# TYPE a_total counter\na_total 1\nb 1\n"
+
+
+def test_requests_are_labelled_with_the_route_template():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: str):
+        return {"id": item_id}
+
+    instrument_routes(app)
+    client = TestClient(app)
+    client.get("/items/1")
+    client.get("/items/2")
+    assert 'http_requests_total{method="GET",route="/items/{item_id}",status="200"} 2' in requests_total.render()
@@ -0,0 +1,73 @@
+import pytest
+
+from app.db.graph.plan_check import PlanRecorder, plan_findings
+
+
+def operator(operator_type, details="", *children):
+    return {"operatorType": operator_type, "arguments": {"Details": details}, "children": list(children)}
+
+
+def test_plan_findings():
+    plan = operator(
+        "ProduceResults@neo4j", "",
+        operator("CartesianProduct@neo4j", "",
+                 operator("NodeByLabelScan@neo4j", "t:Transaction"),
+                 operator("NodeByLabelScan@neo4j", "`e`:`Epoch`")),
+        operator("AllNodesScan@neo4j", "n"),
+        operator("NodeByLabelScan@neo4j", "t:Transaction")
+    )
+    operators, findings = plan_findings(plan)
+    assert operators == ["ProduceResults", "CartesianProduct", "NodeByLabelScan", "NodeByLabelScan", "AllNodesScan",
+                         "NodeByLabelScan"]
+    assert findings == ["CartesianProduct", "NodeByLabelScan(Transaction)", "AllNodesScan"]
+
+
+@pytest.mark.parametrize("operator_type, details, finding", [
+    ("DirectedRelationshipTypeScan", "(a)-[p:PARTICIPATED]->(t)", "DirectedRelationshipTypeScan(PARTICIPATED)"),
+    ("UndirectedRelationshipTypeScan", "(a)-[h:`HOLDS`]-(asset)", "UndirectedRelationshipTypeScan(HOLDS)"),
+    ("DirectedAllRelationshipsScan", "(a)-[r]->(b)", "DirectedAllRelationshipsScan"),
+    ("UndirectedAllRelationshipsScan", "(a)-[r]-(b)", "UndirectedAllRelationshipsScan"),
+])
+def test_relationship_scans_are_findings(operator_type, details, finding):
+    plan = operator("ProduceResults@neo4j", "", operator(f"{operator_type}@neo4j", details))
+    assert plan_findings(plan)[1] == [finding]
+
+
+def test_index_seeks_are_not_findings():
+    plan = operator("ProduceResults@neo4j", "",
+                    operator("NodeIndexSeek@neo4j", "RANGE INDEX b:Block(hash)"),
+                    operator("DirectedRelationshipIndexSeek@neo4j", "RANGE INDEX (a)-[h:HOLDS(address)]->(b)"))
+    assert plan_findings(plan) == (["ProduceResults", "NodeIndexSeek", "DirectedRelationshipIndexSeek"], [])
+
+
+def record(recorder: PlanRecorder, entry: str, caller: str, text: str, plan):
+    recorder.entry = entry
+    if not recorder.known(caller, text):
+        recorder.record(caller, text, plan)
+
+
+def test_findings_are_allowed_per_entry():
+    recorder = PlanRecorder()
+    scan = operator("ProduceResults@neo4j", "", operator("NodeByLabelScan@neo4j", "t:Transaction"))
+    caller = "routers.transaction.get_transactions"
+    record(recorder, "transactions by total_output", caller, "MATCH (t:Transaction) RETURN t", scan)
+    record(recorder, "transactions by fee", caller, "MATCH (t:Transaction) RETURN t.fee", scan)
+    record(recorder, "blocks", "db.graph.block.get_blocks", "MATCH (t:Transaction) RETURN t", scan)
+
+    plans = {plan.name: plan for plan in recorder.plans.values()}
+    assert plans[caller].entries == ["transactions by total_output"]
+    assert plans[caller].violations == []
+    assert plans[f"{caller}#2"].violations == ["NodeByLabelScan(Transaction)"]
+    assert plans["db.graph.block.get_blocks"].violations == ["NodeByLabelScan(Transaction)"]
+
+
+def test_finding_must_be_allowed_for_every_entry_running_the_statement():
+    recorder = PlanRecorder()
+    scan = operator("ProduceResults@neo4j", "", operator("NodeByLabelScan@neo4j", "t:Transaction"))
+    caller = "routers.transaction.get_transactions"
+    record(recorder, "transactions by total_output", caller, "MATCH (t:Transaction) RETURN t", scan)
+    record(recorder, "transactions by timestamp", caller, "MATCH (t:Transaction) RETURN t", scan)
+
+    plan = recorder.plans[(caller, "MATCH (t:Transaction) RETURN t")]
+    assert plan.entries == ["transactions by total_output", "transactions by timestamp"]
+    assert plan.violations == ["NodeByLabelScan(Transaction)"]
@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.db.pool import TimedQueuePool, engine_stats, instrument_engine
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool.named("test_pool"))
+    yield instrument_engine(engine, "test_pool")
+    engine.dispose()
+
+
+def test_statements_and_checkouts_are_recorded(engine):
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    stats = engine_stats()["test_pool"]
+    assert stats["queries"]["count"] >= 1
+    assert stats["checkout"]["count"] >= 1
+
+
+def test_failed_statement_does_not_leave_its_start_behind(engine):
+    with engine.connect() as connection:
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM missing"))
+        assert connection.info["query_started"] == []
+        connection.execute(text("SELECT 1"))
+        assert connection.info["query_started"] == []
+
+
+def test_pool_keeps_its_name_when_recreated(engine):
+    engine.dispose()
+    assert engine.pool.stats_name == "test_pool"
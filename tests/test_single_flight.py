@@ -0,0 +1,63 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.utils.single_flight import SingleFlight, query_flight, single_flight
+
+
+def blocked_call(flight: SingleFlight, calls: int, fn):
+    """Run `calls` identical calls, the first of which blocks in `fn` until all the others are waiting on it."""
+    started, release = threading.Event(), threading.Event()
+
+    def leader():
+        started.set()
+        release.wait(5)
+        return fn()
+
+    with ThreadPoolExecutor(calls) as pool:
+        first = pool.submit(flight.do, "query", ("query", 1), leader)
+        started.wait(5)
+        others = [pool.submit(flight.do, "query", ("query", 1), leader) for _ in range(calls - 1)]
+        while flight.stats()["query"]["coalesced"] < calls - 1:
+            time.sleep(0.001)
+        release.set()
+        return [first] + others
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    result = object()
+    futures = blocked_call(flight, 4, lambda: result)
+    assert all(future.result() is result for future in futures)
+    assert flight.stats()["query"] == {"calls": 4, "executions": 1, "coalesced": 3, "errors": 0, "in_flight": 0}
+
+
+def test_concurrent_calls_share_the_error():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("down")
+
+    for future in blocked_call(flight, 3, fail):
+        with pytest.raises(RuntimeError, match="down"):
+            future.result()
+    assert flight.stats()["query"]["errors"] == 1
+
+
+def test_results_are_not_cached():
+    flight = SingleFlight()
+    assert flight.do("query", 1, lambda: 1) == 1
+    assert flight.do("query", 1, lambda: 2) == 2
+    assert flight.stats()["query"]["executions"] == 2
+
+
+def test_decorator_keys_on_arguments_but_not_the_driver():
+    @single_flight
+    def lookup(driver, keys, options=None):
+        return driver, keys, options
+
+    assert lookup("driver", ["a"], options={"b": [1]}) == ("driver", ["a"], {"b": [1]})
+    name = f"{__name__}.{lookup.__qualname__}"
+    assert query_flight.stats()[name]["executions"] == 1
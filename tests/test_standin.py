@@ -0,0 +1,34 @@
+import pytest
+
+from app.db.graph import block
+from app.db.graph.access import fetch_all, read_session
+from benchmarks.standin import HANDLERS, StandInDriver, StandInGraph, UnhandledQuery
+from benchmarks.synthetic_chain import ChainConfig, generate_chain
+
+
+@pytest.fixture(scope="module")
+def driver():
+    chain = generate_chain(ChainConfig(blocks=5, txs_per_block=3, addresses=50, assets=2))
+    return StandInDriver(StandInGraph(chain), query_latency_ms=0, row_latency_us=0)
+
+
+def unknown_reader(driver):
+    with read_session(driver) as session:
+        return session.execute_read(fetch_all, "MATCH (n) RETURN n")
+
+
+def test_statement_without_handler_raises(driver):
+    with pytest.raises(UnhandledQuery, match="unknown_reader"):
+        unknown_reader(driver)
+
+
+def test_statement_the_handler_does_not_recognise_raises(driver):
+    handler = HANDLERS["app.db.graph.block.get_blocks"]
+    with pytest.raises(UnhandledQuery, match="ORDER BY"):
+        handler(driver.graph, "MATCH (b:Block) RETURN b ORDER BY b.slot_no DESC", {"skip": 0, "limit": 10})
+
+
+def test_blocks_carry_their_block_id(driver):
+    blocks = block.get_blocks(driver, 0, 3)
+    assert [entry.block_id for entry in blocks.blocks] == [5, 4, 3]
+    assert blocks.total_count == 5
@@ -0,0 +1,90 @@
+import asyncio
+
+from app.services.startup import StartupService
+
+
+class Driver:
+    def __init__(self):
+        self.available = True
+        self.checks = 0
+
+    def verify_connectivity(self):
+        self.checks += 1
+        if not self.available:
+            raise ConnectionError("neo4j down")
+
+
+class Engine:
+    def __init__(self):
+        self.available = True
+        self.statements = []
+
+    def connect(self):
+        return Connection(self)
+
+
+class Connection:
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def __aenter__(self):
+        if not self.engine.available:
+            raise ConnectionError("postgres down")
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def execute(self, statement):
+        self.engine.statements.append(str(statement))
+
+
+def connect(service: StartupService):
+    async def run():
+        await service.start()
+        await service._task
+        return service.ready
+
+    return asyncio.run(run())
+
+
+def test_readiness_flips_back_when_the_connection_is_lost():
+    driver = Driver()
+    service = StartupService(lambda: driver, [], recheck_seconds=0)
+    assert connect(service)
+
+    driver.available = False
+
+    async def check():
+        ready = await service.check()
+        await service._task
+        return ready
+
+    assert not asyncio.run(check())
+    assert service.last_error == "neo4j down"
+
+    driver.available = True
+    assert asyncio.run(check()) is False
+    assert service.ready
+
+
+def test_recheck_is_rate_limited():
+    driver = Driver()
+    service = StartupService(lambda: driver, [], recheck_seconds=60)
+    assert connect(service)
+
+    driver.available = False
+    assert asyncio.run(service.check())
+    assert driver.checks == 1
+
+
+def test_postgres_is_verified_when_given():
+    driver, engine = Driver(), Engine()
+    engine.available = False
+    service = StartupService(lambda: driver, [], postgres_engine_factory=lambda: engine, recheck_seconds=0)
+    assert not connect(service)
+    assert service.last_error == "postgres down"
+
+    engine.available = True
+    assert connect(service)
+    assert engine.statements == ["SELECT 1"]
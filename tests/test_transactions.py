@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+from app.routers.transaction import get_transactions
+from tests.fakes import FakeDriver
+
+
+def _list_query(**filters) -> str:
+    driver = FakeDriver(lambda query, parameters: [{"total_count": 0}] if "total_count" in query else [])
+    asyncio.run(get_transactions(driver=driver, page=1, page_size=20, sort_by="timestamp", sort_order="DESC",
+                                 **{"tx_hash_filter": None, "tx_hash_prefix": None, **filters}))
+    return driver.matching("ORDER BY")[0][1]
+
+
+@pytest.mark.parametrize("filters, predicate", [
+    ({"tx_hash_filter": "beef"}, "t.tx_hash CONTAINS $tx_hash_filter"),
+    ({"tx_hash_prefix": "beef"}, "t.tx_hash STARTS WITH $tx_hash_prefix"),
+])
+def test_hash_filters(filters, predicate):
+    query = _list_query(**filters)
+    assert predicate in query
+    assert "t.timestamp IS NOT NULL" not in query
+
+
+def test_unfiltered_list_pages_the_sort_index():
+    query = _list_query()
+    assert "t.timestamp IS NOT NULL" in query
+    assert "tx_hash" not in query.split("RETURN")[0]
+
+
+def test_addresses_are_distinct():
+    query = _list_query()
+    assert "collect(DISTINCT inputAddress.address) AS input_addresses" in query
+    assert "collect(DISTINCT outputAddress.address) AS output_addresses" in query
@@ -0,0 +1,41 @@
+from app.utils.union_find import UnionFind
+
+
+def test_union_joins_sets():
+    sets = UnionFind()
+    sets.union("a", "b")
+    sets.union("c", "d")
+    assert sets.find("a") == sets.find("b")
+    assert sets.find("a") != sets.find("c")
+
+    sets.union("b", "d")
+    assert len({sets.find(key) for key in "abcd"}) == 1
+
+
+def test_add_is_idempotent():
+    sets = UnionFind()
+    assert sets.add("a") == sets.add("a") == 0
+    assert len(sets) == 1
+    assert "a" in sets and "b" not in sets
+
+
+def test_union_all():
+    sets = UnionFind()
+    sets.union_all([])
+    sets.union_all(["x"])
+    sets.union_all(["a", "b", "c"])
+    assert len(sets) == 4
+    assert sets.find("a") == sets.find("c")
+    assert sets.find("x") == "x"
+
+
+def test_groups_match_find():
+    sets = UnionFind()
+    for i in range(0, 100, 2):
+        sets.union(i, i + 2)
+    sets.add(1)
+    sets.union(3, 5)
+    groups = sets.groups()
+    assert sorted(map(sorted, groups.values())) == [list(range(0, 102, 2)), [1], [3, 5]]
+    for root, keys in groups.items():
+        assert all(sets.find(key) == root for key in keys)
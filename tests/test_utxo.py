@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from neo4j import WRITE_ACCESS
+
+from app.db.graph.utxo import insert_utxos
+from app.models.transactions import InputUTXO, OutputUTXO, Transaction
+from tests.fakes import FakeDriver
+
+TIME = datetime(2024, 1, 1, 12, 0)
+
+
+def _responder(query, parameters):
+    if "AS addresses" in query:
+        return [{"addresses": []}]
+    return []
+
+
+def _transaction(tx_hash: str) -> Transaction:
+    return Transaction(
+        fee=170000,
+        block_hash="b1",
+        block_index=0,
+        inputs=[InputUTXO(tx_id=1, tx_out_id=1, tx_out_index=0, stake_address_id=1, consuming_tx_hash=tx_hash,
+                          creating_tx_hash="prev", block_hash="b1", block_index=0, consuming_timestamp=TIME,
+                          creating_timestamp=TIME, input_address="addr_in", input_value=5000000,
+                          stake_address="stake_in")],
+        outputs=[OutputUTXO(tx_id=2, tx_out_index=0, stake_address_id=2, consuming_tx_hash="", creating_tx_hash=tx_hash,
+                            block_hash="b1", block_index=0, fee=170000, consuming_timestamp=TIME,
+                            creating_timestamp=TIME, output_address="addr_out", output_value=4830000)]
+    )
+
+
+def test_insert_utxos_writes_each_batch_in_a_managed_transaction():
+    driver = FakeDriver(_responder)
+    insert_utxos(driver, {"tx1": _transaction("tx1"), "tx2": _transaction("tx2"), "tx3": _transaction("tx3")},
+                 batch_size=2)
+
+    merges = driver.matching("MERGE (t:Transaction {tx_hash: $tx_hash})")
+    assert [parameters["tx_hash"] for _, _, parameters in merges] == ["tx1", "tx2", "tx3"]
+    assert {kind for kind, _, _ in merges} == {"write"}
+    assert merges[0][2]["fee"] == 0.17
+    assert merges[0][2]["timestamp"] == TIME
+
+    contains = driver.matching("MERGE (b)-[:CONTAINS]->(t)")
+    assert [parameters["block_hash"] for _, _, parameters in contains] == ["b1"] * 3
+    owners = [parameters["address"] for _, _, parameters in driver.matching("MERGE (a:Address {address: $address})")]
+    assert owners == ["addr_in"] * 3
+    assert len(driver.matching("MERGE (s:StakeAddress {address: $address})")) == 3
+
+    assert {kind for kind, query, _ in driver.statements if query.startswith("CREATE ")} == {"auto"}
+    assert driver.sessions[0].config["default_access_mode"] == WRITE_ACCESS
+
+
+def test_insert_utxos_skips_transactions_without_utxos():
+    driver = FakeDriver(_responder)
+    insert_utxos(driver, {"empty": Transaction()})
+    assert driver.matching("MERGE (t:Transaction {tx_hash: $tx_hash})") == []